@@ -0,0 +1,76 @@
+from typing import Dict, Iterable
+
+from prometheus_client import Counter, Gauge
+
+from common.logs import logging
+from common.config import METRIC_SERIES_BUDGET, METRIC_SERIES_BUDGETS
+
+
+SERIES_COUNT = Gauge(
+    "nexus_exporter_metric_series",
+    "Количество опубликованных серий по метрике",
+    ["metric"],
+)
+
+SERIES_DROPPED = Counter(
+    "nexus_exporter_metric_series_dropped",
+    "Серии, отброшенные из-за превышения бюджета кардинальности",
+    ["metric"],
+)
+
+
+def parse_budgets(raw: str) -> Dict[str, int]:
+    """'nexus_task_info=500,docker_image_tags_info=100000' → {имя: бюджет}"""
+    budgets = {}
+    for item in (raw or "").split(","):
+        if not item.strip():
+            continue
+        try:
+            name, value = item.split("=", 1)
+            budgets[name.strip()] = int(value)
+        except ValueError:
+            logging.warning(f"⚠️ Некорректный бюджет серий: '{item}'")
+    return budgets
+
+
+BUDGETS = parse_budgets(METRIC_SERIES_BUDGETS)
+
+
+def series_budget(metric: str) -> int:
+    return BUDGETS.get(metric, METRIC_SERIES_BUDGET)
+
+
+def enforce_budget(metric: str, samples: dict, previous: Iterable = (), others: int = 0) -> dict:
+    """
+    Ограничивает снимок бюджетом серий метрики.
+    В первую очередь сохраняются серии, которые уже были опубликованы,
+    чтобы при переполнении не менялся состав серий от цикла к циклу.
+    others — серии метрики у других инстансов Nexus: бюджет у каждого
+    инстанса свой, а nexus_exporter_metric_series показывает сумму.
+    """
+    budget = series_budget(metric)
+    if len(samples) <= budget:
+        record_series(metric, len(samples) + others, 0)
+        return samples
+
+    kept = {}
+    for key in previous:
+        if key in samples and len(kept) < budget:
+            kept[key] = samples[key]
+    for key, value in samples.items():
+        if len(kept) >= budget:
+            break
+        kept.setdefault(key, value)
+
+    dropped = len(samples) - len(kept)
+    logging.warning(
+        f"⚠️ {metric}: превышен бюджет серий ({len(samples)} > {budget}), отброшено {dropped}"
+    )
+    record_series(metric, len(kept) + others, dropped)
+    return kept
+
+
+def record_series(metric: str, count: int, dropped: int) -> None:
+    SERIES_COUNT.labels(metric=metric).set(count)
+    if dropped:
+        SERIES_DROPPED.labels(metric=metric).inc(dropped)
@@ -8,15 +8,119 @@ NEXUS_API_URL = os.getenv("NEXUS_API_URL")
 NEXUS_USERNAME = os.getenv("NEXUS_USERNAME")
 NEXUS_PASSWORD = os.getenv("NEXUS_PASSWORD")
 
+# 🏢 Несколько Nexus в одном экспортёре: JSON-список или путь к JSON-файлу
+# (пусто — один инстанс из NEXUS_* / DATABASE_*, см. common/instances.py)
+NEXUS_INSTANCES = os.getenv("NEXUS_INSTANCES", "")
+NEXUS_INSTANCE_NAME = os.getenv("NEXUS_INSTANCE_NAME", "default")
+
 # 🔐 GitLab настройки
 GITLAB_URL = os.getenv("GITLAB_URL", "https://gitlab.ru")
 GITLAB_TOKEN = os.getenv("GITLAB_TOKEN", None)
 GITLAB_BRANCH = os.getenv("GITLAB_BRANCH", "main")  # ветка по умолчанию
+GITLAB_GROUP_ID = int(os.getenv("GITLAB_GROUP_ID", "3514"))
+GITLAB_POLICY_PATH = os.getenv("GITLAB_POLICY_PATH", "nexus/cleaner")
+GITLAB_SCAN_WORKERS = int(os.getenv("GITLAB_SCAN_WORKERS", "8"))
+
+# 📝 Логирование: уровень, формат (text/json), строки по элементам (summary/sample/all)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_ITEMS = os.getenv("LOG_ITEMS", "summary").lower()
+LOG_SAMPLE_EVERY = int(os.getenv("LOG_SAMPLE_EVERY", "100"))
+LOG_QUEUE = os.getenv("LOG_QUEUE", "true").lower() == "true"
 
 # 📊 Прочие настройки
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Реплика только для чтения: все запросы экспортёра идут на неё, если задана
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL", "")
 REPO_METRICS_INTERVAL = int(os.getenv("REPO_METRICS_INTERVAL", "1800"))
 LAUNCH_INTERVAL = int(os.getenv("LAUNCH_INTERVAL", "300"))
+EXPORTER_STATE_DIR = os.getenv("EXPORTER_STATE_DIR", "/tmp/nexus-exporter")
+
+# 🔐 Кэш внешних политик из GitLab
+GITLAB_POLICY_REFRESH_INTERVAL = int(
+    os.getenv("GITLAB_POLICY_REFRESH_INTERVAL", str(REPO_METRICS_INTERVAL))
+)
+GITLAB_POLICY_CACHE_FILE = os.getenv(
+    "GITLAB_POLICY_CACHE_FILE", os.path.join(EXPORTER_STATE_DIR, "gitlab_policies.json")
+)
+
+# 🔥 Тёплый старт: снимок метрик между перезапусками (пустая строка — выключено)
+WARM_START_FILE = os.getenv(
+    "WARM_START_FILE", os.path.join(EXPORTER_STATE_DIR, "metrics_snapshot.json")
+)
+WARM_START_MAX_AGE = int(os.getenv("WARM_START_MAX_AGE", "86400"))
+
+# ⛔ Предохранители внешних вызовов и бюджет времени цикла (0 — выключено)
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "60"))
+CYCLE_DEADLINE = float(os.getenv("CYCLE_DEADLINE", str(LAUNCH_INTERVAL)))
+DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "10"))
+
+# 🐘 Лимиты SQL: statement_timeout (сек, 0 — без лимита) и work_mem тяжёлых агрегаций
+DB_STATEMENT_TIMEOUT = float(os.getenv("DB_STATEMENT_TIMEOUT", "60"))
+DB_HEAVY_STATEMENT_TIMEOUT = float(os.getenv("DB_HEAVY_STATEMENT_TIMEOUT", "600"))
+DB_HEAVY_WORK_MEM = os.getenv("DB_HEAVY_WORK_MEM", "64MB")
+
+# 🖨️ /metrics: экспозиция перерисовывается при новых данных, но не реже раза в N сек
+METRICS_PORT = int(os.getenv("METRICS_PORT", "8000"))
+METRICS_CACHE_MAX_AGE = int(os.getenv("METRICS_CACHE_MAX_AGE", "60"))
+
+# 📤 Push в VictoriaMetrics (/api/v1/import/prometheus); пустой URL — только pull
+VM_PUSH_URL = os.getenv("VM_PUSH_URL", "")
+VM_PUSH_USERNAME = os.getenv("VM_PUSH_USERNAME")
+VM_PUSH_PASSWORD = os.getenv("VM_PUSH_PASSWORD")
+VM_PUSH_EXTRA_LABELS = os.getenv("VM_PUSH_EXTRA_LABELS", "")  # "job=nexus_customs,instance=..."
+VM_PUSH_FLUSH_INTERVAL = float(os.getenv("VM_PUSH_FLUSH_INTERVAL", "5"))
+VM_PUSH_BATCH_BYTES = int(os.getenv("VM_PUSH_BATCH_BYTES", str(8 * 1024 * 1024)))
+VM_PUSH_TIMEOUT = int(os.getenv("VM_PUSH_TIMEOUT", "30"))
+VM_PUSH_QUEUE_DIR = os.getenv("VM_PUSH_QUEUE_DIR", os.path.join(EXPORTER_STATE_DIR, "push-queue"))
+VM_PUSH_QUEUE_MAX_BYTES = int(os.getenv("VM_PUSH_QUEUE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# 📏 Бюджет кардинальности: общий и по метрикам ("name=limit,name=limit")
+METRIC_SERIES_BUDGET = int(os.getenv("METRIC_SERIES_BUDGET", "20000"))
+METRIC_SERIES_BUDGETS = os.getenv(
+    "METRIC_SERIES_BUDGETS",
+    "docker_image_tags_info=200000,"
+    "nexus_docker_tag_age_days_bucket=200000,"
+    "nexus_docker_tag_reclaimable=100000,"
+    "nexus_docker_tag_reclaimable_asset_bytes=100000",
+)
+
+# 📚 Каталог Nexus (repositories / blobstores / repositorySettings)
+CATALOG_TTL = int(os.getenv("CATALOG_TTL", str(LAUNCH_INTERVAL)))
+
+# 🌐 Асинхронный HTTP-клиент
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "8"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+HTTP_RETRY_BACKOFF = float(os.getenv("HTTP_RETRY_BACKOFF", "0.5"))
+
+# 🧭 Проверка remote-URL proxy-репозиториев
+DNS_CACHE_TTL = int(os.getenv("DNS_CACHE_TTL", "300"))
+DNS_NEGATIVE_CACHE_TTL = int(os.getenv("DNS_NEGATIVE_CACHE_TTL", "60"))
+
+# 📦 Blobstore
+BLOB_HISTORY_SAMPLES = int(os.getenv("BLOB_HISTORY_SAMPLES", "48"))
+
+# 📈 Рост репозиториев
+REPO_HISTORY_SAMPLES = int(os.getenv("REPO_HISTORY_SAMPLES", "48"))
+REPO_GROWTH_TOP_N = int(os.getenv("REPO_GROWTH_TOP_N", "10"))
+
+# 🔁 События задач: JSONL-журнал переходов (пусто — выключен) и его предел до ротации
+TASK_EVENTS_FILE = os.getenv("TASK_EVENTS_FILE", "")
+TASK_EVENTS_MAX_BYTES = int(os.getenv("TASK_EVENTS_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# 📐 Распределение размеров asset'ов (тяжёлый запрос — редкий интервал)
+ASSET_METRICS_INTERVAL = int(os.getenv("ASSET_METRICS_INTERVAL", "21600"))
+ASSET_SIZE_BUCKETS = os.getenv(
+    "ASSET_SIZE_BUCKETS", "1024,65536,1048576,16777216,134217728,1073741824"
+)
+ASSET_TOP_K = int(os.getenv("ASSET_TOP_K", "20"))
+
+# 🐳 Docker теги
+DOCKER_TAGS_INCREMENTAL = os.getenv("DOCKER_TAGS_INCREMENTAL", "true").lower() == "true"
+DOCKER_TAGS_RECONCILE_INTERVAL = int(os.getenv("DOCKER_TAGS_RECONCILE_INTERVAL", "3600"))
+# Сроки хранения (дни) для what-if очистки; они же — границы бакетов возраста тегов
+DOCKER_TAG_RETENTION_DAYS = os.getenv("DOCKER_TAG_RETENTION_DAYS", "7,30,90,180,365")
 
 
 def get_auth():
@@ -0,0 +1,171 @@
+import gzip
+import hashlib
+import threading
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from prometheus_client import REGISTRY
+from prometheus_client.exposition import choose_encoder, gzip_accepted
+
+from common.logs import logging
+from common.config import METRICS_CACHE_MAX_AGE
+
+
+# Поколение данных: растёт при каждой публикации метрик.
+# Пока оно не изменилось, /metrics отдаёт ранее отрисованные байты.
+_generation = 0
+_generation_lock = threading.Lock()
+
+
+def bump_generation() -> None:
+    """Данные метрик изменились — следующий скрейп отрисует экспозицию заново."""
+    global _generation
+    with _generation_lock:
+        _generation += 1
+
+
+def current_generation() -> int:
+    with _generation_lock:
+        return _generation
+
+
+class _Rendered:
+    __slots__ = ("generation", "rendered_at", "modified_at", "body", "gzipped", "etag")
+
+    def __init__(self, generation: int, body: bytes, previous: "_Rendered" = None):
+        self.generation = generation
+        self.rendered_at = time.monotonic()
+        self.body = body
+        self.gzipped = gzip.compress(body, compresslevel=6)
+        # Слабый ETag: одно и то же содержимое отдаётся и сжатым, и нет
+        self.etag = 'W/"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+        # Last-Modified — когда изменилось тело, а не поколение данных: счётчики
+        # процесса меняют тело и без публикации. Секунда у заголовка целая,
+        # поэтому новое тело всегда получает более позднюю секунду.
+        if previous is not None and previous.etag == self.etag:
+            self.modified_at = previous.modified_at
+        elif previous is not None:
+            self.modified_at = max(time.time(), int(previous.modified_at) + 1)
+        else:
+            self.modified_at = time.time()
+
+
+class MetricsCache:
+    """
+    Экспозиция, отрисованная один раз на поколение данных и формат
+    (text/plain или OpenMetrics). Не реже чем раз в max_age секунд
+    рендер повторяется, чтобы счётчики процесса и HTTP не застывали.
+    """
+
+    def __init__(self, registry=REGISTRY, max_age: float = METRICS_CACHE_MAX_AGE):
+        self.registry = registry
+        self.max_age = max_age
+        self._rendered = {}
+        self._lock = threading.Lock()
+
+    def get(self, accept_header: str) -> tuple:
+        encoder, content_type = choose_encoder(accept_header)
+        generation = current_generation()
+
+        rendered = self._rendered.get(content_type)
+        if self._is_fresh(rendered, generation):
+            return rendered, content_type
+
+        # Два vmagent'а скрейпят одновременно — рендерит только один
+        with self._lock:
+            rendered = self._rendered.get(content_type)
+            if not self._is_fresh(rendered, generation):
+                start = time.perf_counter()
+                rendered = _Rendered(generation, encoder(self.registry), rendered)
+                self._rendered[content_type] = rendered
+                logging.debug(
+                    f"🖨️ Экспозиция ({content_type.split(';')[0]}) отрисована за "
+                    f"{time.perf_counter() - start:.3f} сек, {len(rendered.body)} байт"
+                )
+        return rendered, content_type
+
+    def _is_fresh(self, rendered, generation: int) -> bool:
+        return (
+            rendered is not None
+            and rendered.generation == generation
+            and time.monotonic() - rendered.rendered_at < self.max_age
+        )
+
+
+def _not_modified(headers, rendered: _Rendered) -> bool:
+    if_none_match = headers.get("If-None-Match")
+    if if_none_match:
+        return rendered.etag in [tag.strip() for tag in if_none_match.split(",")]
+
+    if_modified_since = headers.get("If-Modified-Since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(rendered.modified_at) <= since
+    return False
+
+
+class CachedMetricsHandler(BaseHTTPRequestHandler):
+    cache: MetricsCache = None
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        if url.path == "/favicon.ico":
+            self.send_response(200)
+            self.end_headers()
+            return
+
+        names = parse_qs(url.query).get("name[]")
+        if names:
+            # Выборочные запросы редки — отдаём их без кэша
+            encoder, content_type = choose_encoder(self.headers.get("Accept"))
+            self._send(200, content_type, encoder(self.cache.registry.restricted_registry(names)))
+            return
+
+        rendered, content_type = self.cache.get(self.headers.get("Accept"))
+        headers = {
+            "ETag": rendered.etag,
+            "Last-Modified": formatdate(rendered.modified_at, usegmt=True),
+            "Vary": "Accept, Accept-Encoding",
+        }
+
+        if _not_modified(self.headers, rendered):
+            self._send(304, content_type, b"", headers)
+        elif gzip_accepted(self.headers.get("Accept-Encoding")):
+            headers["Content-Encoding"] = "gzip"
+            self._send(200, content_type, rendered.gzipped, headers)
+        else:
+            self._send(200, content_type, rendered.body, headers)
+
+    def _send(self, code: int, content_type: str, body: bytes, headers: dict = None) -> None:
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if code != 304:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if code != 304:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        """Скрейпы каждые 15 секунд не пишем в лог."""
+
+
+class _MetricsServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+def start_metrics_server(port: int, addr: str = "0.0.0.0", registry=REGISTRY):
+    """Замена prometheus_client.start_http_server с кэшированием экспозиции."""
+    handler = type(
+        "Handler", (CachedMetricsHandler,), {"cache": MetricsCache(registry)}
+    )
+    server = _MetricsServer((addr, port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, thread
@@ -0,0 +1,195 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional
+
+from prometheus_client import Counter, Gauge
+
+from common.config import (
+    NEXUS_API_URL,
+    NEXUS_USERNAME,
+    NEXUS_PASSWORD,
+    NEXUS_INSTANCES,
+    NEXUS_INSTANCE_NAME,
+)
+
+
+# Не "instance": этот лейбл Prometheus/vmagent ставит сам — адрес цели скрейпа
+INSTANCE_LABEL = "nexus_instance"
+
+INSTANCE_CYCLE_DURATION = Gauge(
+    "nexus_exporter_instance_cycle_seconds",
+    "Длительность последнего цикла сбора инстанса Nexus",
+    [INSTANCE_LABEL],
+)
+
+INSTANCE_LAST_CYCLE = Gauge(
+    "nexus_exporter_instance_last_cycle_timestamp_seconds",
+    "Время завершения последнего цикла сбора инстанса Nexus",
+    [INSTANCE_LABEL],
+)
+
+INSTANCE_CYCLE_FAILURES = Counter(
+    "nexus_exporter_instance_cycle_failures",
+    "Циклы сбора инстанса, прерванные исключением",
+    [INSTANCE_LABEL],
+)
+
+INSTANCE_FIELDS = ("name", "url", "username", "password", "database_url", "database_read_url")
+
+
+class NexusInstance:
+    """Один Nexus: API, учётная запись и своя БД."""
+
+    __slots__ = ("name", "api_url", "username", "password", "database_url", "database_read_url")
+
+    def __init__(
+        self,
+        name: str,
+        api_url: str,
+        username: str = None,
+        password: str = None,
+        database_url: str = None,
+        database_read_url: str = None,
+    ):
+        self.name = name
+        self.api_url = api_url
+        self.username = username
+        self.password = password
+        # None — DATABASE_URL / DATABASE_READ_URL из окружения (режим одного инстанса)
+        self.database_url = database_url
+        self.database_read_url = database_read_url
+
+    @property
+    def auth(self) -> tuple:
+        return (self.username, self.password)
+
+    def __repr__(self) -> str:
+        return f"NexusInstance({self.name!r}, {self.api_url!r})"
+
+
+def parse_instances(raw: str) -> List[NexusInstance]:
+    """
+    NEXUS_INSTANCES: JSON-список или путь к JSON-файлу со списком
+    [{"name", "url", "username", "password", "database_url", "database_read_url"}].
+    В значениях подставляются переменные окружения: "password": "${NEXUS_EU_PASSWORD}".
+    """
+    raw = raw.strip()
+    if not raw.startswith("["):
+        with open(raw, encoding="utf-8") as f:
+            raw = f.read()
+    items = json.loads(raw)
+    if not isinstance(items, list) or not items:
+        raise ValueError("NEXUS_INSTANCES: ожидается непустой JSON-список")
+
+    instances, names = [], set()
+    for item in items:
+        unknown = set(item) - set(INSTANCE_FIELDS)
+        if unknown:
+            raise ValueError(f"NEXUS_INSTANCES: неизвестные поля {sorted(unknown)}")
+        values = {
+            key: os.path.expandvars(value) if isinstance(value, str) else value
+            for key, value in item.items()
+        }
+        name, url = values.get("name"), values.get("url")
+        if not name or not url or not values.get("database_url"):
+            raise ValueError(f"NEXUS_INSTANCES: у инстанса нужны name, url и database_url: {name!r}")
+        if name in names:
+            raise ValueError(f"NEXUS_INSTANCES: имя инстанса повторяется: {name}")
+        names.add(name)
+        instances.append(
+            NexusInstance(
+                name,
+                url,
+                values.get("username"),
+                values.get("password"),
+                values["database_url"],
+                values.get("database_read_url") or None,
+            )
+        )
+    return instances
+
+
+def load_instances(raw: str = NEXUS_INSTANCES) -> List[NexusInstance]:
+    if not raw.strip():
+        return [NexusInstance(NEXUS_INSTANCE_NAME, NEXUS_API_URL, NEXUS_USERNAME, NEXUS_PASSWORD)]
+    return parse_instances(raw)
+
+
+INSTANCES = load_instances()
+# Лейбл инстанса есть у всех метрик, как только задан NEXUS_INSTANCES —
+# даже с одним инстансом, чтобы добавление второго не меняло набор лейблов
+MULTI_INSTANCE = bool(NEXUS_INSTANCES.strip())
+
+_by_name: Dict[str, NexusInstance] = {instance.name: instance for instance in INSTANCES}
+_current: ContextVar[Optional[NexusInstance]] = ContextVar("nexus_instance", default=None)
+
+
+def get_instance(name: str) -> Optional[NexusInstance]:
+    return _by_name.get(name)
+
+
+def current_instance() -> NexusInstance:
+    """Инстанс, который собирает текущий поток; вне цикла сбора — первый из списка."""
+    return _current.get() or INSTANCES[0]
+
+
+def instance_name() -> str:
+    return current_instance().name
+
+
+def active_instance_name() -> Optional[str]:
+    """Имя инстанса, только если поток действительно собирает конкретный инстанс."""
+    instance = _current.get()
+    return instance.name if instance is not None else None
+
+
+@contextmanager
+def use_instance(instance: NexusInstance):
+    token = _current.set(instance)
+    try:
+        yield instance
+    finally:
+        _current.reset(token)
+
+
+def record_cycle(instance: NexusInstance, duration: float, failed: bool = False) -> None:
+    if failed:
+        INSTANCE_CYCLE_FAILURES.labels(instance.name).inc()
+        return
+    INSTANCE_CYCLE_DURATION.labels(instance.name).set(duration)
+    INSTANCE_LAST_CYCLE.labels(instance.name).set_to_current_time()
+
+
+class PerInstance:
+    """
+    Состояние коллектора, отдельное для каждого инстанса (индексы, истории
+    замеров, инкрементальные счётчики). Прозрачно проксирует атрибуты объекта
+    текущего инстанса; объект создаётся factory() при первом обращении.
+    """
+
+    def __init__(self, factory: Callable[[], object]):
+        self._factory = factory
+        self._items: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def current(self):
+        name = instance_name()
+        item = self._items.get(name)
+        if item is None:
+            with self._lock:
+                item = self._items.get(name)
+                if item is None:
+                    item = self._items[name] = self._factory()
+        return item
+
+    def __getattr__(self, attr):
+        return getattr(self.current(), attr)
+
+    def __len__(self) -> int:
+        return len(self.current())
+
+    def __contains__(self, key) -> bool:
+        return key in self.current()
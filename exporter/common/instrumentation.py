@@ -0,0 +1,121 @@
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from prometheus_client import Counter, Histogram
+
+from common.logs import logging
+from common.exposition import bump_generation
+from common.instances import INSTANCE_LABEL, MULTI_INSTANCE, instance_name
+
+
+# Коллекторы разных инстансов Nexus работают параллельно — различаем их
+COLLECTOR_LABELS = ["collector", INSTANCE_LABEL] if MULTI_INSTANCE else ["collector"]
+
+# --- Метрики самого экспортёра ---
+COLLECTOR_DURATION = Histogram(
+    "nexus_exporter_collector_duration_seconds",
+    "Длительность работы коллектора метрик",
+    COLLECTOR_LABELS,
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
+
+COLLECTOR_ERRORS = Counter(
+    "nexus_exporter_collector_errors",
+    "Коллектор завершился исключением",
+    COLLECTOR_LABELS,
+)
+
+CALL_DURATION = Histogram(
+    "nexus_exporter_call_duration_seconds",
+    "Длительность внешних вызовов (HTTP и БД)",
+    ["kind", "call"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30),
+)
+
+CALLS = Counter(
+    "nexus_exporter_calls",
+    "Количество внешних вызовов (HTTP и БД)",
+    ["kind", "call"],
+)
+
+CALL_ERRORS = Counter(
+    "nexus_exporter_call_errors",
+    "Количество ошибок внешних вызовов (HTTP и БД)",
+    ["kind", "call"],
+)
+
+HTTP_RESPONSES = Counter(
+    "nexus_exporter_http_responses",
+    "HTTP-ответы по коду статуса",
+    ["code"],
+)
+
+HTTP_RESPONSE_BYTES = Counter(
+    "nexus_exporter_http_response_bytes",
+    "Объём полученных HTTP-ответов в байтах",
+)
+
+DB_ROWS = Counter(
+    "nexus_exporter_db_rows",
+    "Количество строк, полученных из БД",
+)
+
+
+def instrumented(kind: str, call: str):
+    """Декоратор: считает вызовы, их длительность и вылетевшие наружу исключения."""
+
+    def decorator(func):
+        duration = CALL_DURATION.labels(kind=kind, call=call)
+        calls = CALLS.labels(kind=kind, call=call)
+        errors = CALL_ERRORS.labels(kind=kind, call=call)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            calls.inc()
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                duration.observe(time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+def record_call_error(kind: str, call: str) -> None:
+    CALL_ERRORS.labels(kind=kind, call=call).inc()
+
+
+def record_db_rows(count: int) -> None:
+    DB_ROWS.inc(count)
+
+
+def observe_response(response, *args, **kwargs):
+    """Хук requests.Session: код ответа и объём тела."""
+    HTTP_RESPONSES.labels(code=str(response.status_code)).inc()
+    HTTP_RESPONSE_BYTES.inc(len(response.content or b""))
+    return response
+
+
+@contextmanager
+def track_collector(name: str):
+    """Замеряет длительность коллектора и считает завершения с исключением."""
+    labels = {"collector": name}
+    if MULTI_INSTANCE:
+        labels[INSTANCE_LABEL] = instance_name()
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        COLLECTOR_ERRORS.labels(**labels).inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        COLLECTOR_DURATION.labels(**labels).observe(elapsed)
+        bump_generation()
+        logging.info(f"⏱️ Коллектор {name}: {elapsed:.2f} сек")
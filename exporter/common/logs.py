@@ -1,13 +1,115 @@
+import atexit
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import threading
+
+from common.config import LOG_LEVEL, LOG_FORMAT, LOG_ITEMS, LOG_SAMPLE_EVERY, LOG_QUEUE
+from common.instances import MULTI_INSTANCE, active_instance_name
 
 current_file = os.path.basename(__file__)
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(module)s - %(message)s",
-    handlers=[
-        logging.StreamHandler(),
-    ],
-)
-logger = logging.getLogger(current_file)
\ No newline at end of file
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(module)s - %(message)s"
+# С несколькими инстансами в строке видно, чей это цикл сбора
+MULTI_TEXT_FORMAT = "%(asctime)s - %(levelname)s - [%(nexus_instance)s] - %(module)s - %(message)s"
+
+
+class InstanceFilter(logging.Filter):
+    """Добавляет к записи имя инстанса Nexus, который собирает поток."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.nexus_instance = active_instance_name() or "-"
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна JSON-строка на запись — для Loki/ELK без парсинга регулярками."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "module": record.module,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        instance = getattr(record, "nexus_instance", "-")
+        if instance != "-":
+            entry["instance"] = instance
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def _make_formatter(log_format: str) -> logging.Formatter:
+    if log_format == "json":
+        return JsonFormatter()
+    return logging.Formatter(MULTI_TEXT_FORMAT if MULTI_INSTANCE else TEXT_FORMAT)
+
+
+def setup_logging(
+    level: str = LOG_LEVEL, log_format: str = LOG_FORMAT, use_queue: bool = LOG_QUEUE
+):
+    """
+    Настраивает корневой логгер. С use_queue запись в stderr идёт из фонового
+    потока QueueListener: коллектор только кладёт запись в очередь.
+    Возвращает QueueListener или None.
+    """
+    stream = logging.StreamHandler()
+    stream.setFormatter(_make_formatter(log_format))
+
+    listener = None
+    handler = stream
+    if use_queue:
+        records = queue.SimpleQueue()
+        handler = logging.handlers.QueueHandler(records)
+        # Оформление — на стороне listener'а; в очередь уходит только текст сообщения
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        listener = logging.handlers.QueueListener(records, stream, respect_handler_level=True)
+        listener.start()
+        atexit.register(listener.stop)
+    # Фильтр на обработчике вызывается в потоке коллектора, где известен инстанс
+    handler.addFilter(InstanceFilter())
+
+    logging.basicConfig(level=getattr(logging, level, logging.INFO), handlers=[handler], force=True)
+    return listener
+
+
+class ItemLog:
+    """
+    Лог по элементам цикла (репозиторий, задача, сертификат...).
+
+    LOG_ITEMS=summary — строки по элементам не пишутся, только итог summary();
+    sample — каждая LOG_SAMPLE_EVERY-я; all — все. Аргументы форматируются
+    лениво, только для записей, которые действительно попадут в лог.
+    """
+
+    def __init__(self, name: str, mode: str = None, sample_every: int = None):
+        self.name = name
+        self.mode = mode or LOG_ITEMS
+        self.sample_every = max(sample_every or LOG_SAMPLE_EVERY, 1)
+        self.count = 0
+        # Элементы обрабатываются и из пулов потоков
+        self._lock = threading.Lock()
+
+    def info(self, msg: str, *args) -> None:
+        with self._lock:
+            index = self.count
+            self.count += 1
+        if self.mode == "summary":
+            return
+        if self.mode == "sample" and index % self.sample_every:
+            return
+        logging.info(msg, *args, stacklevel=2)
+
+    def summary(self, msg: str = None, *args) -> None:
+        if msg is None:
+            logging.info("📋 %s: обработано %d", self.name, self.count, stacklevel=2)
+        else:
+            logging.info(msg, *args, stacklevel=2)
+
+
+setup_logging()
+logger = logging.getLogger(current_file)
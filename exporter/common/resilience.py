@@ -0,0 +1,210 @@
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+from prometheus_client import Counter, Gauge
+
+from common.logs import logging
+from common.instances import instance_name
+from common.config import (
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_TIMEOUT,
+    CYCLE_DEADLINE,
+)
+
+
+CIRCUIT_STATE = Gauge(
+    "nexus_exporter_circuit_state",
+    "Состояние предохранителя зависимости: 0 — замкнут, 1 — пробный вызов, 2 — разомкнут",
+    ["dependency"],
+)
+
+CALLS_SKIPPED = Counter(
+    "nexus_exporter_calls_skipped",
+    "Внешние вызовы, пропущенные без обращения к зависимости",
+    ["dependency", "reason"],
+)
+
+CYCLE_DEADLINE_EXCEEDED = Counter(
+    "nexus_exporter_cycle_deadline_exceeded",
+    "Циклы сбора, исчерпавшие бюджет времени CYCLE_DEADLINE",
+)
+
+
+class DependencyUnavailable(Exception):
+    """Вызов пропущен, зависимость не запрашивалась."""
+
+    reason = "unavailable"
+
+    def __init__(self, dependency: str, detail: str = ""):
+        self.dependency = dependency
+        super().__init__(f"{dependency}: {detail or self.reason}")
+
+
+class CircuitOpen(DependencyUnavailable):
+    reason = "circuit_open"
+
+
+class DeadlineExceeded(DependencyUnavailable):
+    reason = "deadline"
+
+
+class CircuitBreaker:
+    """
+    Предохранитель одной зависимости.
+
+    После failure_threshold ошибок подряд цепь размыкается, и вызовы сразу
+    получают CircuitOpen. Через reset_timeout секунд пропускается один пробный
+    вызов: успех замыкает цепь, ошибка снова размыкает её на reset_timeout.
+    """
+
+    CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout: float = CIRCUIT_RESET_TIMEOUT,
+        clock=time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started = None
+        self._set_state(self.CLOSED)
+
+    def _set_state(self, state: int) -> None:
+        self.state = state
+        CIRCUIT_STATE.labels(dependency=self.name).set(state)
+
+    def before_call(self) -> None:
+        """Пропускает вызов или бросает CircuitOpen."""
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            now = self._clock()
+            if self.state == self.OPEN and now - self._opened_at >= self.reset_timeout:
+                self._set_state(self.HALF_OPEN)
+                self._probe_started = None
+            # Один пробный вызов; если он не отчитался, через reset_timeout — следующий
+            if self.state == self.HALF_OPEN and (
+                self._probe_started is None or now - self._probe_started >= self.reset_timeout
+            ):
+                self._probe_started = now
+                logging.info(f"🔌 {self.name}: пробный вызов после размыкания")
+                return
+        raise CircuitOpen(self.name, "предохранитель разомкнут")
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            if self.state != self.CLOSED:
+                self._set_state(self.CLOSED)
+                logging.info(f"✅ {self.name}: зависимость снова отвечает, цепь замкнута")
+
+    def record_failure(self) -> None:
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logging.warning(
+                        f"⛔ {self.name}: {self._failures} ошибок подряд — вызовы "
+                        f"пропускаются {self.reset_timeout:.0f} сек"
+                    )
+                self._opened_at = self._clock()
+                self._set_state(self.OPEN)
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(dependency: str) -> CircuitBreaker:
+    breaker = _breakers.get(dependency)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.setdefault(dependency, CircuitBreaker(dependency))
+    return breaker
+
+
+def http_dependency(url: str) -> str:
+    """Зависимость HTTP-вызова — хост: у каждого upstream свой предохранитель."""
+    return urlsplit(url).netloc.lower() or url
+
+
+# --- Бюджет времени цикла сбора ---
+class _CycleBudget:
+    __slots__ = ("deadline", "reported")
+
+    def __init__(self):
+        self.deadline: Optional[float] = None
+        self.reported = False
+
+
+# У каждого инстанса Nexus свой цикл и свой бюджет: медленный инстанс
+# не съедает время остальных. Внутри инстанса бюджет общий для всех потоков.
+_budgets: Dict[str, _CycleBudget] = {}
+_budgets_lock = threading.Lock()
+
+
+def _cycle_budget() -> _CycleBudget:
+    name = instance_name()
+    budget = _budgets.get(name)
+    if budget is None:
+        with _budgets_lock:
+            budget = _budgets.setdefault(name, _CycleBudget())
+    return budget
+
+
+def start_cycle(budget: float = CYCLE_DEADLINE) -> None:
+    """Начало цикла: все внешние вызовы должны уложиться в budget секунд (0 — без лимита)."""
+    cycle = _cycle_budget()
+    cycle.deadline = time.monotonic() + budget if budget > 0 else None
+    cycle.reported = False
+
+
+def remaining() -> Optional[float]:
+    """Секунды до конца бюджета цикла; None — бюджет не задан."""
+    deadline = _cycle_budget().deadline
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def begin_call(dependency: str, timeout: float, cycle_budget: bool = True) -> float:
+    """
+    Проверяет бюджет цикла и предохранитель перед внешним вызовом.
+    Возвращает таймаут, урезанный до остатка бюджета, или бросает DependencyUnavailable.
+    cycle_budget=False — вызов проверяет только предохранитель.
+    """
+    cycle = _cycle_budget()
+    left = remaining() if cycle_budget else None
+    try:
+        if left is not None and left <= 0:
+            if not cycle.reported:
+                cycle.reported = True
+                CYCLE_DEADLINE_EXCEEDED.inc()
+                logging.warning(
+                    "⏰ Бюджет времени цикла исчерпан — внешние вызовы до конца цикла пропускаются"
+                )
+            raise DeadlineExceeded(dependency, "бюджет времени цикла исчерпан")
+        breaker_for(dependency).before_call()
+    except DependencyUnavailable as e:
+        CALLS_SKIPPED.labels(dependency=dependency, reason=e.reason).inc()
+        raise
+    return timeout if left is None else min(timeout, left)
+
+
+def end_call(dependency: str, success: bool) -> None:
+    breaker = breaker_for(dependency)
+    if success:
+        breaker.record_success()
+    else:
+        breaker.record_failure()
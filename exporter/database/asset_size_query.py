@@ -0,0 +1,86 @@
+from psycopg2 import sql
+from database.utils.query_to_db import execute_custom, HEAVY_QUERY
+from common.logs import logging
+
+
+# Один проход по asset ⋈ asset_blob формата: гистограмма по репозиториям
+# и top-K самых больших файлов. CTE используется дважды, поэтому PostgreSQL
+# материализует её и читает таблицы один раз.
+ASSET_SIZE_QUERY = """
+    WITH sized AS (
+        SELECT asset.repository_id, asset.path, blob.blob_size
+        FROM {asset} AS asset
+        JOIN {asset_blob} AS blob ON blob.asset_blob_id = asset.asset_blob_id
+    ),
+    histogram AS (
+        SELECT
+            repository_id,
+            width_bucket(blob_size, %(thresholds)s::bigint[]) AS bucket,
+            COUNT(*) AS assets,
+            SUM(blob_size) AS bytes
+        FROM sized
+        GROUP BY repository_id, bucket
+    ),
+    largest AS (
+        SELECT repository_id, path, blob_size
+        FROM sized
+        ORDER BY blob_size DESC
+        LIMIT %(top_k)s
+    )
+    SELECT 'bucket', r.name, h.bucket, NULL, h.assets, h.bytes
+    FROM histogram h
+    JOIN {content_repository} AS cr ON cr.repository_id = h.repository_id
+    JOIN repository r ON cr.config_repository_id = r.id
+    UNION ALL
+    SELECT 'largest', r.name, NULL, l.path, 1, l.blob_size
+    FROM largest l
+    JOIN {content_repository} AS cr ON cr.repository_id = l.repository_id
+    JOIN repository r ON cr.config_repository_id = r.id
+"""
+
+
+def get_asset_size_distribution(bounds, top_k: int):
+    """
+    Гистограмма размеров asset'ов по репозиториям и top-K самых больших asset'ов.
+
+    bounds — верхние границы бакетов (байт, включительно). Возвращает
+    (
+        {(repo, format): [(assets, bytes) по бакетам, последний — +Inf]},
+        [(size, repo, format, path)] по убыванию размера, не больше top_k,
+    )
+    или None при ошибке БД.
+    """
+    # width_bucket считает полуинтервалы [a, b); для целых размеров
+    # «size <= bound» то же самое, что «size < bound + 1»
+    thresholds = [int(bound) + 1 for bound in bounds]
+
+    def _exec(cur):
+        cur.execute(
+            "SELECT tablename FROM pg_catalog.pg_tables WHERE tablename LIKE %s;",
+            ("%_content_repository",),
+        )
+        formats = [t[0].replace("_content_repository", "") for t in cur.fetchall()]
+
+        histograms, largest = {}, []
+        for repo_format in formats:
+            logging.info("📐 Распределение размеров asset'ов: %s", repo_format)
+            query = sql.SQL(ASSET_SIZE_QUERY).format(
+                asset=sql.Identifier(f"{repo_format}_asset"),
+                asset_blob=sql.Identifier(f"{repo_format}_asset_blob"),
+                content_repository=sql.Identifier(f"{repo_format}_content_repository"),
+            )
+            cur.execute(query, {"thresholds": thresholds, "top_k": top_k})
+
+            for kind, repo, bucket, path, assets, size in cur.fetchall():
+                if kind == "bucket":
+                    buckets = histograms.setdefault(
+                        (repo, repo_format), [(0, 0)] * (len(thresholds) + 1)
+                    )
+                    buckets[bucket] = (int(assets), int(size or 0))
+                else:
+                    largest.append((int(size), repo, repo_format, path))
+
+        largest.sort(reverse=True)
+        return histograms, largest[:top_k]
+
+    return execute_custom(_exec, **HEAVY_QUERY)
@@ -1,8 +1,34 @@
 from database.utils.query_to_db import fetch_data
 
-def fetch_cleanup_name():
-    query = """
-        SELECT name 
-        FROM cleanup_policy
-    """
-    return fetch_data(query)
+
+# policyName хранится массивом имён, в старых версиях Nexus — строкой
+CLEANUP_COVERAGE_QUERY = """
+    WITH repo_policies AS (
+        SELECT r.name AS repository_name, p.policy_name
+        FROM repository r
+        CROSS JOIN LATERAL (
+            SELECT jsonb_array_elements_text(r.attributes::jsonb -> 'cleanup' -> 'policyName')
+            WHERE jsonb_typeof(r.attributes::jsonb -> 'cleanup' -> 'policyName') = 'array'
+            UNION ALL
+            SELECT r.attributes::jsonb -> 'cleanup' ->> 'policyName'
+            WHERE jsonb_typeof(r.attributes::jsonb -> 'cleanup' -> 'policyName') = 'string'
+        ) AS p(policy_name)
+    )
+    SELECT
+        cp.name,
+        COUNT(rp.repository_name) AS repository_count,
+        COALESCE(
+            ARRAY_AGG(rp.repository_name ORDER BY rp.repository_name)
+                FILTER (WHERE rp.repository_name IS NOT NULL),
+            '{}'
+        ) AS repositories
+    FROM cleanup_policy cp
+    LEFT JOIN repo_policies rp ON rp.policy_name = cp.name
+    GROUP BY cp.name
+    ORDER BY cp.name
+"""
+
+
+def fetch_cleanup_policy_coverage():
+    """[(policy_name, repository_count, [repository, ...]), ...] — одним запросом."""
+    return fetch_data(CLEANUP_COVERAGE_QUERY)
@@ -1,13 +1,25 @@
-from database.utils.query_to_db import fetch_data
+import time
+
+from database.utils.query_to_db import fetch_data, execute_custom, HEAVY_QUERY
+from common.config import DOCKER_TAGS_INCREMENTAL, DOCKER_TAGS_RECONCILE_INTERVAL
+from common.logs import logging
+from common.instances import PerInstance
+
 
 def fetch_docker_tags_data():
+    if DOCKER_TAGS_INCREMENTAL:
+        return DOCKER_TAG_COUNTER.refresh()
+    return fetch_docker_tags_full()
+
+
+def fetch_docker_tags_full():
     query = """
         SELECT
             dc.name AS image_name,
             r.name AS repository,
             r.recipe_name AS repo_format,
             (r.attributes::jsonb -> 'storage' ->> 'blobStoreName') AS blob,
-            COUNT(DISTINCT dc.version) AS tag_count
+            COUNT(*) AS tag_count
         FROM docker_component dc
         JOIN docker_content_repository dcr ON dc.repository_id = dcr.repository_id
         JOIN repository r ON dcr.config_repository_id = r.id
@@ -17,4 +29,178 @@ def fetch_docker_tags_data():
             r.recipe_name,
             (r.attributes::jsonb -> 'storage' ->> 'blobStoreName');
     """
-    return fetch_data(query)
+    return fetch_data(query, **HEAVY_QUERY)
+
+
+# Счётчики по (repository_id, name) без join — join с repository делаем
+# отдельно по маленькой таблице репозиториев.
+# Тег = строка docker_component: все запросы считают COUNT(*), иначе
+# одна версия в двух namespace расходилась бы с TOTALS_QUERY и каждый
+# цикл превращался бы в полную сверку
+FULL_COUNTS_QUERY = """
+    SELECT repository_id, name, COUNT(*), COALESCE(MAX(component_id), 0)
+    FROM docker_component
+    GROUP BY repository_id, name;
+"""
+
+# (repository_id, namespace, name, version) уникальны в docker_component,
+# поэтому новые компоненты можно считать через COUNT(*)
+NEW_COUNTS_QUERY = """
+    SELECT repository_id, name, COUNT(*), MAX(component_id)
+    FROM docker_component
+    WHERE component_id > %s
+    GROUP BY repository_id, name;
+"""
+
+TOTALS_QUERY = """
+    SELECT COUNT(*), COALESCE(MAX(component_id), 0)
+    FROM docker_component;
+"""
+
+REPOSITORIES_QUERY = """
+    SELECT
+        dcr.repository_id,
+        r.name,
+        r.recipe_name,
+        (r.attributes::jsonb -> 'storage' ->> 'blobStoreName')
+    FROM docker_content_repository dcr
+    JOIN repository r ON dcr.config_repository_id = r.id;
+"""
+
+
+class DockerTagCounter:
+    """
+    Инкрементальный подсчёт тегов по (образ, репозиторий).
+
+    Между полными сверками читаются только компоненты с component_id выше
+    watermark. Удаления ловятся сравнением общего числа компонентов: если оно
+    не сходится с ожидаемым — выполняется полная сверка.
+    """
+
+    def __init__(self, reconcile_interval: int = DOCKER_TAGS_RECONCILE_INTERVAL):
+        self.reconcile_interval = reconcile_interval
+        self.counts = {}
+        self.watermark = 0
+        self.total = 0
+        self.last_full_time = None
+
+    def _needs_full(self) -> bool:
+        return (
+            self.last_full_time is None
+            or time.time() - self.last_full_time >= self.reconcile_interval
+        )
+
+    def _full(self, cur) -> None:
+        cur.execute(FULL_COUNTS_QUERY)
+        counts = {}
+        watermark = 0
+        for repository_id, name, tag_count, max_id in cur.fetchall():
+            counts[(repository_id, name)] = tag_count
+            watermark = max(watermark, max_id)
+
+        self.counts = counts
+        self.watermark = watermark
+        self.total = sum(counts.values())
+        self.last_full_time = time.time()
+        logging.info(
+            f"🐳 Полная сверка тегов: {len(counts)} образов, watermark={watermark}"
+        )
+
+    def _incremental(self, cur) -> None:
+        cur.execute(TOTALS_QUERY)
+        total, max_id = cur.fetchone()
+
+        if max_id == self.watermark and total == self.total:
+            logging.info("🐳 Новых Docker-компонентов нет")
+            return
+
+        cur.execute(NEW_COUNTS_QUERY, (self.watermark,))
+        new_rows = cur.fetchall()
+        new_total = sum(row[2] for row in new_rows)
+
+        if self.total + new_total != total:
+            logging.info(
+                f"🐳 Обнаружены удалённые компоненты "
+                f"(ожидалось {self.total + new_total}, в БД {total}) — полная сверка"
+            )
+            self._full(cur)
+            return
+
+        for repository_id, name, added, row_max_id in new_rows:
+            key = (repository_id, name)
+            self.counts[key] = self.counts.get(key, 0) + added
+            self.watermark = max(self.watermark, row_max_id)
+        self.total = total
+
+        logging.info(
+            f"🐳 Инкрементально добавлено компонентов: {new_total}, watermark={self.watermark}"
+        )
+
+    def _exec(self, cur):
+        if self._needs_full():
+            self._full(cur)
+        else:
+            self._incremental(cur)
+
+        cur.execute(REPOSITORIES_QUERY)
+        repositories = {row[0]: row[1:] for row in cur.fetchall()}
+
+        result = []
+        for (repository_id, name), tag_count in self.counts.items():
+            repo = repositories.get(repository_id)
+            if repo is None or tag_count <= 0:
+                continue
+            repo_name, repo_format, blob = repo
+            result.append((name, repo_name, repo_format, blob, tag_count))
+        return result
+
+    def refresh(self) -> list:
+        """Возвращает строки (image, repository, format, blob, tag_count)."""
+        # Один снимок БД на все запросы цикла, чтобы watermark и COUNT(*) сходились
+        return (
+            execute_custom(self._exec, isolation_level="REPEATABLE READ", **HEAVY_QUERY) or []
+        )
+
+
+# Счётчики и курсор component_id — по БД каждого инстанса Nexus
+DOCKER_TAG_COUNTER = PerInstance(DockerTagCounter)
+
+
+# Возраст тегов за один проход: тег = docker_component, его размер — сумма
+# blob'ов привязанных к нему asset'ов. Возраст раскладывается по бакетам
+# width_bucket прямо в БД, наружу уходит не больше (k+1)² строк на образ.
+TAG_AGES_QUERY = """
+    WITH tags AS (
+        SELECT
+            c.repository_id,
+            c.name,
+            EXTRACT(EPOCH FROM now() - c.last_updated) / 86400 AS updated_days,
+            EXTRACT(EPOCH FROM now() - MAX(a.last_downloaded)) / 86400 AS downloaded_days,
+            COALESCE(SUM(b.blob_size), 0) AS bytes
+        FROM docker_component c
+        LEFT JOIN docker_asset a ON a.component_id = c.component_id
+        LEFT JOIN docker_asset_blob b ON b.asset_blob_id = a.asset_blob_id
+        GROUP BY c.component_id, c.repository_id, c.name, c.last_updated
+    )
+    SELECT
+        r.name,
+        t.name,
+        width_bucket(t.updated_days, %(bounds)s::float8[]),
+        width_bucket(t.downloaded_days, %(bounds)s::float8[]),
+        COUNT(*),
+        SUM(t.bytes)
+    FROM tags t
+    JOIN docker_content_repository dcr ON t.repository_id = dcr.repository_id
+    JOIN repository r ON dcr.config_repository_id = r.id
+    GROUP BY 1, 2, 3, 4;
+"""
+
+
+def fetch_docker_tag_ages(bounds) -> list:
+    """
+    Строки (repository, image, updated_bucket, downloaded_bucket, tags, bytes).
+
+    Бакет i — возраст в днях из [bounds[i-1], bounds[i]), последний — старше
+    bounds[-1]; downloaded_bucket = None, если тег ни разу не скачивали.
+    """
+    return fetch_data(TAG_AGES_QUERY, {"bounds": [float(b) for b in bounds]}, **HEAVY_QUERY)
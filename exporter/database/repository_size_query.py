@@ -1,5 +1,5 @@
 from psycopg2 import sql
-from database.utils.query_to_db import execute_custom, fetch_data
+from database.utils.query_to_db import execute_custom, fetch_data, HEAVY_QUERY
 from common.logs import logging
 
 def get_repository_sizes():
@@ -12,7 +12,7 @@ def get_repository_sizes():
         repo_sizes = {}
         for table in table_names:
             repo_type = table.replace("_content_repository", "")
-            logging.info(f"📦 Обработка репозитория типа: {repo_type}")
+            logging.debug("📦 Обработка репозитория типа: %s", repo_type)
             query = sql.SQL("""
                 SELECT r.name, SUM(blob_size)
                 FROM {} AS blob
@@ -28,7 +28,7 @@ def get_repository_sizes():
             cur.execute(query)
             repo_sizes.update(dict(cur.fetchall()))
         return repo_sizes
-    return execute_custom(_exec)
+    return execute_custom(_exec, **HEAVY_QUERY)
 
 def get_repository_data():
     query = """
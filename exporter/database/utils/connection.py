@@ -1,14 +1,33 @@
 import psycopg2
 from urllib.parse import urlparse
 from database.utils.query_to_db import logging
-from common.config import DATABASE_URL
+from common.config import DATABASE_URL, DATABASE_READ_URL, DB_CONNECT_TIMEOUT
+from common.resilience import begin_call, end_call
+from common.instances import MULTI_INSTANCE, current_instance
 
 
-def get_db_connection():
-    if not DATABASE_URL:
+def get_db_connection(isolation_level: str = None, cycle_budget: bool = True):
+    """
+    Соединение для запросов экспортёра. Экспортёр только читает, поэтому
+    при заданном DATABASE_READ_URL идёт на реплику, а сессия открывается read-only.
+    БД берётся у инстанса Nexus, который собирает текущий поток.
+    cycle_budget=False — подключение не ограничено бюджетом цикла (тяжёлые запросы).
+    """
+    instance = current_instance()
+    if instance.database_url:
+        primary_url, read_url = instance.database_url, instance.database_read_url
+    else:
+        primary_url, read_url = DATABASE_URL, DATABASE_READ_URL
+    url = read_url or primary_url
+    if not url:
         raise ValueError("DATABASE_URL не задан")
 
-    db_params = urlparse(DATABASE_URL)
+    db_params = urlparse(url)
+    dependency = "postgres-replica" if read_url else "postgres"
+    if MULTI_INSTANCE:
+        dependency = f"{dependency}:{instance.name}"
+    # DependencyUnavailable — БД недавно не отвечала или бюджет цикла исчерпан
+    timeout = begin_call(dependency, DB_CONNECT_TIMEOUT, cycle_budget=cycle_budget)
 
     try:
         conn = psycopg2.connect(
@@ -17,8 +36,18 @@ def get_db_connection():
             user=db_params.username,
             password=db_params.password,
             port=db_params.port or 5432,
+            # libpq понимает только целые секунды, меньше 2 не принимает
+            connect_timeout=max(int(timeout), 2),
+            application_name="nexus-exporter",
         )
-        return conn
+    except psycopg2.OperationalError as e:
+        end_call(dependency, False)
+        logging.error(f"Не удалось подключиться к БД: {e}")
+        raise
     except psycopg2.Error as e:
         logging.error(f"Не удалось подключиться к БД: {e}")
         raise
+    end_call(dependency, True)
+
+    conn.set_session(isolation_level=isolation_level, readonly=True)
+    return conn
@@ -0,0 +1,215 @@
+import struct
+from typing import Dict
+
+# Быстрый разбор qrtz_job_details.job_data.
+# Nexus кладёт туда org.quartz.JobDataMap с HashMap<String, String> внутри,
+# записанный java.io.ObjectOutputStream. Парсер понимает ровно эту раскладку
+# (спецификация «Java Object Serialization Stream Protocol») и бросает
+# UnsupportedJobData на всём остальном — тогда вызывающий берёт javaobj.
+
+STREAM_MAGIC = b"\xac\xed\x00\x05"
+BASE_HANDLE = 0x7E0000
+
+TC_NULL = 0x70
+TC_REFERENCE = 0x71
+TC_CLASSDESC = 0x72
+TC_OBJECT = 0x73
+TC_STRING = 0x74
+TC_BLOCKDATA = 0x77
+TC_ENDBLOCKDATA = 0x78
+TC_LONGSTRING = 0x7C
+
+SC_WRITE_METHOD = 0x01
+
+JOB_DATA_MAP = "org.quartz.JobDataMap"
+HASH_MAP = "java.util.HashMap"
+# Классы, данные которых разбираем; любой другой — повод уйти на javaobj
+KNOWN_CLASSES = frozenset(
+    (
+        JOB_DATA_MAP,
+        "org.quartz.utils.StringKeyDirtyFlagMap",
+        "org.quartz.utils.DirtyFlagMap",
+        HASH_MAP,
+    )
+)
+
+PRIMITIVES = {
+    "B": struct.Struct(">b"),
+    "C": struct.Struct(">H"),
+    "D": struct.Struct(">d"),
+    "F": struct.Struct(">f"),
+    "I": struct.Struct(">i"),
+    "J": struct.Struct(">q"),
+    "S": struct.Struct(">h"),
+    "Z": struct.Struct(">?"),
+}
+_U2 = struct.Struct(">H")
+_I4 = struct.Struct(">i")
+_HASH_MAP_HEADER = struct.Struct(">Bbii")  # TC_BLOCKDATA, длина, capacity, size
+
+
+class UnsupportedJobData(ValueError):
+    """Поток не похож на JobDataMap<String, String> — нужен универсальный парсер."""
+
+
+class _ClassDesc:
+    __slots__ = ("name", "flags", "fields", "parent")
+
+    def __init__(self, name: str, flags: int, fields: list, parent):
+        self.name = name
+        self.flags = flags
+        self.fields = fields
+        self.parent = parent
+
+    def hierarchy(self) -> list:
+        """Классы от базового к наследнику — в этом порядке идут их данные."""
+        chain, desc = [], self
+        while desc is not None:
+            chain.append(desc)
+            desc = desc.parent
+        chain.reverse()
+        return chain
+
+
+class _Reader:
+    __slots__ = ("data", "pos", "handles")
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+        self.handles = []
+
+    def take(self, size: int) -> bytes:
+        start, end = self.pos, self.pos + size
+        if end > len(self.data):
+            raise UnsupportedJobData("поток оборван")
+        self.pos = end
+        return self.data[start:end]
+
+    def byte(self) -> int:
+        if self.pos >= len(self.data):
+            raise UnsupportedJobData("поток оборван")
+        value = self.data[self.pos]
+        self.pos += 1
+        return value
+
+    def utf(self, size: int = None) -> str:
+        if size is None:
+            (size,) = _U2.unpack(self.take(2))
+        raw = self.take(size)
+        try:
+            return raw.decode("utf-8")
+        except UnicodeDecodeError:
+            # Modified UTF-8 (\0 как C0 80, суррогатные пары) — редкость, отдаём javaobj
+            raise UnsupportedJobData("modified UTF-8") from None
+
+    def reference(self):
+        (handle,) = _I4.unpack(self.take(4))
+        try:
+            return self.handles[handle - BASE_HANDLE]
+        except IndexError:
+            raise UnsupportedJobData(f"неизвестная ссылка {handle:#x}") from None
+
+    def content(self):
+        tc = self.byte()
+        if tc == TC_STRING or tc == TC_LONGSTRING:
+            size = struct.unpack(">q", self.take(8))[0] if tc == TC_LONGSTRING else None
+            value = self.utf(size)
+            self.handles.append(value)
+            return value
+        if tc == TC_REFERENCE:
+            return self.reference()
+        if tc == TC_NULL:
+            return None
+        if tc == TC_OBJECT:
+            return self.instance()
+        raise UnsupportedJobData(f"неподдерживаемый элемент потока {tc:#x}")
+
+    def class_desc(self):
+        tc = self.byte()
+        if tc == TC_NULL:
+            return None
+        if tc == TC_REFERENCE:
+            desc = self.reference()
+            if not isinstance(desc, _ClassDesc):
+                raise UnsupportedJobData("ссылка не на описание класса")
+            return desc
+        if tc != TC_CLASSDESC:
+            raise UnsupportedJobData(f"ожидалось описание класса, получено {tc:#x}")
+
+        # Handle назначается до чтения тела — так же, как в ObjectInputStream
+        index = len(self.handles)
+        self.handles.append(None)
+        name = self.utf()
+        if name not in KNOWN_CLASSES:
+            raise UnsupportedJobData(f"класс {name}")
+        _suid, flags, count = struct.unpack(">qBH", self.take(11))
+        fields = []
+        for _ in range(count):
+            type_code = chr(self.byte())
+            field_name = self.utf()
+            if type_code in "L[":
+                self.content()  # сигнатура типа поля
+            elif type_code not in PRIMITIVES:
+                raise UnsupportedJobData(f"тип поля {type_code}")
+            fields.append((type_code, field_name))
+        if self.byte() != TC_ENDBLOCKDATA:
+            raise UnsupportedJobData("аннотации класса")
+        desc = _ClassDesc(name, flags, fields, None)
+        self.handles[index] = desc
+        desc.parent = self.class_desc()
+        return desc
+
+    def instance(self) -> dict:
+        desc = self.class_desc()
+        if desc is None:
+            raise UnsupportedJobData("объект без класса")
+        values: Dict[str, object] = {}
+        self.handles.append(values)
+
+        for cls in desc.hierarchy():
+            for type_code, field_name in cls.fields:
+                if type_code in PRIMITIVES:
+                    fmt = PRIMITIVES[type_code]
+                    (values[field_name],) = fmt.unpack(self.take(fmt.size))
+                else:
+                    values[field_name] = self.content()
+            if cls.flags & SC_WRITE_METHOD:
+                if cls.name != HASH_MAP:
+                    raise UnsupportedJobData(f"writeObject у {cls.name}")
+                values["entries"] = self.hash_map_entries()
+        return values
+
+    def hash_map_entries(self) -> Dict[str, str]:
+        tc, size, _capacity, count = _HASH_MAP_HEADER.unpack(self.take(_HASH_MAP_HEADER.size))
+        if tc != TC_BLOCKDATA or size != 8 or count < 0:
+            raise UnsupportedJobData("заголовок HashMap")
+        entries = {}
+        for _ in range(count):
+            key, value = self.content(), self.content()
+            if not isinstance(key, str) or not isinstance(value, str):
+                raise UnsupportedJobData("в JobDataMap не строки")
+            entries[key] = value
+        if self.byte() != TC_ENDBLOCKDATA:
+            raise UnsupportedJobData("хвост HashMap")
+        return entries
+
+
+def decode_job_data_map(data: bytes) -> Dict[str, str]:
+    """
+    job_data задачи Quartz → {ключ: значение}.
+    Бросает UnsupportedJobData, если раскладка не JobDataMap<String, String>.
+    """
+    data = bytes(data)
+    if not data.startswith(STREAM_MAGIC):
+        raise UnsupportedJobData("нет заголовка Java-сериализации")
+    reader = _Reader(data)
+    reader.pos = len(STREAM_MAGIC)
+    if reader.byte() != TC_OBJECT:
+        raise UnsupportedJobData("в начале потока не объект")
+
+    job_data_map = reader.instance()
+    hash_map = job_data_map.get("map")
+    if not isinstance(hash_map, dict) or "entries" not in hash_map:
+        raise UnsupportedJobData("JobDataMap без HashMap")
+    return hash_map["entries"]
@@ -1,6 +1,7 @@
 import javaobj.v2 as javaobj
 from javaobj.v2.beans import JavaInstance, JavaField
 from database.utils.query_to_db import fetch_data
+from database.utils.job_data import decode_job_data_map, UnsupportedJobData
 from common.logs import logging
 
 
@@ -10,19 +11,32 @@ logging.getLogger("javaobj.parser").setLevel(logging.WARNING)
 def get_jobs_data():
     rows = fetch_data("SELECT job_data FROM qrtz_job_details ORDER BY job_name")
     result = []
+    fallbacks = 0
     for idx, (job_data_bytes,) in enumerate(rows, start=1):
         try:
             if job_data_bytes:
-                raw_obj = javaobj.loads(job_data_bytes)
-                parsed_data = convert_java(raw_obj)
+                try:
+                    parsed_data = decode_job_data_map(job_data_bytes)
+                except UnsupportedJobData as e:
+                    logging.debug("[%d] job_data разбирается javaobj: %s", idx, e)
+                    fallbacks += 1
+                    parsed_data = parse_job_data_generic(job_data_bytes)
                 if parsed_data:
                     result.append(parsed_data)
         except Exception as e:
             logging.error(f"[{idx}] Ошибка при парсинге job_data: {e}")
-    logging.info(f"Получено задач: {len(result)}")
+    if fallbacks:
+        logging.info(f"Получено задач: {len(result)} (через javaobj: {fallbacks})")
+    else:
+        logging.info(f"Получено задач: {len(result)}")
     return result
 
 
+def parse_job_data_generic(job_data_bytes) -> dict:
+    """Универсальный (медленный) разбор через javaobj — для нестандартных job_data."""
+    return convert_java(javaobj.loads(job_data_bytes))
+
+
 def convert_java(obj):
     if obj is None:
         return None
@@ -38,11 +52,12 @@ def convert_java(obj):
                         if isinstance(sub_value, dict):
                             return {str(k): str(v) for k, v in sub_value.items()}
             return {}
-        return {
-            str(field_name): convert_java(field_obj)
-            for field_name, field_obj in fields.items()
-            if convert_java(field_obj) is not None
-        }
+        result = {}
+        for field_name, field_obj in fields.items():
+            value = convert_java(field_obj)
+            if value is not None:
+                result[str(field_name)] = value
+        return result
     if isinstance(obj, dict):
         return {str(k): convert_java(v) for k, v in obj.items() if v is not None}
     return str(obj) if obj is not None else None
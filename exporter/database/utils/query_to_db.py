@@ -1,41 +1,108 @@
+from psycopg2.errors import QueryCanceled
+
 from common.logs import logging
 from database.utils.connection import get_db_connection
+from common.config import (
+    DB_STATEMENT_TIMEOUT,
+    DB_HEAVY_STATEMENT_TIMEOUT,
+    DB_HEAVY_WORK_MEM,
+)
+from common.instrumentation import instrumented, record_call_error, record_db_rows
+from common.resilience import DependencyUnavailable, remaining
+
+
+# Настройки для тяжёлых агрегаций (GROUP BY по всем компонентам/asset'ам):
+# fetch_data(query, **HEAVY_QUERY). Бюджет цикла их не урезает — иначе
+# DB_HEAVY_STATEMENT_TIMEOUT никогда не действовал бы целиком.
+HEAVY_QUERY = {
+    "statement_timeout": DB_HEAVY_STATEMENT_TIMEOUT,
+    "work_mem": DB_HEAVY_WORK_MEM,
+    "cycle_budget": False,
+}
+
+
+def _configure(cur, statement_timeout: float, work_mem: str, cycle_budget: bool = True) -> None:
+    """SET LOCAL для текущей транзакции: действует только на этот запрос."""
+    left = remaining() if cycle_budget else None
+    if left is not None:
+        # Запрос не должен пережить бюджет цикла
+        statement_timeout = min(statement_timeout or left, max(left, 1))
+    if statement_timeout:
+        cur.execute(
+            "SELECT set_config('statement_timeout', %s, true)",
+            (f"{int(statement_timeout * 1000)}ms",),
+        )
+    if work_mem:
+        cur.execute("SELECT set_config('work_mem', %s, true)", (work_mem,))
 
 
-def fetch_data(query: str, params=None):
-    """Выполняет SELECT-запрос с логированием"""
+def _log_error(call: str, e: Exception, **kwargs) -> None:
+    if isinstance(e, QueryCanceled):
+        logging.error(f"⏱️ Запрос прерван по statement_timeout ({call}): {e}")
+    else:
+        logging.error(f"Ошибка при выполнении запроса ({call}): {e}", **kwargs)
+    record_call_error("db", call)
+
+
+@instrumented("db", "fetch_data")
+def fetch_data(
+    query: str,
+    params=None,
+    statement_timeout: float = DB_STATEMENT_TIMEOUT,
+    work_mem: str = None,
+    cycle_budget: bool = True,
+):
+    """
+    Выполняет SELECT-запрос с логированием.
+    cycle_budget=False — запрос не урезается и не пропускается бюджетом цикла.
+    """
     conn = None
     result = []
     if params:
-        logging.info(f"Параметры: {params}")
+        logging.debug("Параметры: %s", params)
     try:
-        conn = get_db_connection()
+        conn = get_db_connection(cycle_budget=cycle_budget)
         with conn.cursor() as cur:
+            _configure(cur, statement_timeout, work_mem, cycle_budget)
             cur.execute(query, params or ())
             result = cur.fetchall()
-        logging.info(f"Получено строк: {len(result)}")
+        record_db_rows(len(result))
+        logging.info("Получено строк: %d", len(result))
+    except DependencyUnavailable as e:
+        logging.warning(f"⏭️ Запрос к БД пропущен: {e}")
     except Exception as e:
-        logging.error(f"Ошибка при выполнении запроса: {e}")
+        _log_error("fetch_data", e)
     finally:
         if conn:
             conn.close()
-            logging.info("Соединение закрыто")
+            logging.debug("Соединение закрыто")
     return result
 
 
-def execute_custom(exec_func):
+@instrumented("db", "execute_custom")
+def execute_custom(
+    exec_func,
+    statement_timeout: float = DB_STATEMENT_TIMEOUT,
+    work_mem: str = None,
+    isolation_level: str = None,
+    cycle_budget: bool = True,
+):
     """
     Универсальный метод для сложных запросов (с psycopg2.sql или нестандартной логикой).
     exec_func — функция, которая принимает cursor и сама выполняет всё, что нужно.
+    statement_timeout действует на каждый запрос exec_func.
     """
     conn = None
     try:
-        conn = get_db_connection()
+        conn = get_db_connection(isolation_level, cycle_budget=cycle_budget)
         with conn.cursor() as cur:
+            _configure(cur, statement_timeout, work_mem, cycle_budget)
             return exec_func(cur)
+    except DependencyUnavailable as e:
+        logging.warning(f"⏭️ Запрос к БД пропущен: {e}")
     except Exception as e:
-        logging.error(f"Ошибка при выполнении кастомного запроса: {e}", exc_info=True)
+        _log_error("execute_custom", e, exc_info=True)
     finally:
         if conn:
             conn.close()
-            logging.info("Соединение закрыто")
+            logging.debug("Соединение закрыто")
@@ -1,16 +1,24 @@
+import threading
 import time
 from common.logs import logging
 
-from common.config import get_auth
-from common.config import NEXUS_API_URL, LAUNCH_INTERVAL, REPO_METRICS_INTERVAL
-
-from prometheus_client import start_http_server
-
+from common.config import LAUNCH_INTERVAL, REPO_METRICS_INTERVAL
+from common.config import ASSET_METRICS_INTERVAL
+from common.config import WARM_START_FILE, METRICS_PORT
+from common.exposition import start_metrics_server
+from common.instrumentation import track_collector
+from common.instances import INSTANCES, record_cycle, use_instance
+from common.resilience import start_cycle
+from metrics.utils.catalog import CATALOG
+from metrics.utils.warm_start import load_snapshot, save_snapshot
+from metrics.utils.push import start_push
 
 from metrics.repo_status import fetch_repositories_metrics
 from metrics.repo_size import fetch_repository_metrics
 from metrics.blobs_size import fetch_blob_metrics
 from metrics.docker_tags import fetch_docker_tags_metrics
+from metrics.docker_tag_ages import fetch_docker_tag_age_metrics
+from metrics.asset_sizes import fetch_asset_size_metrics
 from metrics.tasks import (
     fetch_task_metrics,
     fetch_all_blob_and_repo_metrics,
@@ -19,75 +27,165 @@ from metrics.tasks import (
 
 # from metrics.docker_ports import fetch_docker_ports
 from metrics.cleanup_policy import fetch_cleanup_policy_usage
-from metrics.certificates_expired import fetch_cert_lifetime_metrics
-
+from metrics.certificates_expired import (
+    fetch_cert_lifetime_metrics,
+    refresh_cert_days_left,
+)
 
-def main():
-    start_http_server(8000)
-    auth = get_auth()
 
-    logging.info("Метрики VictoriaMetrics доступны на :8000")
+def collect_cycle(nexus_url: str, auth: tuple, current_time: float, state: dict) -> None:
+    """Один цикл сбора текущего инстанса Nexus."""
+    CATALOG.begin_cycle()
+    start_cycle()
 
-    # Запускаем сбор метрик репозиториев сразу
-    logging.info("Первичный запуск сбора статуса репозиториев типа Proxy...")
-    fetch_repositories_metrics(NEXUS_API_URL, auth)
+    if current_time - state["last_repo_metrics_time"] >= REPO_METRICS_INTERVAL:
+        logging.info(
+            "Периодический запуск сбора статуса репозиториев типа Proxy..."
+        )
+        with track_collector("repo_status"):
+            fetch_repositories_metrics(nexus_url, auth)
 
-    logging.info("Первичный запуск сбора Docker портов...")
-    # fetch_docker_ports(NEXUS_API_URL, get_auth())
+        logging.info("Периодический запуск сбора Docker портов...")
+        # fetch_docker_ports(nexus_url, auth)
 
-    logging.info("Первичный запуск сбора НЕ используемых политик...")
-    fetch_cleanup_policy_usage(NEXUS_API_URL, auth)
+        logging.info("Периодический запуск сбора НЕ используемых политик...")
+        with track_collector("cleanup_policy"):
+            fetch_cleanup_policy_usage()
 
-    logging.info("Первичный запуск сбора сертификатов...")
-    fetch_cert_lifetime_metrics(NEXUS_API_URL, auth)
+        logging.info("Периодический запуск сбора сертификатов...")
+        with track_collector("certificates"):
+            fetch_cert_lifetime_metrics(nexus_url, auth)
 
-    logging.info("Первичный запуск сбора повисших задач...")
-    fetch_all_blob_and_repo_metrics(NEXUS_API_URL, auth)
+        logging.info("Периодический запуск сбора возраста Docker тегов...")
+        with track_collector("docker_tag_ages"):
+            fetch_docker_tag_age_metrics()
 
-    last_repo_metrics_time = time.time()
+        logging.info("Периодический запуск сбора кастомных повисших конфигов...")
+        # fetch_custom_policy_metrics(nexus_url, auth)
 
-    while True:
-        current_time = time.time()
+        state["last_repo_metrics_time"] = current_time
+    else:
+        # Truststore не перечитываем — только пересчитываем days_left
+        refresh_cert_days_left()
 
-        if current_time - last_repo_metrics_time >= REPO_METRICS_INTERVAL:
-            logging.info(
-                "Периодический запуск сбора статуса репозиториев типа Proxy..."
-            )
-            fetch_repositories_metrics(NEXUS_API_URL, auth)
+    logging.info("Запуск сбора размера блобов...")
+    with track_collector("blobs"):
+        fetch_blob_metrics(nexus_url, auth)
 
-            logging.info("Периодический запуск сбора Docker портов...")
-            # fetch_docker_ports(NEXUS_API_URL, get_auth())
+    logging.info("Запуск сбора размера репозиториев и наличие задач очистки...")
+    with track_collector("repo_size"):
+        fetch_repository_metrics()
 
-            logging.info("Периодический запуск сбора НЕ используемых политик...")
-            fetch_cleanup_policy_usage(NEXUS_API_URL, auth)
+    logging.info("Запуск сбора задач...")
+    with track_collector("tasks"):
+        fetch_task_metrics(nexus_url, auth)
 
-            logging.info("Периодический запуск сбора сертификатов...")
-            fetch_cert_lifetime_metrics(NEXUS_API_URL, auth)
+    logging.info("Запуск сбора повисших задач...")
+    with track_collector("task_matches"):
+        fetch_all_blob_and_repo_metrics(nexus_url, auth)
 
-            logging.info("Периодический запуск сбора повисших задач...")
-            fetch_all_blob_and_repo_metrics(NEXUS_API_URL, auth)
+    logging.info("Запуск сбора Docker тегов...")
+    with track_collector("docker_tags"):
+        fetch_docker_tags_metrics()
 
-            logging.info("Периодический запуск сбора кастомных повисших конфигов...")
-            # fetch_custom_policy_metrics(NEXUS_API_URL, auth)
+    if current_time - state["last_asset_metrics_time"] >= ASSET_METRICS_INTERVAL:
+        logging.info("Запуск сбора распределения размеров asset'ов...")
+        with track_collector("asset_sizes"):
+            # Прерванный сбор повторяется в следующем цикле, а не через интервал
+            if fetch_asset_size_metrics():
+                state["last_asset_metrics_time"] = current_time
 
-            last_repo_metrics_time = current_time
 
-        logging.info("Запуск сбора размера блобов...")
-        fetch_blob_metrics(NEXUS_API_URL, auth)
+def initial_collection(nexus_url: str, auth: tuple) -> None:
+    """Первичный запуск сразу после старта."""
+    # Запускаем сбор метрик репозиториев сразу
+    CATALOG.begin_cycle()
+    logging.info("Первичный запуск сбора статуса репозиториев типа Proxy...")
+    with track_collector("repo_status"):
+        fetch_repositories_metrics(nexus_url, auth)
 
-        logging.info("Запуск сбора размера репозиториев и наличие задач очистки...")
-        fetch_repository_metrics()
+    logging.info("Первичный запуск сбора Docker портов...")
+    # fetch_docker_ports(nexus_url, auth)
 
-        logging.info("Запуск сбора задач...")
-        fetch_task_metrics(NEXUS_API_URL, auth)
+    logging.info("Первичный запуск сбора НЕ используемых политик...")
+    with track_collector("cleanup_policy"):
+        fetch_cleanup_policy_usage()
 
-        logging.info("Запуск сбора повисших задач...")
-        fetch_all_blob_and_repo_metrics(NEXUS_API_URL, auth)
+    logging.info("Первичный запуск сбора сертификатов...")
+    with track_collector("certificates"):
+        fetch_cert_lifetime_metrics(nexus_url, auth)
+
+    logging.info("Первичный запуск сбора возраста Docker тегов...")
+    with track_collector("docker_tag_ages"):
+        fetch_docker_tag_age_metrics()
+
+
+def run_instance(instance) -> None:
+    """
+    Бесконечный цикл сбора одного инстанса Nexus. У каждого инстанса свой
+    поток, свои интервалы и свой бюджет времени цикла: медленный или
+    недоступный Nexus не задерживает остальные.
+    """
+    with use_instance(instance):
+        nexus_url, auth = instance.api_url, instance.auth
+
+        try:
+            initial_collection(nexus_url, auth)
+        except Exception as e:
+            record_cycle(instance, 0, failed=True)
+            logging.exception(f"❌ Первичный сбор {instance.name} прерван: {e}")
+
+        state = {
+            # Повисшие задачи собираются в первой же итерации цикла
+            "last_repo_metrics_time": time.time(),
+            # Распределение размеров — в первой итерации, дальше раз в ASSET_METRICS_INTERVAL
+            "last_asset_metrics_time": 0,
+        }
+
+        while True:
+            current_time = time.time()
+            try:
+                collect_cycle(nexus_url, auth, current_time, state)
+            except Exception as e:
+                # Ошибка одного инстанса не должна останавливать его сбор навсегда
+                record_cycle(instance, 0, failed=True)
+                logging.exception(f"❌ Цикл сбора {instance.name} прерван: {e}")
+            else:
+                record_cycle(instance, time.time() - current_time)
+
+            if WARM_START_FILE:
+                save_snapshot()
+
+            time.sleep(LAUNCH_INTERVAL)
 
-        logging.info("Запуск сбора Docker тегов...")
-        fetch_docker_tags_metrics()
 
-        time.sleep(LAUNCH_INTERVAL)
+def main():
+    # Пока идёт первый проход, отдаём значения прошлого запуска
+    if WARM_START_FILE:
+        load_snapshot()
+
+    start_metrics_server(METRICS_PORT)
+    start_push()
+
+    logging.info(f"Метрики VictoriaMetrics доступны на :{METRICS_PORT}")
+
+    if len(INSTANCES) == 1:
+        run_instance(INSTANCES[0])
+        return
+
+    logging.info(
+        f"🏢 Инстансов Nexus: {len(INSTANCES)} ({', '.join(i.name for i in INSTANCES)})"
+    )
+    threads = [
+        threading.Thread(
+            target=run_instance, args=(instance,), name=f"nexus-{instance.name}", daemon=True
+        )
+        for instance in INSTANCES
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
 
 
 if __name__ == "__main__":
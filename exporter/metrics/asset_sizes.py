@@ -0,0 +1,96 @@
+import math
+
+from common.logs import logging
+from common.config import ASSET_SIZE_BUCKETS, ASSET_TOP_K
+from metrics.utils.snapshot import SnapshotGauge
+from database.asset_size_query import get_asset_size_distribution
+
+
+# Кумулятивные бакеты как у гистограммы Prometheus: работает histogram_quantile()
+REPO_ASSET_COUNT = SnapshotGauge(
+    "nexus_repo_asset_size_bucket",
+    "Number of assets in the repository with blob size <= le bytes",
+    ["repo_name", "repo_format", "le"],
+)
+
+REPO_ASSET_BYTES = SnapshotGauge(
+    "nexus_repo_asset_size_bucket_bytes",
+    "Total size of assets in the repository with blob size <= le bytes",
+    ["repo_name", "repo_format", "le"],
+)
+
+LARGEST_ASSETS = SnapshotGauge(
+    "nexus_largest_asset_bytes",
+    "Largest assets across all repositories (top K)",
+    ["repo_name", "repo_format", "path", "rank"],
+)
+
+
+def parse_buckets(raw: str) -> list:
+    """
+    '1024,1048576' → [1024, 1048576] (по возрастанию, без дублей).
+    Пропускает мусор, +Inf (его бакет добавляется сам) и значения <= 0.
+    """
+    bounds = set()
+    for item in raw.split(","):
+        if not item.strip():
+            continue
+        try:
+            value = float(item)
+        except ValueError:
+            value = math.nan
+        if not math.isfinite(value) or int(value) <= 0:
+            logging.warning(f"⚠️ Некорректная граница бакета: '{item}'")
+            continue
+        bounds.add(int(value))
+    return sorted(bounds)
+
+
+BUCKET_BOUNDS = parse_buckets(ASSET_SIZE_BUCKETS)
+
+
+def format_bound(bound) -> str:
+    return "+Inf" if bound is None else str(bound)
+
+
+def update_asset_metrics(histograms: dict, largest: list, bounds=BUCKET_BOUNDS) -> None:
+    counts = REPO_ASSET_COUNT.buffer()
+    sizes = REPO_ASSET_BYTES.buffer()
+    top = LARGEST_ASSETS.buffer()
+    labels_le = [format_bound(b) for b in bounds] + [format_bound(None)]
+
+    for (repo_name, repo_format), buckets in histograms.items():
+        assets_total, bytes_total = 0, 0
+        for le, (assets, size) in zip(labels_le, buckets):
+            assets_total += assets
+            bytes_total += size
+            counts.labels(repo_name, repo_format, le).set(assets_total)
+            sizes.labels(repo_name, repo_format, le).set(bytes_total)
+
+    for rank, (size, repo_name, repo_format, path) in enumerate(largest, start=1):
+        top.labels(repo_name, repo_format, path, str(rank)).set(size)
+        logging.info("🐘 #%d %s%s: %d байт", rank, repo_name, path, size)
+
+    REPO_ASSET_COUNT.publish(counts)
+    REPO_ASSET_BYTES.publish(sizes)
+    LARGEST_ASSETS.publish(top)
+
+
+def fetch_asset_size_metrics() -> bool:
+    """
+    Гистограммы размеров asset'ов и самые большие файлы — одним запросом на формат.
+    Тяжёлый сбор: запускается раз в ASSET_METRICS_INTERVAL, между запусками
+    отдаётся прошлый снимок. False — данные не получены, сбор нужно повторить.
+    """
+    logging.info("📐 Сбор распределения размеров asset'ов...")
+    result = get_asset_size_distribution(BUCKET_BOUNDS, ASSET_TOP_K)
+    if not result:
+        logging.warning("⚠️ Распределение размеров не получено — остаются прошлые значения")
+        return False
+
+    histograms, largest = result
+    update_asset_metrics(histograms, largest)
+    logging.info(
+        f"✅ Распределение размеров: репозиториев {len(histograms)}, top-{len(largest)} asset'ов"
+    )
+    return True
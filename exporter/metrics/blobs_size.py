@@ -1,50 +1,105 @@
-from common.logs import logging
-import requests
+import asyncio
+import urllib.parse
+from collections import deque
+from typing import Dict, Optional
+
+from common.logs import logging, ItemLog
+from common.config import BLOB_HISTORY_SAMPLES
+from common.instances import PerInstance
 import urllib3
-from prometheus_client import Gauge
+from metrics.utils.snapshot import SnapshotGauge
+from metrics.utils.catalog import get_catalog
+from metrics.utils.api_async import run_with_client
+from metrics.utils.history import SizeHistory, growth_rate
 
 # Отключаем ворнинги и лишние логи от urllib3
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 # Prometheus метрика
-BLOB_STORAGE_USAGE = Gauge(
+BLOB_STORAGE_USAGE = SnapshotGauge(
     "nexus_blob_storage_usage",
     "Total used and available space in Nexus blob stores",
-    ["blob_name", "metric_type", "blob_type", "blob_count", "blob_quota"],
+    ["blob_name", "metric_type", "blob_type"],
 )
 
-BLOB_QUOTA = Gauge(
+# Число blob'ов меняется с каждой загрузкой — значение, а не лейбл
+BLOB_COUNT = SnapshotGauge(
+    "nexus_blob_count",
+    "Number of blobs in the blob store",
+    ["blob_name"],
+)
+
+BLOB_QUOTA = SnapshotGauge(
     "nexus_blob_quota",
     "The quota allocated for each blob",
     ["blob_name"],
 )
 
+BLOB_QUOTA_VIOLATION = SnapshotGauge(
+    "nexus_blob_quota_violation",
+    "Blob store quota status from Nexus (1 = violated, 0 = ok)",
+    ["blob_name"],
+)
+
+BLOB_FILL_RATIO = SnapshotGauge(
+    "nexus_blob_fill_ratio",
+    "Used share of blob store capacity (used / (used + available))",
+    ["blob_name"],
+)
+
+BLOB_GROWTH_RATE = SnapshotGauge(
+    "nexus_blob_growth_bytes_per_second",
+    "Blob store growth rate over the in-memory sample window",
+    ["blob_name"],
+)
+
+BLOB_TIME_TO_QUOTA = SnapshotGauge(
+    "nexus_blob_quota_seconds_left",
+    "Projected seconds until the blob store reaches its soft quota at the current growth rate",
+    ["blob_name"],
+)
+
+BLOB_TIME_TO_FULL = SnapshotGauge(
+    "nexus_blob_full_seconds_left",
+    "Projected seconds until the blob store runs out of available space at the current growth rate",
+    ["blob_name"],
+)
+
+# Скользящее окно (timestamp, used_bytes) по каждому blobstore
+BLOB_HISTORY = PerInstance(lambda: SizeHistory(BLOB_HISTORY_SAMPLES))
+
 
 def get_blobstores(nexus_url: str, auth: tuple) -> list | None:
-    """Получает список blobstores из Nexus API."""
-    session = requests.Session()
-    adapter = requests.adapters.HTTPAdapter(max_retries=3)
-    session.mount("https://", adapter)
-    session.mount("http://", adapter)
+    """Получает список blobstores из общего каталога Nexus."""
+    blobstores = get_catalog(nexus_url, "blobstores", auth)
+    return list(blobstores) if blobstores else None
 
-    try:
-        response = session.get(
-            f"{nexus_url}/service/rest/v1/blobstores",
-            auth=auth,
-            verify=False,
-            timeout=10,
+
+def get_blob_details(nexus_url: str, auth: tuple, blobstores: list) -> Dict[str, dict]:
+    """Параллельно получает настройки и статус квоты каждого blobstore."""
+
+    async def _one(client, blob):
+        name = blob["name"]
+        encoded = urllib.parse.quote(name, safe="")
+        blob_type = str(blob.get("type", "")).lower()
+        detail, quota_status = await asyncio.gather(
+            client.get_from_nexus(nexus_url, f"blobstores/{blob_type}/{encoded}", auth),
+            client.get_from_nexus(nexus_url, f"blobstores/{encoded}/quota-status", auth),
         )
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.ConnectionError:
-        logging.error(f"❌ Не удалось подключиться к Nexus: {nexus_url}")
-    except requests.exceptions.Timeout:
-        logging.error(f"⏳ Таймаут при подключении к Nexus: {nexus_url}")
-    except requests.exceptions.HTTPError as e:
-        logging.error(f"⚠️ HTTP {e.response.status_code}: {e.response.reason}")
-    except requests.exceptions.RequestException as e:
-        logging.error(f"❗ Ошибка при запросе к Nexus: {e}")
-    return None
+        return name, {
+            "detail": detail if isinstance(detail, dict) else {},
+            "quota_status": quota_status if isinstance(quota_status, dict) else {},
+        }
+
+    async def _fetch(client):
+        results = await asyncio.gather(*(_one(client, b) for b in blobstores))
+        return dict(results)
+
+    try:
+        return run_with_client(_fetch)
+    except Exception as e:
+        logging.error(f"❌ Ошибка при получении деталей blobstore: {e}")
+        return {}
 
 
 def get_quota(data: dict):
@@ -53,38 +108,103 @@ def get_quota(data: dict):
     return quota.get("limit") if quota else None
 
 
-def update_metrics(blobstores: list) -> None:
+def get_quota_type(data: dict) -> Optional[str]:
+    quota = data.get("softQuota")
+    return quota.get("type") if quota else None
+
+
+def record_sample(blob_name: str, used: float, now: float = None) -> deque:
+    return BLOB_HISTORY.record(blob_name, used, now)
+
+
+def seconds_until(remaining: float, rate: Optional[float]) -> Optional[float]:
+    if rate is None or rate <= 0:
+        return None
+    return max(remaining, 0) / rate
+
+
+def update_metrics(blobstores: list, details: Dict[str, dict] = None) -> None:
     """Обновляет метрики Prometheus по полученным blobstores."""
-    BLOB_STORAGE_USAGE.clear()
-    BLOB_QUOTA.clear()
+    details = details or {}
+    # История удалённых blobstore не нужна
+    BLOB_HISTORY.retain(blob["name"] for blob in blobstores)
+    usage = BLOB_STORAGE_USAGE.buffer()
+    counts = BLOB_COUNT.buffer()
+    items = ItemLog("blobs")
+    quotas = BLOB_QUOTA.buffer()
+    violations = BLOB_QUOTA_VIOLATION.buffer()
+    fill_ratios = BLOB_FILL_RATIO.buffer()
+    growth_rates = BLOB_GROWTH_RATE.buffer()
+    time_to_quota = BLOB_TIME_TO_QUOTA.buffer()
+    time_to_full = BLOB_TIME_TO_FULL.buffer()
+
     for blob in blobstores:
-        quota = get_quota(blob)
-
-        BLOB_STORAGE_USAGE.labels(
-            blob_name=blob["name"],
-            metric_type="used",
-            blob_count=str(blob["blobCount"]),
-            blob_type=blob["type"],
-            blob_quota=str(quota),
-        ).set(blob["totalSizeInBytes"])
-
-        BLOB_STORAGE_USAGE.labels(
-            blob_name=blob["name"],
-            metric_type="available",
-            blob_count=str(blob["blobCount"]),
-            blob_type=blob["type"],
-            blob_quota=str(quota),
-        ).set(blob["availableSpaceInBytes"])
+        blob_details = details.get(blob["name"], {})
+        detail = blob_details.get("detail", {})
+        quota_status = blob_details.get("quota_status", {})
 
-        if quota:
-            BLOB_QUOTA.labels(blob_name=blob.get("name")).set(int(quota))
+        # Квота из детального эндпоинта приоритетнее, чем из списка
+        quota = get_quota(detail) or get_quota(blob)
+        quota_type = get_quota_type(detail) or get_quota_type(blob)
+
+        used = blob["totalSizeInBytes"]
+        available = blob["availableSpaceInBytes"]
 
-        logging.info(
-            f"[{blob['name']}] used: {blob['totalSizeInBytes']} | "
-            f"available: {blob['availableSpaceInBytes']} | "
-            f"type: {blob['type']} | count: {blob['blobCount']} | quota: {quota}"
+        usage.labels(
+            blob_name=blob["name"], metric_type="used", blob_type=blob["type"]
+        ).set(used)
+
+        usage.labels(
+            blob_name=blob["name"], metric_type="available", blob_type=blob["type"]
+        ).set(available)
+
+        counts.labels(blob_name=blob["name"]).set(blob["blobCount"])
+
+        if quota:
+            quotas.labels(blob_name=blob.get("name")).set(int(quota))
+
+        if "isViolation" in quota_status:
+            violations.labels(blob_name=blob["name"]).set(
+                1 if quota_status["isViolation"] else 0
+            )
+
+        capacity = used + available
+        if capacity > 0:
+            fill_ratios.labels(blob_name=blob["name"]).set(used / capacity)
+
+        rate = growth_rate(record_sample(blob["name"], used))
+        if rate is not None:
+            growth_rates.labels(blob_name=blob["name"]).set(rate)
+
+            full_left = seconds_until(available, rate)
+            if full_left is not None:
+                time_to_full.labels(blob_name=blob["name"]).set(full_left)
+
+            if quota:
+                # spaceRemainingQuota — порог по свободному месту, spaceUsedQuota — по занятому
+                if quota_type == "spaceRemainingQuota":
+                    quota_left = seconds_until(available - int(quota), rate)
+                else:
+                    quota_left = seconds_until(int(quota) - used, rate)
+                if quota_left is not None:
+                    time_to_quota.labels(blob_name=blob["name"]).set(quota_left)
+
+        items.info(
+            "[%s] used: %s | available: %s | type: %s | count: %s | quota: %s | rate: %s B/s",
+            blob["name"], used, available, blob["type"], blob["blobCount"], quota,
+            rate if rate is not None else "—",
         )
 
+    BLOB_STORAGE_USAGE.publish(usage)
+    BLOB_COUNT.publish(counts)
+    BLOB_QUOTA.publish(quotas)
+    BLOB_QUOTA_VIOLATION.publish(violations)
+    BLOB_FILL_RATIO.publish(fill_ratios)
+    BLOB_GROWTH_RATE.publish(growth_rates)
+    BLOB_TIME_TO_QUOTA.publish(time_to_quota)
+    BLOB_TIME_TO_FULL.publish(time_to_full)
+    items.summary()
+
 
 def fetch_blob_metrics(nexus_url: str, auth: tuple) -> None:
     """Основная функция — получение blobstore и обновление метрик."""
@@ -94,4 +214,5 @@ def fetch_blob_metrics(nexus_url: str, auth: tuple) -> None:
         logging.warning("🚫 Нет данных о blobstore. Метрики не обновлены.")
         return
 
-    update_metrics(blobstores)
+    details = get_blob_details(nexus_url, auth, blobstores)
+    update_metrics(blobstores, details)
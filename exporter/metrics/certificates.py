@@ -1,10 +1,10 @@
 ## надо подумать как сразу серты закидывать а не мониторить
-from common.logs import logging
-from prometheus_client import Gauge
-from metrics.utils.api import get_from_nexus
+from common.logs import logging, ItemLog
+from metrics.utils.snapshot import SnapshotGauge
+from metrics.utils.catalog import get_catalog
 
 
-CERT_MATCH_STATUS = Gauge(
+CERT_MATCH_STATUS = SnapshotGauge(
     "nexus_cert_url_match",
     "Совпадение SSL-сертификатов с remote URL в proxy-репозиториях Nexus",
     ["repo_name", "remote_url", "subject_common_name", "match_level"],
@@ -24,11 +24,9 @@ def match_level(cert_cn: str, remote_url: str) -> int:
 
 
 def update_cert_match_metrics(nexus_url: str, auth: tuple):
-    CERT_MATCH_STATUS.clear()
-
     try:
-        certs = get_from_nexus(nexus_url, "security/ssl/truststore", auth)
-        repos = get_from_nexus(nexus_url, "repositories", auth)
+        certs = get_catalog(nexus_url, "security/ssl/truststore", auth)
+        repos = get_catalog(nexus_url, "repositories", auth)
     except Exception as e:
         logging.error(f"Ошибка при получении данных из Nexus: {e}")
         return
@@ -45,6 +43,10 @@ def update_cert_match_metrics(nexus_url: str, auth: tuple):
         if r.get("type") == "proxy"
     ]
 
+    matches = CERT_MATCH_STATUS.buffer()
+    items = ItemLog("cert_match")
+    unmatched = 0
+
     for repo in repos:
         remote = repo["remote"]
         name = repo["name"]
@@ -60,24 +62,30 @@ def update_cert_match_metrics(nexus_url: str, auth: tuple):
                 best_cert_cn = cn
 
         if best_level > 0 and best_cert_cn:
-            CERT_MATCH_STATUS.labels(
+            matches.labels(
                 repo_name=name,
                 remote_url=remote,
                 subject_common_name=best_cert_cn,
                 match_level=str(best_level),
             ).set(best_level)
 
-            logging.info(
-                f"✔️ Совпадение: Repo='{name}', URL='{remote}', CN='{best_cert_cn}', Уровень={best_level}"
+            items.info(
+                "✔️ Совпадение: Repo='%s', URL='%s', CN='%s', Уровень=%d",
+                name, remote, best_cert_cn, best_level,
             )
         else:
-            CERT_MATCH_STATUS.labels(
+            matches.labels(
                 repo_name=name,
                 remote_url=remote,
                 subject_common_name="(none)",
                 match_level="0",
             ).set(0)
 
-            logging.info(
-                f"⚠️ Нет совпадений: Repo='{name}', URL='{remote}' → ни один сертификат не подошёл"
-            )
\ No newline at end of file
+            unmatched += 1
+            items.info(
+                "⚠️ Нет совпадений: Repo='%s', URL='%s' → ни один сертификат не подошёл",
+                name, remote,
+            )
+
+    CERT_MATCH_STATUS.publish(matches)
+    items.summary("🔐 Проверено proxy-репозиториев: %d, без сертификата: %d", items.count, unmatched)
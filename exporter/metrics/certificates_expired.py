@@ -1,11 +1,15 @@
-from datetime import datetime, timezone
+import threading
+import time
 from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Optional
 from common.logs import logging
-from prometheus_client import Gauge
-from metrics.utils.api import get_from_nexus
+from common.instances import PerInstance
+from metrics.utils.snapshot import SnapshotGauge
+from metrics.utils.catalog import get_catalog
 
 
-CERT_DAYS_LEFT = Gauge(
+CERT_DAYS_LEFT = SnapshotGauge(
     "nexus_cert_days_left",
     "Сколько дней осталось до истечения SSL-сертификатов в Nexus truststore",
     [
@@ -40,12 +44,109 @@ def short_pem(pem: str) -> str:
     return f"{pem_clean[:6]}...{pem_clean[-6:]}"
 
 
-def fetch_cert_lifetime_metrics(nexus_url: str, auth: tuple):
-    # 💡 очищаем метрику перед пушем новых значений
-    CERT_DAYS_LEFT.clear()
+class CertRecord:
+    """Разобранный сертификат truststore: всё, что нужно для метрики."""
+
+    __slots__ = ("fingerprint", "subject_cn", "issuer_cn", "pem_short", "expires_at", "duplicates")
+
+    def __init__(self, cert, duplicates: int = 0):
+        self.fingerprint = cert.get("fingerprint", "(none)")
+        self.subject_cn = cert.get("subjectCommonName", "(unknown)")
+        self.issuer_cn = cert.get("issuerCommonName", "(unknown)")
+        self.pem_short = short_pem(cert.get("pem", ""))
+        self.expires_at = cert.get("expiresOn") / 1000
+        self.duplicates = duplicates
+
+    def days_left(self, now: float) -> int:
+        return int((self.expires_at - now) // 86400)
+
+
+class CertificateIndex:
+    """
+    Truststore, проиндексированный по fingerprint.
+
+    sync() разбирает только появившиеся сертификаты и удаляет пропавшие;
+    refresh() пересчитывает days_left из сохранённого срока действия без
+    обращения к Nexus.
+    """
+
+    def __init__(self):
+        self._records: Dict[str, CertRecord] = {}
+        self._source = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def sync(self, certs) -> tuple:
+        """Сверяет индекс с ответом truststore. Возвращает (добавлено, удалено)."""
+        # Каталог отдаёт тот же объект, если truststore не изменился (ETag)
+        if certs is self._source:
+            return 0, 0
+
+        counts = Counter(c.get("fingerprint", "(none)") for c in certs)
+        added, removed = 0, 0
+
+        with self._lock:
+            for fingerprint in list(self._records):
+                if fingerprint not in counts:
+                    record = self._records.pop(fingerprint)
+                    removed += 1
+                    logging.info(
+                        "➖ Сертификат удалён из truststore: CN='%s' %s", record.subject_cn, fingerprint
+                    )
+
+            for cert in certs:
+                fingerprint = cert.get("fingerprint", "(none)")
+                record = self._records.get(fingerprint)
+                if record is not None:
+                    record.duplicates = counts[fingerprint] - 1
+                    continue
+                if not cert.get("expiresOn"):
+                    logging.warning("❌ У сертификата %s нет поля expiresOn", fingerprint)
+                    continue
+                try:
+                    record = CertRecord(cert, counts[fingerprint] - 1)
+                except Exception as e:
+                    logging.error("Ошибка обработки сертификата %s: %s", fingerprint, e)
+                    continue
+                self._records[fingerprint] = record
+                added += 1
+                logging.info(
+                    "📜 Сертификат CN='%s' (Issuer='%s') Fingerprint=%s PEM=%s "
+                    "истекает %s, дублей=%d",
+                    record.subject_cn, record.issuer_cn, fingerprint, record.pem_short,
+                    datetime.fromtimestamp(record.expires_at, tz=timezone.utc), record.duplicates,
+                )
+
+            self._source = certs
+        return added, removed
+
+    def refresh(self, now: Optional[float] = None) -> None:
+        """Публикует days_left по сохранённым срокам действия."""
+        now = time.time() if now is None else now
+        days_left_buffer = CERT_DAYS_LEFT.buffer()
+        with self._lock:
+            records = list(self._records.values())
+        for record in records:
+            days_left_buffer.labels(
+                subject_common_name=record.subject_cn,
+                issuer_common_name=record.issuer_cn,
+                fingerprint=record.fingerprint,
+                pem_short=record.pem_short,
+                duplicates=str(record.duplicates),
+            ).set(record.days_left(now))
+        CERT_DAYS_LEFT.publish(days_left_buffer)
+
 
+# Truststore у каждого инстанса Nexus свой
+CERT_INDEX = PerInstance(CertificateIndex)
+
+
+def fetch_cert_lifetime_metrics(nexus_url: str, auth: tuple):
+    """Синхронизирует индекс с truststore Nexus и публикует days_left."""
     try:
-        certs = get_from_nexus(nexus_url, "security/ssl/truststore", auth)
+        certs = get_catalog(nexus_url, "security/ssl/truststore", auth)
     except Exception as e:
         logging.error(f"Ошибка при получении truststore из Nexus: {e}")
         return
@@ -54,56 +155,14 @@ def fetch_cert_lifetime_metrics(nexus_url: str, auth: tuple):
         logging.warning("⚠️ Truststore пустой — метрики по сертификатам не обновлены")
         return
 
-    now = datetime.now(timezone.utc)
-
-    # Строим ключ для поиска дублей (fingerprint + CN + Issuer + cert body)
-    duplicate_keys = [
-        (
-            c.get("fingerprint", "(none)"),
-            c.get("subjectCommonName", "(unknown)"),
-            c.get("issuerCommonName", "(unknown)"),
-            clean_pem(c.get("pem", "")),
-        )
-        for c in certs
-    ]
-    duplicate_counts = Counter(duplicate_keys)
-
-    for cert in certs:
-        try:
-            expires_on_ms = cert.get("expiresOn")
-            if not expires_on_ms:
-                logging.warning(
-                    f"❌ У сертификата {cert.get('fingerprint')} нет поля expiresOn"
-                )
-                continue
-
-            # Конвертим время из мс
-            expires_dt = datetime.fromtimestamp(expires_on_ms / 1000, tz=timezone.utc)
-            days_left = (expires_dt - now).days
-
-            subject_cn = cert.get("subjectCommonName", "(unknown)")
-            issuer_cn = cert.get("issuerCommonName", "(unknown)")
-            fingerprint = cert.get("fingerprint", "(none)")
-            pem_clean = clean_pem(cert.get("pem", ""))
-            pem_short = short_pem(cert.get("pem", ""))
-
-            # Ключ для дублей
-            key = (fingerprint, subject_cn, issuer_cn, pem_clean)
-            duplicates = max(duplicate_counts[key] - 1, 0)
-
-            # Пишем метрику
-            CERT_DAYS_LEFT.labels(
-                subject_common_name=subject_cn,
-                issuer_common_name=issuer_cn,
-                fingerprint=fingerprint,
-                pem_short=pem_short,
-                duplicates=str(duplicates),
-            ).set(days_left)
-
-            logging.info(
-                f"📜 Сертификат CN='{subject_cn}' (Issuer='{issuer_cn}') "
-                f"Fingerprint={fingerprint} PEM={pem_short} "
-                f"истекает {expires_dt}, осталось {days_left} дней, дублей={duplicates}"
-            )
-        except Exception as e:
-            logging.error(f"Ошибка обработки сертификата {cert}: {e}")
+    added, removed = CERT_INDEX.sync(certs)
+    logging.info(
+        f"🔐 Truststore: сертификатов {len(CERT_INDEX)} (+{added} / -{removed})"
+    )
+    CERT_INDEX.refresh()
+
+
+def refresh_cert_days_left() -> None:
+    """Дешёвое обновление days_left между синхронизациями truststore."""
+    if len(CERT_INDEX):
+        CERT_INDEX.refresh()
@@ -1,61 +1,78 @@
-from common.logs import logging
-from prometheus_client import Gauge
-from metrics.utils.api import get_from_nexus
-from database.cleanup_query import fetch_cleanup_name
+from common.logs import logging, ItemLog
+from metrics.utils.snapshot import SnapshotGauge
+from database.cleanup_query import fetch_cleanup_policy_coverage
 
 
 # Метрика: 1 — политика используется, 0 — не используется
-nexus_cleanup_policy_usage_gauge = Gauge(
+nexus_cleanup_policy_usage_gauge = SnapshotGauge(
     "nexus_cleanup_policy_used",
     "Nexus cleanup policy usage status (1 = used, 0 = unused)",
     ["policy_name"]
 )
 
+# Метрика: сколько репозиториев ссылается на политику
+nexus_cleanup_policy_repositories_gauge = SnapshotGauge(
+    "nexus_cleanup_policy_repositories",
+    "Number of repositories that use the cleanup policy",
+    ["policy_name"]
+)
+
+# Метрика: какие репозитории используют политику
+nexus_cleanup_policy_repository_gauge = SnapshotGauge(
+    "nexus_cleanup_policy_repository_info",
+    "Repository assigned to the cleanup policy",
+    ["policy_name", "repository"]
+)
+
+# Метрика: сводные количества политик
+nexus_cleanup_policy_count_gauge = SnapshotGauge(
+    "nexus_cleanup_policy_count",
+    "Number of cleanup policies by usage state",
+    ["state"]
+)
+
 
-def fetch_cleanup_policy_usage(api_url: str, auth: tuple):
+def fetch_cleanup_policy_usage() -> dict:
     """
-    Собирает список всех политик очистки в Nexus, определяет, какие используются,
+    Считает покрытие политик очистки одним SQL-запросом (cleanup_policy ⟕ repository)
     и выставляет метрики Prometheus.
-    
-    :param api_url: URL API Nexus
-    :param auth: авторизационные данные (tuple)
+
+    :return: {политика: [репозитории]}
     """
-    repository_settings = get_from_nexus(api_url, "repositorySettings", auth)
-    used_policies = []
-
-    # Сбор всех политик, реально используемых в репозиториях
-    for repo in repository_settings or []:
-        repo_name = repo.get("name") or repo.get("repositoryName") or "<unknown>"
-        cleanup_data = repo.get("cleanup") or {}
-        policy_names = cleanup_data.get("policyNames") or []
-
-        if policy_names:
-            logging.info("[✅] Репозиторий %s использует политики: %s", repo_name, ", ".join(policy_names))
-            used_policies.extend(policy_names)
-        else:
-            logging.info("[➖] Репозиторий %s — политики очистки не заданы", repo_name)
-
-    # Убираем дубликаты, сохраняем порядок
-    unique_used_policies = list(dict.fromkeys(used_policies))
-    logging.info(
-        "Уникальные политики, которые используются: %s",
-        ", ".join(unique_used_policies) if unique_used_policies else "—"
-    )
-
-    # Все политики из базы — приводим к строкам, если fetch_cleanup_name() возвращает кортежи
-    all_policies = [p[0] if isinstance(p, tuple) else str(p) for p in fetch_cleanup_name()]
-    logging.info("Все политики из базы: %s", ", ".join(all_policies) if all_policies else "—")
-
-    # 🔹 Очищаем старые метрики перед установкой новых
-    nexus_cleanup_policy_usage_gauge.clear()
-
-    # Выставляем метрики и логируем смайликами
-    for policy in all_policies:
-        is_used = 1 if policy in unique_used_policies else 0
-        nexus_cleanup_policy_usage_gauge.labels(policy_name=policy).set(is_used)
+    rows = fetch_cleanup_policy_coverage()
+    if not rows:
+        logging.warning("⚠️ Политики очистки не получены из БД — метрики не обновлены")
+        return {}
+
+    coverage = {name: list(repositories or []) for name, _, repositories in rows}
+    used_policies = {name for name, count, _ in rows if count}
+
+    # 🔹 Новые снимки собираем в стороне и публикуем целиком
+    usage = nexus_cleanup_policy_usage_gauge.buffer()
+    repo_counts = nexus_cleanup_policy_repositories_gauge.buffer()
+    repo_info = nexus_cleanup_policy_repository_gauge.buffer()
+    counts = nexus_cleanup_policy_count_gauge.buffer()
+    items = ItemLog("cleanup_policy")
+
+    for policy, repositories in coverage.items():
+        is_used = policy in used_policies
+        usage.labels(policy_name=policy).set(1 if is_used else 0)
+        repo_counts.labels(policy_name=policy).set(len(repositories))
+        for repository in repositories:
+            repo_info.labels(policy_name=policy, repository=repository).set(1)
 
         # Выводим в лог смайлик вместо 0/1
         log_symbol = "✅" if is_used else "❌"
-        logging.info("[📊] Политика '%s' -> %s", policy, log_symbol)
+        items.info("[📊] Политика '%s' -> %s (репозиториев: %d)", policy, log_symbol, len(repositories))
+
+    counts.labels(state="total").set(len(coverage))
+    counts.labels(state="used").set(len(used_policies))
+    counts.labels(state="unused").set(len(coverage) - len(used_policies))
+
+    nexus_cleanup_policy_usage_gauge.publish(usage)
+    nexus_cleanup_policy_repositories_gauge.publish(repo_counts)
+    nexus_cleanup_policy_repository_gauge.publish(repo_info)
+    nexus_cleanup_policy_count_gauge.publish(counts)
 
-    return unique_used_policies
+    items.summary("Политик очистки: %d, используются: %d", len(coverage), len(used_policies))
+    return coverage
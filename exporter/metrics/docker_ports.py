@@ -1,11 +1,11 @@
 import re
 from typing import Dict, List, Optional, Set
 
-from prometheus_client import Gauge
+from metrics.utils.snapshot import SnapshotBuffer, SnapshotGauge
 
 from common.logs import logging
 from common.config import NEXUS_API_URL, GITLAB_TOKEN, GITLAB_URL
-from metrics.utils.api import get_from_nexus
+from metrics.utils.catalog import get_catalog
 from metrics.utils.api_gitlab import get_gitlab_file_content, get_gitlab_connection
 
 
@@ -57,29 +57,29 @@ def _extract_repo_port(repo: dict) -> Optional[int]:
     return int(m.group(1)) if m else None
 
 
-docker_repo_port_gauge = Gauge(
+docker_repo_port_gauge = SnapshotGauge(
     "docker_repository_port_info",
     "Информация о портах и удалённых адресах docker-репозиториев Nexus",
     ["repository_name", "http_port", "remote_url", "repo_type", "endpoint"],
 )
 
-docker_port_status_gauge = Gauge(
+docker_port_status_gauge = SnapshotGauge(
     "docker_port_status",
     "Занятость портов: 1 = занят, 0 = свободен",
     ["port"],
 )
 
 
-def set_gauge(gauge: Gauge, labels: Dict[str, str], value: int) -> None:
+def set_gauge(buffer: SnapshotBuffer, labels: Dict[str, str], value: int) -> None:
     try:
-        gauge.labels(**labels).set(value)
+        buffer.labels(**labels).set(value)
     except Exception as e:
-        logging.error(f"Ошибка при установке метрики {gauge._name}: {e}")
+        logging.error(f"Ошибка при установке метрики {labels}: {e}")
 
 
 def get_docker_repositories(nexus_url: str, auth: tuple) -> List[dict]:
     try:
-        repositories = get_from_nexus(nexus_url, "repositorySettings", auth=auth)
+        repositories = get_catalog(nexus_url, "repositorySettings", auth)
     except Exception as e:
         logging.error(f"Ошибка при обращении к API Nexus: {e}")
         return []
@@ -100,7 +100,7 @@ def fetch_docker_ports_metrics(docker_repos: List[dict]) -> None:
         return
 
     logging.info(f"Получено {len(docker_repos)} docker-репозиториев из Nexus API.")
-    docker_repo_port_gauge.clear()
+    port_info = docker_repo_port_gauge.buffer()
 
     nginx_conf = get_gitlab_file_content(
         GITLAB_URL,
@@ -138,7 +138,7 @@ def fetch_docker_ports_metrics(docker_repos: List[dict]) -> None:
         )
 
         set_gauge(
-            docker_repo_port_gauge,
+            port_info,
             labels=dict(
                 repository_name=repo_name,
                 http_port=str(http_port) if http_port else "None",
@@ -149,6 +149,7 @@ def fetch_docker_ports_metrics(docker_repos: List[dict]) -> None:
             value=1,
         )
 
+    docker_repo_port_gauge.publish(port_info)
     logging.info("Метрики по docker-репозиториям успешно обновлены.")
 
 
@@ -176,7 +177,7 @@ def fetch_ports_status_metrics(docker_repos: List[dict]) -> None:
         busy_ports.add(port)
         busy_ports_by_repo.setdefault(port, []).append(repo.get("name", "unknown"))
 
-    docker_port_status_gauge.clear()
+    port_status = docker_port_status_gauge.buffer()
 
     for port in all_ports:
         status = 1 if port in busy_ports else 0
@@ -187,7 +188,9 @@ def fetch_ports_status_metrics(docker_repos: List[dict]) -> None:
         else:
             logging.info(f"Порт {port} | свободен")
 
-        set_gauge(docker_port_status_gauge, {"port": str(port)}, status)
+        set_gauge(port_status, {"port": str(port)}, status)
+
+    docker_port_status_gauge.publish(port_status)
 
     logging.info(
         f"Метрики занятости портов обновлены. "
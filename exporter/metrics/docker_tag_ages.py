@@ -0,0 +1,121 @@
+from common.logs import logging
+from common.config import DOCKER_TAG_RETENTION_DAYS
+from database.docker_tags_query import fetch_docker_tag_ages
+from metrics.asset_sizes import parse_buckets
+from metrics.utils.snapshot import SnapshotGauge
+
+
+TAG_AGE = SnapshotGauge(
+    "nexus_docker_tag_age_days_bucket",
+    "Number of image tags younger than le days (kind: updated — last push, downloaded — last pull)",
+    ["repository", "image_name", "kind", "le"],
+)
+
+RECLAIMABLE_TAGS = SnapshotGauge(
+    "nexus_docker_tag_reclaimable",
+    "Number of image tags idle (not pushed and not pulled) for at least retention_days",
+    ["repository", "image_name", "retention_days"],
+)
+
+# Только asset'ы тега (манифесты): слои хранятся без компонента, и по БД
+# их к тегу не отнести — это нижняя граница освобождаемого места
+RECLAIMABLE_ASSET_BYTES = SnapshotGauge(
+    "nexus_docker_tag_reclaimable_asset_bytes",
+    "Bytes of tag-linked assets (manifests, layer blobs not included) "
+    "idle for at least retention_days",
+    ["repository", "image_name", "retention_days"],
+)
+
+REPO_RECLAIMABLE_ASSET_BYTES = SnapshotGauge(
+    "nexus_docker_repo_reclaimable_asset_bytes",
+    "Bytes of tag-linked assets (manifests, layer blobs not included) in the repository "
+    "idle for at least retention_days",
+    ["repository", "retention_days"],
+)
+
+
+RETENTION_DAYS = parse_buckets(DOCKER_TAG_RETENTION_DAYS)
+
+
+def summarize_tag_ages(rows, thresholds=RETENTION_DAYS) -> dict:
+    """
+    Сворачивает строки fetch_docker_tag_ages по образам:
+    {(repo, image): {"updated": [...], "downloaded": [...],
+                     "reclaim_tags": [...], "reclaim_bytes": [...]}}.
+
+    Гистограммы — число тегов по бакетам (последний — старше thresholds[-1]
+    или ни разу не скачан). Тег простаивает min(updated, downloaded) дней,
+    поэтому его бакет простоя — меньший из двух; при пороге thresholds[j]
+    удаляются теги с бакетом простоя > j.
+    """
+    size = len(thresholds) + 1
+    summary = {}
+    for repo, image, updated, downloaded, tags, size_bytes in rows:
+        image_stats = summary.get((repo, image))
+        if image_stats is None:
+            image_stats = summary[(repo, image)] = {
+                "updated": [0] * size,
+                "downloaded": [0] * size,
+                "reclaim_tags": [0] * len(thresholds),
+                "reclaim_bytes": [0] * len(thresholds),
+            }
+
+        never_downloaded = downloaded is None
+        downloaded = size - 1 if never_downloaded else downloaded
+        image_stats["updated"][updated] += tags
+        image_stats["downloaded"][downloaded] += tags
+
+        idle = min(updated, downloaded)
+        for j in range(min(idle, len(thresholds))):
+            image_stats["reclaim_tags"][j] += tags
+            image_stats["reclaim_bytes"][j] += int(size_bytes or 0)
+    return summary
+
+
+def update_tag_age_metrics(summary: dict, thresholds=RETENTION_DAYS) -> None:
+    ages = TAG_AGE.buffer()
+    reclaim_tags = RECLAIMABLE_TAGS.buffer()
+    reclaim_bytes = RECLAIMABLE_ASSET_BYTES.buffer()
+    repo_bytes = REPO_RECLAIMABLE_ASSET_BYTES.buffer()
+
+    labels_le = [str(days) for days in thresholds] + ["+Inf"]
+    labels_days = [str(days) for days in thresholds]
+    repo_totals = {}
+
+    for (repo, image), image_stats in summary.items():
+        for kind in ("updated", "downloaded"):
+            cumulative = 0
+            for le, tags in zip(labels_le, image_stats[kind]):
+                cumulative += tags
+                ages.labels(repo, image, kind, le).set(cumulative)
+
+        for days, tags, size in zip(
+            labels_days, image_stats["reclaim_tags"], image_stats["reclaim_bytes"]
+        ):
+            reclaim_tags.labels(repo, image, days).set(tags)
+            reclaim_bytes.labels(repo, image, days).set(size)
+            repo_totals[(repo, days)] = repo_totals.get((repo, days), 0) + size
+
+    for (repo, days), size in repo_totals.items():
+        repo_bytes.labels(repo, days).set(size)
+
+    TAG_AGE.publish(ages)
+    RECLAIMABLE_TAGS.publish(reclaim_tags)
+    RECLAIMABLE_ASSET_BYTES.publish(reclaim_bytes)
+    REPO_RECLAIMABLE_ASSET_BYTES.publish(repo_bytes)
+
+
+def fetch_docker_tag_age_metrics() -> None:
+    """Возраст Docker-тегов и объём их asset'ов, простаивающих дольше сроков хранения."""
+    rows = fetch_docker_tag_ages(RETENTION_DAYS)
+    if not rows:
+        logging.warning("⚠️ Возраст Docker-тегов не получен — остаются прошлые значения")
+        return
+
+    summary = summarize_tag_ages(rows)
+    update_tag_age_metrics(summary)
+
+    for j, days in enumerate(RETENTION_DAYS):
+        total = sum(stats["reclaim_bytes"][j] for stats in summary.values())
+        logging.info(f"🧹 Хранение {days} дн.: asset'ы тегов без слоёв — {total} байт")
+    logging.info(f"✅ Возраст тегов посчитан для {len(summary)} Docker-образов")
@@ -1,15 +1,183 @@
-from prometheus_client import Gauge
+import sys
+import threading
+from array import array
+
+from prometheus_client import REGISTRY
+from prometheus_client.core import GaugeMetricFamily
 
 from database.docker_tags_query import fetch_docker_tags_data
 from metrics.utils.api import build_nexus_url
+from metrics.utils.snapshot import mark_fresh, notify_published, register_snapshot
 from common.logs import logging
+from common.cardinality import record_series, series_budget
+from common.exposition import bump_generation
+from common.instances import INSTANCE_LABEL, MULTI_INSTANCE, get_instance, instance_name
+
+
+class _DockerTagsSnapshot:
+    """Результат последнего запроса одного инстанса в колонках."""
+
+    __slots__ = ("images", "repos", "formats", "blobs", "counts")
+
+    def __init__(self, images=(), repos=(), formats=(), blobs=(), counts=None):
+        self.images = images
+        self.repos = repos
+        self.formats = formats
+        self.blobs = blobs
+        self.counts = counts if counts is not None else array("q")
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def rows(self):
+        return zip(self.images, self.repos, self.formats, self.blobs, self.counts)
+
+
+class _Published:
+    """Снимки по инстансам Nexus + кэш построенного семейства метрик."""
+
+    __slots__ = ("snapshots", "family")
+
+    def __init__(self, snapshots: dict):
+        self.snapshots = snapshots
+        self.family = None
+
+
+class DockerTagsCollector:
+    """
+    Коллектор docker_image_tags_info.
+
+    Хранит строки из БД компактными колонками и строит сэмплы (включая
+    nexus_url_path) только при скрейпе. Построенная метрика и текст экспозиции
+    кэшируются до следующего update(). Снимки хранятся по инстансам Nexus,
+    как у SnapshotGauge.
+    """
+
+    name = "docker_image_tags_info"
+    documentation = "Количество тегов у Docker-образа в репозитории"
+
+    def __init__(self, registry=REGISTRY, instance_label: bool = MULTI_INSTANCE):
+        self._instance_label = instance_label
+        self.labelnames = ("image_name", "repository", "format", "blob", "nexus_url_path")
+        if instance_label:
+            self.labelnames += (INSTANCE_LABEL,)
+        self._published_data = _Published({})
+        self._update_lock = threading.Lock()
+        self._render_lock = threading.Lock()
+        self._published = False
+
+        if registry is not None:
+            registry.register(self)
+            register_snapshot(self)
+
+    def update(self, rows) -> int:
+        """Подменяет данные текущего инстанса новым результатом запроса."""
+        count = self._load(rows)
+        self._published = True
+        mark_fresh(self.name)
+        bump_generation()
+        notify_published(self)
+        return count
 
+    def dump(self) -> list:
+        """Строки в формате запроса: [[image, repo, format, blob, count(, instance)], ...]."""
+        dumped = []
+        for instance, snapshot in self._published_data.snapshots.items():
+            suffix = [instance] if self._instance_label else []
+            dumped.extend([*row, *suffix] for row in snapshot.rows())
+        return dumped
 
-docker_tags_count_gauge = Gauge(
-    "docker_image_tags_info",
-    "Количество тегов у Docker-образа в репозитории",
-    ["image_name", "repository", "format", "blob", "nexus_url_path"],
-)
+    def restore(self, rows) -> int:
+        """
+        Загружает снимок прошлого запуска, если свежих данных ещё нет.
+        Инстансы, которых больше нет в NEXUS_INSTANCES, пропускаются.
+        """
+        if self._published:
+            return 0
+        if not self._instance_label:
+            return self._load([row for row in rows if len(row) == 5])
+
+        by_instance = {}
+        for row in rows:
+            if len(row) == 6 and get_instance(row[5]) is not None:
+                by_instance.setdefault(row[5], []).append(row[:5])
+        restored = 0
+        for instance, instance_rows in by_instance.items():
+            restored += self._load(instance_rows, instance)
+        return restored
+
+    def _load(self, rows, instance: str = None) -> int:
+        instance = instance or instance_name()
+        images, repos, formats, blobs = [], [], [], []
+        counts = array("q")
+
+        budget = series_budget(self.name)
+        if len(rows) > budget:
+            logging.warning(
+                f"⚠️ {self.name}: превышен бюджет серий ({len(rows)} > {budget}), "
+                f"отброшено {len(rows) - budget}"
+            )
+
+        for image, repo, repo_format, blob, tag_count in rows[:budget]:
+            logging.debug(
+                "🐳 Образ: %s | 📦 Репо: %s | 🧩 Формат: %s | 🧱 Blob: %s | 🏷️ Тегов: %s",
+                image, repo, repo_format, blob, tag_count,
+            )
+            images.append(str(image))
+            # Репозитории, форматы и blob повторяются — держим одну копию строки
+            repos.append(sys.intern(str(repo)))
+            formats.append(sys.intern(str(repo_format)))
+            blobs.append(sys.intern(str(blob)))
+            counts.append(int(tag_count))
+
+        snapshot = _DockerTagsSnapshot(
+            tuple(images), tuple(repos), tuple(formats), tuple(blobs), counts
+        )
+        with self._update_lock:
+            snapshots = {**self._published_data.snapshots, instance: snapshot}
+            self._published_data = _Published(snapshots)
+        total = sum(len(s) for s in snapshots.values())
+        record_series(self.name, total, max(len(rows) - budget, 0))
+        return len(counts)
+
+    def __len__(self) -> int:
+        return sum(len(s) for s in self._published_data.snapshots.values())
+
+    def _build_family(self, published: _Published) -> GaugeMetricFamily:
+        family = GaugeMetricFamily(
+            self.name, self.documentation, labels=self.labelnames
+        )
+        for instance, snapshot in published.snapshots.items():
+            nexus = get_instance(instance)
+            base_url = nexus.api_url if nexus else None
+            suffix = (instance,) if self._instance_label else ()
+            for image, repo, repo_format, blob, tag_count in snapshot.rows():
+                family.add_metric(
+                    (
+                        image,
+                        repo,
+                        repo_format,
+                        blob,
+                        build_nexus_url(repo, image, encoding=False, base_url=base_url),
+                        *suffix,
+                    ),
+                    tag_count,
+                )
+        return family
+
+    def describe(self):
+        yield GaugeMetricFamily(self.name, self.documentation, labels=self.labelnames)
+
+    def collect(self):
+        published = self._published_data
+        if published.family is None:
+            with self._render_lock:
+                if published.family is None:
+                    published.family = self._build_family(published)
+        yield published.family
+
+
+DOCKER_TAGS = DockerTagsCollector()
 
 
 def fetch_docker_tags_metrics() -> None:
@@ -30,21 +198,5 @@ def fetch_docker_tags_metrics() -> None:
 
     logging.info(f"📥 Получено {len(result)} агрегированных строк из БД.")
 
-    docker_tags_count_gauge.clear()
-
-    for row in result:
-        image, repo, repo_format, blob, tag_count = row
-
-        logging.info(
-            f"🐳 Образ: {image} | 📦 Репо: {repo} | 🧩 Формат: {repo_format} | 🧱 Blob: {blob} | 🏷️ Тегов: {tag_count}"
-        )
-
-        docker_tags_count_gauge.labels(
-            image_name=image,
-            repository=repo,
-            format=repo_format,
-            blob=blob,
-            nexus_url_path=build_nexus_url(repo, image, encoding=False),
-        ).set(tag_count)
-
-    logging.info(f"✅ Метрики обновлены для {len(result)} Docker-образов.")
+    count = DOCKER_TAGS.update(result)
+    logging.info(f"✅ Метрики обновлены для {count} Docker-образов.")
@@ -1,12 +1,15 @@
-from prometheus_client import Gauge
+from metrics.utils.snapshot import SnapshotGauge
 from database.repository_size_query import get_repository_sizes, get_repository_data
 from database.utils.jobs_reader import get_jobs_data
 from common.config import GITLAB_TOKEN, GITLAB_BRANCH, GITLAB_URL
+from common.config import REPO_HISTORY_SAMPLES, REPO_GROWTH_TOP_N
 from metrics.utils.api_gitlab import get_external_policies
-from common.logs import logging
+from metrics.utils.history import SizeHistory
+from common.instances import PerInstance
+from common.logs import logging, ItemLog
 
 # Единая метрика с двумя лейблами: внутренняя и внешняя политика
-REPO_STORAGE = Gauge(
+REPO_STORAGE = SnapshotGauge(
     "nexus_repo_size",
     "Total size of Nexus repositories in bytes",
     [
@@ -21,6 +24,27 @@ REPO_STORAGE = Gauge(
     ],
 )
 
+REPO_SIZE_DELTA = SnapshotGauge(
+    "nexus_repo_size_delta_bytes",
+    "Change of repository size since the previous collection",
+    ["repo_name"],
+)
+
+REPO_GROWTH_RATE = SnapshotGauge(
+    "nexus_repo_growth_bytes_per_second",
+    "Repository growth rate over the in-memory sample window",
+    ["repo_name"],
+)
+
+REPO_TOP_GROWTH = SnapshotGauge(
+    "nexus_repo_top_growth_bytes_per_second",
+    "Fastest growing repositories (top N by growth rate)",
+    ["repo_name", "rank"],
+)
+
+# Скользящее окно (timestamp, size_bytes) по каждому репозиторию
+REPO_HISTORY = PerInstance(lambda: SizeHistory(REPO_HISTORY_SAMPLES))
+
 # Разрешённые типы задач
 ALLOWED_TASK_TYPES = {
     "blobstore.delete-temp-files": "delete",
@@ -66,8 +90,10 @@ def fetch_repository_metrics() -> list:
 
     external_links = get_external_policies(GITLAB_URL, GITLAB_TOKEN, GITLAB_BRANCH)
 
-    logging.info(f"Полученные внешние политики: {external_links}")
-    REPO_STORAGE.clear()
+    logging.info("Полученные внешние политики: %d", len(external_links))
+    logging.debug("Внешние политики: %s", external_links)
+    storage = REPO_STORAGE.buffer()
+    items = ItemLog("repo_size")
 
     for repo in repo_data:
         repo_name = repo.get("repository_name", "unknown")
@@ -84,23 +110,24 @@ def fetch_repository_metrics() -> list:
             custom_cleaner_url = ""
 
         # Лог
-        logging.info(
-            f"📦 Репозиторий: {repo_name} | blob: {blob_name} | "
-            f"delete: {'✅' if repo.get('delete') else '❌'} | "
-            f"compact: {'✅' if repo.get('compact') else '❌'} | "
-            f"internal: {internal_policy or '—'} | external: {custom_cleaner_url or '—'}"
+        items.info(
+            "📦 Репозиторий: %s | blob: %s | delete: %s | compact: %s | internal: %s | external: %s",
+            repo_name,
+            blob_name,
+            "✅" if repo.get("delete") else "❌",
+            "✅" if repo.get("compact") else "❌",
+            internal_policy or "—",
+            custom_cleaner_url or "—",
         )
 
         # Метрика
         try:
             size = float(repo.get("size", 0) or 0)
         except (ValueError, TypeError):
-            logging.warning(
-                f"⚠️ Невозможно преобразовать размер репозитория {repo_name} в число"
-            )
+            logging.warning("⚠️ Невозможно преобразовать размер репозитория %s в число", repo_name)
             size = 0.0
 
-        REPO_STORAGE.labels(
+        storage.labels(
             repo_name=repo_name,
             repo_type=repo.get("repository_type", "unknown"),
             repo_format=repo.get("format", "unknown"),
@@ -111,5 +138,48 @@ def fetch_repository_metrics() -> list:
             compact_status=str(repo.get("compact", 0)),
         ).set(size)
 
-    logging.info("✅ Метрики репозиториев собраны успешно")
+    REPO_STORAGE.publish(storage)
+
+    if repo_size:
+        update_growth_metrics(
+            {repo.get("repository_name", "unknown"): repo.get("size") or 0 for repo in repo_data}
+        )
+
+    items.summary("✅ Метрики репозиториев собраны успешно: %d", items.count)
     return repo_data
+
+
+def update_growth_metrics(sizes: dict, now: float = None, top_n: int = REPO_GROWTH_TOP_N) -> None:
+    """Дополняет историю размеров и публикует дельту, скорость роста и top-N."""
+    REPO_HISTORY.retain(sizes)
+
+    deltas = REPO_SIZE_DELTA.buffer()
+    rates = REPO_GROWTH_RATE.buffer()
+    top = REPO_TOP_GROWTH.buffer()
+    growth = []
+
+    for repo_name, size in sizes.items():
+        try:
+            REPO_HISTORY.record(repo_name, float(size), now)
+        except (TypeError, ValueError):
+            continue
+
+        delta = REPO_HISTORY.delta(repo_name)
+        if delta is not None:
+            deltas.labels(repo_name=repo_name).set(delta)
+
+        rate = REPO_HISTORY.rate(repo_name)
+        if rate is not None:
+            rates.labels(repo_name=repo_name).set(rate)
+            growth.append((rate, repo_name))
+
+    growth.sort(reverse=True)
+    for rank, (rate, repo_name) in enumerate(growth[:top_n], start=1):
+        if rate <= 0:
+            break
+        top.labels(repo_name=repo_name, rank=str(rank)).set(rate)
+        logging.info("📈 #%d %s: %.1f B/s", rank, repo_name, rate)
+
+    REPO_SIZE_DELTA.publish(deltas)
+    REPO_GROWTH_RATE.publish(rates)
+    REPO_TOP_GROWTH.publish(top)
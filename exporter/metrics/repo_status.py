@@ -1,14 +1,18 @@
-from common.logs import logging
+from common.logs import logging, ItemLog
 import time
 import socket
+import threading
+import urllib.parse
 import urllib3
-from prometheus_client import Gauge
-from metrics.utils.api import get_from_nexus, safe_get_raw
+from common.config import DNS_CACHE_TTL, DNS_NEGATIVE_CACHE_TTL
+from metrics.utils.snapshot import SnapshotGauge
+from metrics.utils.api import safe_get_raw
+from metrics.utils.catalog import get_catalog
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 # Метрики
-REPO_STATUS = Gauge(
+REPO_STATUS = SnapshotGauge(
     "nexus_proxy_repo_status",
     "Статус репозитория в Nexus",
     [
@@ -21,17 +25,56 @@ REPO_STATUS = Gauge(
         "redirected",
     ],
 )
-REPO_COUNT = Gauge("nexus_repo_count", "Количество репозиториев по типу", ["repo_type"])
+REPO_HTTP_CODE = SnapshotGauge(
+    "nexus_proxy_repo_http_code",
+    "HTTP-код последней проверки репозитория (0 — ответа не было)",
+    ["repo_name", "target"],
+)
+REPO_COUNT = SnapshotGauge("nexus_repo_count", "Количество репозиториев по типу", ["repo_type"])
+
+
+# host → (резолвится ли, момент истечения записи)
+_DNS_CACHE: dict = {}
+_DNS_LOCK = threading.Lock()
 
 
 def is_domain_resolvable(url: str) -> bool:
     try:
-        domain = url.split("/")[2]
+        domain = urllib.parse.urlsplit(url).hostname
+    except ValueError:
+        domain = None
+    if not domain:
+        logging.warning(f"❌ Невозможно разрешить домен: {url}")
+        return False
+
+    now = time.monotonic()
+    with _DNS_LOCK:
+        cached = _DNS_CACHE.get(domain)
+    if cached and cached[1] > now:
+        return cached[0]
+
+    try:
         socket.gethostbyname(domain)
-        return True
+        resolvable = True
     except Exception:
         logging.warning(f"❌ Невозможно разрешить домен: {url}")
-        return False
+        resolvable = False
+
+    ttl = DNS_CACHE_TTL if resolvable else DNS_NEGATIVE_CACHE_TTL
+    with _DNS_LOCK:
+        _DNS_CACHE[domain] = (resolvable, now + ttl)
+    return resolvable
+
+
+def remote_probe_key(repo: dict) -> tuple:
+    """Ключ дедупликации проверки upstream: хост + путь, без регистра хоста и хвостового '/'."""
+    parts = urllib.parse.urlsplit(repo["remote"].strip())
+    return (
+        repo["type"] == "docker",
+        parts.scheme.lower(),
+        parts.netloc.lower(),
+        parts.path.rstrip("/"),
+    )
 
 
 def format_status(code: int = None, error_text: str = None) -> str:
@@ -48,70 +91,92 @@ def format_status(code: int = None, error_text: str = None) -> str:
 def check_url_status(
     name: str, url: str, auth: tuple = None, check_dns: bool = False
 ) -> tuple:
+    """Возвращает (статус, был ли редирект, HTTP-код или 0)."""
     if not url:
-        return "❌ (url is empty)", False, ""
+        return "❌ (url is empty)", False, 0
 
     if check_dns and not is_domain_resolvable(url):
-        return "❌ (domain not resolvable)", False, ""
+        return "❌ (domain not resolvable)", False, 0
 
     response, error = safe_get_raw(url, auth)
 
     if response is None:
-        return format_status(None, str(error)), False, ""
+        # В лейбл идёт только класс ошибки, полный текст — в лог
+        logging.warning("❌ %s: %s", name, error)
+        return format_status(None, type(error).__name__), False, 0
 
     redirected = len(response.history) > 0
 
     if redirected:
-        chain = []
-        for resp in response.history:
-            loc = resp.headers.get("Location", "<unknown>")
-            chain.append(f"{resp.status_code} → {loc}")
-        logging.info(f"🔁 {name} редиректы: {' > '.join(chain)}")
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            chain = [
+                f"{resp.status_code} → {resp.headers.get('Location', '<unknown>')}"
+                for resp in response.history
+            ]
+            logging.debug("🔁 %s редиректы: %s", name, " > ".join(chain))
 
-    logging.info(
-        f"🔚 {name} финальный URL: {response.url} (статус: {response.status_code})"
-    )
-    return format_status(response.status_code), redirected, ""
+    logging.debug("🔚 %s финальный URL: %s (статус: %s)", name, response.url, response.status_code)
+    return format_status(response.status_code), redirected, response.status_code
 
 
 def check_docker_remote(repo_name: str, base_url: str) -> tuple:
-    status, redirected, _ = check_url_status(
+    status, redirected, code = check_url_status(
         f"{repo_name} (docker)", base_url, check_dns=True
     )
     if status.startswith("✅"):
-        return status, redirected, ""
+        return status, redirected, code
     if not base_url.endswith("/v2"):
         return check_url_status(repo_name, base_url.rstrip("/") + "/v2", check_dns=True)
-    return status, redirected, ""
+    return status, redirected, code
 
 
-def fetch_status(repo: dict, auth: tuple) -> dict:
-    nexus_status, nexus_redirected, _ = check_url_status(
+def check_remote(repo: dict, probes: dict = None) -> tuple:
+    """
+    Проверяет upstream репозитория. Результат запоминается в probes, поэтому
+    общий upstream (registry-1.docker.io, repo1.maven.org) проверяется за цикл один раз.
+    """
+    key = remote_probe_key(repo)
+    if probes is not None and key in probes:
+        logging.debug("♻️ %s: результат проверки %s взят из цикла", repo["name"], repo["remote"])
+        return probes[key]
+
+    if repo["type"] == "docker":
+        result = check_docker_remote(repo["name"], repo["remote"])
+    else:
+        result = check_url_status(
+            f"{repo['name']} (remote)", repo["remote"], check_dns=True
+        )
+
+    if probes is not None:
+        probes[key] = result
+    return result
+
+
+def fetch_status(repo: dict, auth: tuple, probes: dict = None) -> dict:
+    nexus_status, nexus_redirected, nexus_code = check_url_status(
         f"{repo['name']} (Nexus)", repo["url"], auth=auth
     )
 
     if repo["remote"]:
-        if repo["type"] == "docker":
-            remote_status, remote_redirected, _ = check_docker_remote(
-                repo["name"], repo["remote"]
-            )
-        else:
-            remote_status, remote_redirected, _ = check_url_status(
-                f"{repo['name']} (remote)", repo["remote"], check_dns=True
-            )
+        remote_status, remote_redirected, remote_code = check_remote(repo, probes)
     else:
-        remote_status, remote_redirected = "❌ (no remote URL)", False
+        remote_status, remote_redirected, remote_code = "❌ (no remote URL)", False, 0
 
     return {
         "repo": repo,
         "nexus_status": nexus_status,
         "remote_status": remote_status,
+        "nexus_code": nexus_code,
+        "remote_code": remote_code,
         "redirected": nexus_redirected or remote_redirected,
     }
 
 
 def update_all_metrics(statuses: list):
-    REPO_STATUS.clear()
+    status_buffer = REPO_STATUS.buffer()
+    codes = REPO_HTTP_CODE.buffer()
+    items = ItemLog("repo_status")
+    unhealthy = 0
 
     for status in statuses:
         repo = status["repo"]
@@ -119,7 +184,7 @@ def update_all_metrics(statuses: list):
             "remote_status"
         ].startswith("✅")
 
-        REPO_STATUS.labels(
+        status_buffer.labels(
             repo_name=repo["name"],
             repo_format=repo["type"],
             nexus_url=repo["url"],
@@ -129,16 +194,23 @@ def update_all_metrics(statuses: list):
             redirected=str(status["redirected"]).lower(),
         ).set(1 if healthy else 0)
 
-        logging.info(
-            f"📦 Статус репозитория {repo['name']}: {'✅' if healthy else '❌'}"
-        )
+        codes.labels(repo_name=repo["name"], target="nexus").set(status["nexus_code"])
+        if repo["remote"]:
+            codes.labels(repo_name=repo["name"], target="remote").set(status["remote_code"])
+
+        unhealthy += not healthy
+        items.info("📦 Статус репозитория %s: %s", repo["name"], "✅" if healthy else "❌")
+
+    items.summary("📦 Проверено proxy-репозиториев: %d, недоступны: %d", items.count, unhealthy)
+    REPO_STATUS.publish(status_buffer)
+    REPO_HTTP_CODE.publish(codes)
 
 
 def fetch_repositories_metrics(nexus_url: str, auth: tuple) -> list:
     logging.info("🔍 Запуск сбора статуса репозиториев типа Proxy...")
 
     start = time.perf_counter()
-    raw_repos = get_from_nexus(nexus_url, "repositories", auth)
+    raw_repos = get_catalog(nexus_url, "repositories", auth)
 
     if not raw_repos:
         logging.error(
@@ -166,16 +238,21 @@ def fetch_repositories_metrics(nexus_url: str, auth: tuple) -> list:
     for repo_type, count in type_counts.items():
         logging.info(f"📊 Репозиториев типа '{repo_type}': {count}")
 
-    REPO_COUNT.clear()
+    counts = REPO_COUNT.buffer()
     for repo_type, count in type_counts.items():
-        REPO_COUNT.labels(repo_type=repo_type).set(count)
+        counts.labels(repo_type=repo_type).set(count)
+    REPO_COUNT.publish(counts)
 
     logging.info(
         f"📡 Получено {len(repos)} proxy-репозиториев. Начинаем проверку URL..."
     )
 
-    statuses = [fetch_status(repo, auth) for repo in repos]
-    logging.info(f"✅ Проверка завершена за {time.perf_counter() - start:.2f} секунд.")
+    probes = {}
+    statuses = [fetch_status(repo, auth, probes) for repo in repos]
+    logging.info(
+        f"✅ Проверка завершена за {time.perf_counter() - start:.2f} секунд "
+        f"(уникальных upstream: {len(probes)})."
+    )
 
     update_all_metrics(statuses)
     logging.info("📈 Метрики обновлены.")
@@ -0,0 +1,240 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+from prometheus_client import Counter, Histogram
+
+from common.logs import logging
+from common.config import TASK_EVENTS_FILE, TASK_EVENTS_MAX_BYTES
+from common.instances import INSTANCE_LABEL, MULTI_INSTANCE, PerInstance, instance_name
+
+
+# Лейблы — только тип задачи: id и имя есть в журнале событий
+EVENT_LABELS = ["type", "event"] + ([INSTANCE_LABEL] if MULTI_INSTANCE else [])
+DURATION_LABELS = ["type", "result"] + ([INSTANCE_LABEL] if MULTI_INSTANCE else [])
+
+TASK_EVENTS = Counter(
+    "nexus_task_events",
+    "Переходы задач Nexus между опросами: started / finished / failed / cancelled",
+    EVENT_LABELS,
+)
+
+TASK_RUN_DURATION = Histogram(
+    "nexus_task_run_duration_seconds",
+    "Длительность завершённых запусков задач Nexus (lastRunState.runDuration)",
+    DURATION_LABELS,
+    buckets=(1, 5, 15, 60, 300, 900, 1800, 3600, 7200, 21600, 86400),
+)
+
+RUNNING = "RUNNING"
+# lastRunResult → событие завершения
+RESULT_EVENTS = {
+    "OK": "finished",
+    "FAILED": "failed",
+    "CANCELED": "cancelled",
+    "INTERRUPTED": "cancelled",
+}
+
+
+def parse_timestamp(value) -> Optional[float]:
+    """
+    Время задачи → unix time: ISO-8601 из Nexus API ('2024-05-01T10:00:00.000+00:00'),
+    datetime или время Quartz в миллисекундах (число или строка из job_data).
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value.timestamp()
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        try:
+            return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+        except ValueError:
+            return None
+    # Quartz хранит время в миллисекундах
+    return number / 1000 if number > 1e11 else number
+
+
+def run_states_from_jobs(jobs: List[dict]) -> Dict[str, tuple]:
+    """
+    Последние запуски из qrtz_job_details.job_data: Nexus хранит их в ключах
+    .lastRunState.runStarted / .lastRunState.runDuration (мс).
+    Возвращает {task_id: (run_started, duration_seconds)}.
+    """
+    states = {}
+    for job in jobs:
+        task_id = job.get(".id")
+        started = parse_timestamp(job.get(".lastRunState.runStarted"))
+        try:
+            duration = float(job.get(".lastRunState.runDuration")) / 1000
+        except (TypeError, ValueError):
+            continue
+        if task_id and started is not None:
+            states[str(task_id)] = (started, duration)
+    return states
+
+
+class _TaskState:
+    __slots__ = ("running", "last_run", "started_reported")
+
+    def __init__(self, running: bool, last_run: Optional[float]):
+        self.running = running
+        self.last_run = last_run
+        # started уже отправлен для текущего запуска
+        self.started_reported = running
+
+
+class TaskEventTracker:
+    """
+    Сравнивает снимок /tasks с предыдущим и выдаёт переходы задач.
+
+    started — задача перешла в RUNNING; finished / failed / cancelled — у задачи
+    сменился lastRun, то есть завершился новый запуск, даже если следующий
+    уже идёт. Запуск, целиком уложившийся между опросами, даёт оба события.
+    Первый снимок задачи только запоминается: после старта экспортёра события
+    не выдумываются.
+    """
+
+    def __init__(self):
+        self._states: Dict[str, _TaskState] = {}
+        self._lock = threading.Lock()
+
+    def observe(
+        self,
+        tasks: List[dict],
+        now: float = None,
+        run_states: Callable[[], Dict[str, tuple]] = None,
+    ) -> List[dict]:
+        """
+        Возвращает события за интервал. run_states() — {task_id: (run_started,
+        duration_seconds)}; вызывается, только если есть завершённые запуски.
+        """
+        now = time.time() if now is None else now
+        events, completed = [], []
+
+        with self._lock:
+            seen = set()
+            for task in tasks:
+                task_id = str(task.get("id", ""))
+                if not task_id:
+                    continue
+                seen.add(task_id)
+                running = task.get("currentState") == RUNNING
+                last_run = parse_timestamp(task.get("lastRun"))
+
+                state = self._states.get(task_id)
+                if state is None:
+                    self._states[task_id] = _TaskState(running, last_run)
+                    continue
+
+                # Новый lastRun — завершение, даже если задача уже снова RUNNING
+                if last_run is not None and last_run != state.last_run:
+                    if not state.started_reported:
+                        events.append(self._event(task, "started", last_run))
+                    completed.append((task, last_run))
+                    state.last_run = last_run
+                    state.started_reported = False
+                if running and not state.started_reported:
+                    events.append(self._event(task, "started", now))
+                    state.started_reported = True
+                elif not running:
+                    state.started_reported = False
+                state.running = running
+
+            for task_id in [t for t in self._states if t not in seen]:
+                del self._states[task_id]
+
+        durations = {}
+        if completed and run_states:
+            try:
+                durations = run_states()
+            except Exception as e:
+                logging.warning(f"⚠️ Длительности запусков задач недоступны: {e}")
+        for task, last_run in completed:
+            result = str(task.get("lastRunResult") or "UNKNOWN")
+            event = self._event(task, RESULT_EVENTS.get(result, "failed"), now)
+            event["result"] = result
+            event["run_started"] = _iso(last_run)
+            run_state = durations.get(event["task_id"])
+            # Длительность — только если job_data описывает именно этот запуск
+            if run_state and abs(run_state[0] - last_run) < 1:
+                event["duration_seconds"] = run_state[1]
+            events.append(event)
+        return events
+
+    @staticmethod
+    def _event(task: dict, event: str, ts: float) -> dict:
+        return {
+            "ts": _iso(ts),
+            "event": event,
+            "task_id": str(task.get("id", "")),
+            "task_name": str(task.get("name", "")),
+            "type": str(task.get("type", "")),
+        }
+
+
+def _iso(ts: Optional[float]) -> Optional[str]:
+    if ts is None:
+        return None
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat(timespec="seconds")
+
+
+class EventLog:
+    """
+    JSONL-журнал событий задач: одна строка на событие. При превышении
+    max_bytes текущий файл переименовывается в <path>.1 (одна ротация).
+    """
+
+    def __init__(self, path: str, max_bytes: int = TASK_EVENTS_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def write(self, events: List[dict]) -> None:
+        if not events:
+            return
+        lines = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in events)
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                if self.max_bytes and os.path.exists(self.path) and (
+                    os.path.getsize(self.path) + len(lines) > self.max_bytes
+                ):
+                    os.replace(self.path, f"{self.path}.1")
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(lines)
+            except OSError as e:
+                logging.warning(f"⚠️ Не удалось записать события задач в {self.path}: {e}")
+
+
+# Снимок задач у каждого инстанса Nexus свой
+TRACKER = PerInstance(TaskEventTracker)
+EVENT_LOG = EventLog(TASK_EVENTS_FILE) if TASK_EVENTS_FILE else None
+
+
+def record_task_events(tasks: List[dict], run_states: Callable[[], Dict[str, tuple]] = None) -> list:
+    """Считает переходы задач, обновляет метрики и пишет журнал. Возвращает события."""
+    events = TRACKER.observe(tasks, run_states=run_states)
+    extra = {INSTANCE_LABEL: instance_name()} if MULTI_INSTANCE else {}
+
+    for event in events:
+        TASK_EVENTS.labels(type=event["type"], event=event["event"], **extra).inc()
+        if "duration_seconds" in event:
+            TASK_RUN_DURATION.labels(
+                type=event["type"], result=event["result"], **extra
+            ).observe(event["duration_seconds"])
+        logging.debug(
+            "🔁 Задача '%s' (%s): %s", event["task_name"], event["type"], event["event"]
+        )
+
+    if EVENT_LOG is not None and events:
+        if MULTI_INSTANCE:
+            events = [dict(event, instance=instance_name()) for event in events]
+        EVENT_LOG.write(events)
+    if events:
+        logging.info(f"🔁 Событий задач за цикл: {len(events)}")
+    return events
@@ -1,35 +1,47 @@
-from common.logs import logging
-from typing import Optional
-from prometheus_client import Gauge
+from common.logs import logging, ItemLog
+from typing import Mapping, Optional
+from metrics.utils.snapshot import SnapshotGauge
 from metrics.utils.api import get_from_nexus
+from metrics.utils.catalog import get_catalog
 from database.utils.jobs_reader import get_jobs_data
+from metrics.task_events import parse_timestamp, record_task_events, run_states_from_jobs
 from metrics.utils.api_gitlab import get_external_policies
 from common.config import GITLAB_TOKEN, GITLAB_URL, GITLAB_BRANCH
 
 
 # --- Метрики ---
-TASK_INFO = Gauge(
+TASK_INFO = SnapshotGauge(
     "nexus_task_info",
     "Raw info about all Nexus tasks",
     [
         "id",
         "name",
         "type",
-        "message",
         "current_state",
         "last_run_result",
-        "next_run",
-        "last_run",
     ],
 )
 
-TASK_MATCH_INFO = Gauge(
+# Время запусков меняется каждый цикл — держим его значением, а не лейблом
+TASK_NEXT_RUN = SnapshotGauge(
+    "nexus_task_next_run_timestamp_seconds",
+    "Next scheduled run of the Nexus task (unix time)",
+    ["id", "name", "type"],
+)
+
+TASK_LAST_RUN = SnapshotGauge(
+    "nexus_task_last_run_timestamp_seconds",
+    "Last run of the Nexus task (unix time)",
+    ["id", "name", "type"],
+)
+
+TASK_MATCH_INFO = SnapshotGauge(
     "nexus_task_match_info",
     "Filtered tasks with matching blobstore or repository",
     ["task_id", "task_name", "type", "typeName", "match_type", "match_value"],
 )
 
-CUSTOM_POLICY_STATUS = Gauge(
+CUSTOM_POLICY_STATUS = SnapshotGauge(
     "nexus_custom_policy_expired",
     "Status of custom cleanup policies vs Nexus repositories (1 = ok, 0 = expired)",
     ["repo", "policy_url"],
@@ -81,7 +93,10 @@ def fetch_all_from_nexus(NEXUS_API_URL: str, endpoint: str, auth) -> list:
 
 def export_tasks_to_metrics(tasks: list) -> None:
     """Экспорт полной информации о задачах."""
-    TASK_INFO.clear()
+    info = TASK_INFO.buffer()
+    next_runs = TASK_NEXT_RUN.buffer()
+    last_runs = TASK_LAST_RUN.buffer()
+    items = ItemLog("tasks")
     for task in tasks:
         task_id = task.get("id", task.get(".id", "N/A"))
         task_name = task.get("name", task.get(".name", "N/A"))
@@ -90,29 +105,38 @@ def export_tasks_to_metrics(tasks: list) -> None:
         value, icon, label = parse_task_status(last_result)
 
         try:
-            TASK_INFO.labels(
+            info.labels(
                 id=str(task_id),
                 name=str(task_name),
                 type=str(task_type),
-                message=str(task.get("message", "N/A")),
                 current_state=str(task.get("currentState", "N/A")),
                 last_run_result=last_result or "null",
-                next_run=task.get("nextRun") or "null",
-                last_run=task.get("lastRun") or "null",
             ).set(value)
 
-            logging.info(f"📊 [{icon}] Задача '{task_name}' ({task_type}): {label}")
+            next_run = parse_timestamp(task.get("nextRun"))
+            if next_run is not None:
+                next_runs.labels(str(task_id), str(task_name), str(task_type)).set(next_run)
+
+            last_run = parse_timestamp(task.get("lastRun"))
+            if last_run is not None:
+                last_runs.labels(str(task_id), str(task_name), str(task_type)).set(last_run)
+
+            items.info("📊 [%s] Задача '%s' (%s): %s", icon, task_name, task_type, label)
         except Exception as e:
             logging.warning(
-                f"⚠️ Ошибка при экспорте метрик для задачи {task_id}: {e}", exc_info=True
+                "⚠️ Ошибка при экспорте метрик для задачи %s: %s", task_id, e, exc_info=True
             )
 
-    logging.info("✅ Экспорт метрик задач завершён.")
+    TASK_INFO.publish(info)
+    TASK_NEXT_RUN.publish(next_runs)
+    TASK_LAST_RUN.publish(last_runs)
+    items.summary("✅ Экспорт метрик задач завершён: %d задач", items.count)
 
 
 def export_blob_repo_metrics(tasks: list, blobs: list, repos: list) -> None:
     """Экспорт метрик только с blobstore/repo."""
-    TASK_MATCH_INFO.clear()
+    matches = TASK_MATCH_INFO.buffer()
+    items = ItemLog("task_matches")
 
     for task in tasks:
         tid = task.get("id", task.get(".id", "N/A"))
@@ -127,10 +151,10 @@ def export_blob_repo_metrics(tasks: list, blobs: list, repos: list) -> None:
             blob_clean = blob.strip().lower()
             exists = 1 if blob_clean == "*" or blob_clean in blobs else 0
             match_status = "✅" if exists else "❌"
-            logging.info(
-                f"📦 [{match_status}] Задача '{name}' ({task_type}) [blobstore: {blob}]"
+            items.info(
+                "📦 [%s] Задача '%s' (%s) [blobstore: %s]", match_status, name, task_type, blob
             )
-            TASK_MATCH_INFO.labels(
+            matches.labels(
                 task_id=str(tid),
                 task_name=str(name),
                 type=str(task_type),
@@ -143,10 +167,10 @@ def export_blob_repo_metrics(tasks: list, blobs: list, repos: list) -> None:
             repo_clean = repo.strip().lower()
             exists = 1 if repo_clean == "*" or repo_clean in repos else 0
             match_status = "✅" if exists else "❌"
-            logging.info(
-                f"📦 [{match_status}] Задача '{name}' ({task_type}) [repository: {repo}]"
+            items.info(
+                "📦 [%s] Задача '%s' (%s) [repository: %s]", match_status, name, task_type, repo
             )
-            TASK_MATCH_INFO.labels(
+            matches.labels(
                 task_id=str(tid),
                 task_name=str(name),
                 type=str(task_type),
@@ -155,9 +179,8 @@ def export_blob_repo_metrics(tasks: list, blobs: list, repos: list) -> None:
                 match_value=repo,
             ).set(exists)
 
-    logging.info(
-        f"✅ Экспорт blob/repo метрик завершён. Обработано задач: {len(tasks)}"
-    )
+    TASK_MATCH_INFO.publish(matches)
+    items.summary("✅ Экспорт blob/repo метрик завершён. Обработано задач: %d", len(tasks))
 
 
 def fetch_custom_policy_metrics(NEXUS_API_URL, auth) -> None:
@@ -166,33 +189,33 @@ def fetch_custom_policy_metrics(NEXUS_API_URL, auth) -> None:
         "📥 Загружаем список repositories из Nexus для проверки кастомных политик..."
     )
 
-    repos_data = fetch_all_from_nexus(NEXUS_API_URL, "repositories", auth)
+    repos_data = get_catalog(NEXUS_API_URL, "repositories", auth)
     repos = {
         r.get("name", "").lower()
         for r in repos_data
-        if isinstance(r, dict) and "name" in r
+        if isinstance(r, Mapping) and "name" in r
     }
 
     policies = get_external_policies(GITLAB_URL, GITLAB_TOKEN, GITLAB_BRANCH)
-    CUSTOM_POLICY_STATUS.clear()
+    policy_status = CUSTOM_POLICY_STATUS.buffer()
+    items = ItemLog("custom_policies")
 
     for repo_name, policy_url in policies.items():
         repo_clean = repo_name.lower()
         exists = 1 if repo_clean in repos else 0
 
-        CUSTOM_POLICY_STATUS.labels(
+        policy_status.labels(
             repo=repo_name,
             policy_url=policy_url,
         ).set(exists)
 
         status_icon = "✅" if exists else "❌"
-        logging.info(
-            f"📊 [{status_icon}] Repo '{repo_name}' -> {policy_url} (exists={exists})"
+        items.info(
+            "📊 [%s] Repo '%s' -> %s (exists=%d)", status_icon, repo_name, policy_url, exists
         )
 
-    logging.info(
-        f"✅ Экспорт метрик кастомных политик завершён. Проверено: {len(policies)}"
-    )
+    CUSTOM_POLICY_STATUS.publish(policy_status)
+    items.summary("✅ Экспорт метрик кастомных политик завершён. Проверено: %d", len(policies))
 
 
 # --- Основные функции ---
@@ -207,25 +230,27 @@ def fetch_task_metrics(NEXUS_API_URL, auth) -> None:
         f"📥 Получены данные задач Nexus: {len(task_data)} записей. Начинаем экспорт..."
     )
     export_tasks_to_metrics(task_data)
+    # Длительности завершённых запусков — из job_data, только если было что завершить
+    record_task_events(task_data, run_states=lambda: run_states_from_jobs(get_jobs_data()))
 
 
 def fetch_all_blob_and_repo_metrics(NEXUS_API_URL, auth) -> None:
     """Сбор метрик с проверкой blobstore и repository."""
     logging.info("📥 Загружаем список blobstore и repository из Nexus...")
 
-    blobs_data = fetch_all_from_nexus(NEXUS_API_URL, "blobstores", auth)
-    repos_data = fetch_all_from_nexus(NEXUS_API_URL, "repositories", auth)
+    blobs_data = get_catalog(NEXUS_API_URL, "blobstores", auth)
+    repos_data = get_catalog(NEXUS_API_URL, "repositories", auth)
 
-    blobs = [
+    blobs = {
         b.get("name", "").lower()
         for b in blobs_data
-        if isinstance(b, dict) and "name" in b
-    ]
-    repos = [
+        if isinstance(b, Mapping) and "name" in b
+    }
+    repos = {
         r.get("name", "").lower()
         for r in repos_data
-        if isinstance(r, dict) and "name" in r
-    ]
+        if isinstance(r, Mapping) and "name" in r
+    }
 
     logging.info(f"📦 Найдено blobstores: {len(blobs)}, repositories: {len(repos)}")
 
@@ -2,7 +2,10 @@ from common.logs import logging
 import requests
 import urllib3
 import urllib.parse
-from common.config import NEXUS_API_URL
+from typing import Dict
+from common.instances import current_instance
+from common.instrumentation import instrumented, observe_response, record_call_error
+from common.resilience import DependencyUnavailable, begin_call, end_call, http_dependency
 from requests.exceptions import SSLError, RequestException, ConnectionError
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -15,9 +18,63 @@ HEADERS = {
 }
 
 session = requests.Session()
-adapter = requests.adapters.HTTPAdapter(max_retries=0)
+# Пулы соединений держим для многих хостов: proxy-репозитории смотрят в десятки upstream
+adapter = requests.adapters.HTTPAdapter(max_retries=0, pool_connections=64)
 session.mount("https://", adapter)
 session.mount("http://", adapter)
+session.hooks["response"].append(observe_response)
+
+# Запомненное решение verify по хосту: False — хост уже падал на проверке SSL.
+# Общее для requests и AsyncNexusClient, живёт весь процесс: неудачный
+# handshake не повторяется на каждом запросе.
+_TLS_VERIFY: Dict[str, bool] = {}
+
+
+def tls_verify(url: str) -> bool:
+    return _TLS_VERIFY.get(urllib.parse.urlsplit(url).netloc or url, True)
+
+
+def remember_insecure(url: str, error: Exception) -> None:
+    host = urllib.parse.urlsplit(url).netloc or url
+    if _TLS_VERIFY.get(host, True):
+        logging.warning(
+            f"⚠️ SSL ошибка при запросе к {url}: {error}. Для {host} дальше используется verify=False"
+        )
+    _TLS_VERIFY[host] = False
+
+
+def _get(url: str, timeout: float, verify: bool, **kwargs):
+    """
+    session.get под предохранителем хоста и бюджетом цикла.
+    Бросает DependencyUnavailable, если вызов пропущен.
+    """
+    dependency = http_dependency(url)
+    timeout = begin_call(dependency, timeout)
+    try:
+        response = session.get(url, timeout=timeout, verify=verify, **kwargs)
+    except SSLError:
+        # Хост ответил, просто с непроверяемым сертификатом — это не отказ
+        end_call(dependency, True)
+        raise
+    except RequestException:
+        end_call(dependency, False)
+        raise
+    end_call(dependency, response.status_code < 500)
+    return response
+
+
+def _get_tls(url: str, timeout: float, **kwargs):
+    """
+    _get с запомненным для хоста verify: после первой SSL-ошибки хост
+    запрашивается сразу с verify=False, без повторного неудачного handshake.
+    """
+    if not tls_verify(url):
+        return _get(url, timeout, verify=False, **kwargs)
+    try:
+        return _get(url, timeout, verify=True, **kwargs)
+    except SSLError as ssl_err:
+        remember_insecure(url, ssl_err)
+        return _get(url, timeout, verify=False, **kwargs)
 
 
 def get_from_nexus(nexus_url: str, endpoint: str, auth: tuple, timeout: int = 20):
@@ -25,69 +82,72 @@ def get_from_nexus(nexus_url: str, endpoint: str, auth: tuple, timeout: int = 20
     return safe_get_json(full_url, auth, timeout)
 
 
+@instrumented("http", "safe_get_json")
 def safe_get_json(url: str, auth: tuple, timeout: int = 20):
     try:
-        response = session.get(
-            url, auth=auth, headers=HEADERS, timeout=timeout, verify=True
-        )
+        response = _get_tls(url, timeout, auth=auth, headers=HEADERS)
         response.raise_for_status()
         return response.json()
-    except SSLError as ssl_err:
-        logging.warning(f"⚠️ SSL ошибка при запросе к {url}: {ssl_err}")
-        try:
-            response = session.get(
-                url, auth=auth, headers=HEADERS, timeout=timeout, verify=False
-            )
-            logging.warning(f"⚠️ Использован verify=False для {url}")
-            response.raise_for_status()
-            return response.json()
-        except RequestException as e:
-            logging.error(f"❌ Ошибка запроса без verify: {e}")
-            return []
+    except DependencyUnavailable as e:
+        logging.debug("⏭️ Запрос к %s пропущен: %s", url, e)
+        return []
     except (ConnectionError, RequestException) as e:
-        logging.error(f"❌ Ошибка подключения к {url}: {e}")
+        logging.error("❌ Ошибка подключения к %s: %s", url, e)
+        record_call_error("http", "safe_get_json")
         return []
 
 
-def build_nexus_url(repo, image, encoding=True):
+@instrumented("http", "get_conditional")
+def get_from_nexus_conditional(
+    nexus_url: str, endpoint: str, auth: tuple, etag: str = None, timeout: int = 20
+):
+    """
+    GET JSON из Nexus API с If-None-Match.
+    Возвращает (data, etag, not_modified); при ошибке — (None, None, False).
+    """
+    url = f"{nexus_url.rstrip('/')}/service/rest/v1/{endpoint.lstrip('/')}"
+    headers = dict(HEADERS)
+    if etag:
+        headers["If-None-Match"] = etag
+
+    try:
+        response = _get_tls(url, timeout, auth=auth, headers=headers)
+        if response.status_code == 304:
+            return None, etag, True
+        response.raise_for_status()
+        return response.json(), response.headers.get("ETag"), False
+    except DependencyUnavailable as e:
+        logging.debug("⏭️ Запрос к %s пропущен: %s", url, e)
+        return None, None, False
+    except (ConnectionError, RequestException, ValueError) as e:
+        logging.error("❌ Ошибка подключения к %s: %s", url, e)
+        record_call_error("http", "get_conditional")
+        return None, None, False
+
+
+def build_nexus_url(repo, image, encoding=True, base_url=None):
+    """Ссылка на образ в UI Nexus; base_url по умолчанию — текущего инстанса."""
     path = f"v2/{image}/tags"
     if encoding:
         path = urllib.parse.quote(path, safe="")
-    return f"{NEXUS_API_URL}#browse/browse:{repo}:{path}"
+    return f"{base_url or current_instance().api_url}#browse/browse:{repo}:{path}"
 
 
+@instrumented("http", "safe_get_raw")
 def safe_get_raw(url: str, auth: tuple = None, timeout: int = 20):
     try:
-        response = session.get(
-            url,
-            auth=auth,
-            headers=HEADERS,
-            timeout=timeout,
-            verify=True,
-            allow_redirects=True,
-        )
+        response = _get_tls(url, timeout, auth=auth, headers=HEADERS, allow_redirects=True)
         return response, None
-    except SSLError as ssl_err:
-        logging.warning(f"⚠️ SSL ошибка при обращении к {url}: {ssl_err}")
-        try:
-            response = session.get(
-                url,
-                auth=auth,
-                headers=HEADERS,
-                timeout=timeout,
-                verify=False,
-                allow_redirects=True,
-            )
-            logging.warning(f"⚠️ Использован verify=False для {url}")
-            return response, None
-        except RequestException as e:
-            logging.warning(f"❌ Ошибка (без verify) при обращении к {url}: {e}")
-            return None, e
+    except DependencyUnavailable as e:
+        logging.debug("⏭️ Обращение к %s пропущено: %s", url, e)
+        return None, e
     except ConnectionError as e:
-        logging.warning(f"❌ Ошибка подключения к {url}: {e}")
+        logging.warning("❌ Ошибка подключения к %s: %s", url, e)
+        record_call_error("http", "safe_get_raw")
         return None, e
     except RequestException as e:
-        logging.warning(f"❌ Ошибка запроса к {url}: {e}")
+        logging.warning("❌ Ошибка запроса к %s: %s", url, e)
+        record_call_error("http", "safe_get_raw")
         return None, e
 
 
@@ -110,13 +170,13 @@ def post_to_nexus(
             verify=True,
         )
         if 200 <= resp.status_code < 300:
-            logging.info(f"✅ POST {url} → {resp.status_code}")
+            logging.info("✅ POST %s → %s", url, resp.status_code)
             return True
         else:
-            logging.error(f"❌ Ошибка POST {url}: {resp.status_code} {resp.text}")
+            logging.error("❌ Ошибка POST %s: %s %s", url, resp.status_code, resp.text)
             return False
     except RequestException as e:
-        logging.error(f"❌ Ошибка POST {url}: {e}")
+        logging.error("❌ Ошибка POST %s: %s", url, e)
         return False
 
 
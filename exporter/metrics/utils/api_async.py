@@ -0,0 +1,214 @@
+import asyncio
+import ssl
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from common.logs import logging
+from common.config import (
+    HTTP_MAX_CONNECTIONS_PER_HOST,
+    HTTP_RETRIES,
+    HTTP_RETRY_BACKOFF,
+)
+from common.instrumentation import (
+    CALL_DURATION,
+    CALLS,
+    observe_response,
+    record_call_error,
+)
+from common.instances import PerInstance
+from common.resilience import DependencyUnavailable, begin_call, end_call, http_dependency
+from metrics.utils.api import HEADERS, remember_insecure, tls_verify
+
+
+def _host(url: str) -> str:
+    parts = urlsplit(url)
+    return parts.netloc or url
+
+
+def _is_ssl_error(error: Exception) -> bool:
+    current = error
+    while current is not None:
+        if isinstance(current, ssl.SSLError):
+            return True
+        current = current.__cause__ or current.__context__
+    return "CERTIFICATE_VERIFY_FAILED" in str(error)
+
+
+class AsyncNexusClient:
+    """
+    Асинхронный аналог metrics.utils.api с тем же набором вызовов.
+
+    - лимит одновременных запросов на хост;
+    - повторы с экспоненциальным backoff при сетевых ошибках;
+    - решение verify=False запоминается для хоста после первой SSL-ошибки
+      (общее с metrics.utils.api).
+
+    Использовать как async context manager в пределах одного event loop.
+    """
+
+    def __init__(
+        self,
+        max_per_host: int = HTTP_MAX_CONNECTIONS_PER_HOST,
+        retries: int = HTTP_RETRIES,
+        backoff: float = HTTP_RETRY_BACKOFF,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.max_per_host = max_per_host
+        self.retries = retries
+        self.backoff = backoff
+        self._transport = transport
+        self._clients: Dict[bool, httpx.AsyncClient] = {}
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+
+    def _client(self, verify: bool) -> httpx.AsyncClient:
+        client = self._clients.get(verify)
+        if client is None:
+            client = httpx.AsyncClient(
+                verify=verify,
+                headers=HEADERS,
+                transport=self._transport,
+                limits=httpx.Limits(max_keepalive_connections=self.max_per_host),
+            )
+            self._clients[verify] = client
+        return client
+
+    def _limit(self, host: str) -> asyncio.Semaphore:
+        semaphore = self._host_limits.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_per_host)
+            self._host_limits[host] = semaphore
+        return semaphore
+
+    async def _send(self, url, auth, timeout, follow_redirects) -> httpx.Response:
+        host = _host(url)
+        verify = tls_verify(url)
+        attempt = 0
+
+        while True:
+            try:
+                async with self._limit(host):
+                    return await self._client(verify).get(
+                        url,
+                        auth=auth,
+                        timeout=timeout,
+                        follow_redirects=follow_redirects,
+                    )
+            except httpx.TransportError as e:
+                if verify and _is_ssl_error(e):
+                    remember_insecure(url, e)
+                    verify = False
+                    continue
+
+                if attempt >= self.retries:
+                    raise
+                delay = self.backoff * (2**attempt)
+                attempt += 1
+                logging.warning(
+                    f"🔁 Повтор {attempt}/{self.retries} для {url} через {delay:.1f} сек: {e}"
+                )
+                await asyncio.sleep(delay)
+
+    async def _get(self, call, url, auth, timeout, follow_redirects):
+        dependency = http_dependency(url)
+        timeout = begin_call(dependency, timeout)
+        CALLS.labels(kind="http", call=call).inc()
+        start = time.perf_counter()
+        try:
+            response = await self._send(url, auth, timeout, follow_redirects)
+        except httpx.TransportError:
+            end_call(dependency, False)
+            raise
+        else:
+            end_call(dependency, response.status_code < 500)
+            observe_response(response)
+            return response
+        finally:
+            CALL_DURATION.labels(kind="http", call=call).observe(
+                time.perf_counter() - start
+            )
+
+    async def get_from_nexus(
+        self, nexus_url: str, endpoint: str, auth: tuple, timeout: int = 20
+    ):
+        full_url = f"{nexus_url.rstrip('/')}/service/rest/v1/{endpoint.lstrip('/')}"
+        return await self.safe_get_json(full_url, auth, timeout)
+
+    async def safe_get_json(self, url: str, auth: tuple, timeout: int = 20):
+        try:
+            response = await self._get("async_get_json", url, auth, timeout, False)
+            response.raise_for_status()
+            return response.json()
+        except DependencyUnavailable as e:
+            logging.debug("⏭️ Запрос к %s пропущен: %s", url, e)
+            return []
+        except (httpx.HTTPError, ValueError) as e:
+            logging.error("❌ Ошибка подключения к %s: %s", url, e)
+            record_call_error("http", "async_get_json")
+            return []
+
+    async def safe_get_raw(self, url: str, auth: tuple = None, timeout: int = 20):
+        try:
+            response = await self._get("async_get_raw", url, auth, timeout, True)
+            return response, None
+        except DependencyUnavailable as e:
+            logging.debug("⏭️ Обращение к %s пропущено: %s", url, e)
+            return None, e
+        except httpx.HTTPError as e:
+            logging.warning("❌ Ошибка запроса к %s: %s", url, e)
+            record_call_error("http", "async_get_raw")
+            return None, e
+
+
+class _ClientLoop:
+    """
+    Долгоживущие event loop и AsyncNexusClient одного инстанса Nexus:
+    пул соединений httpx (keep-alive, TLS-сессии) переживает циклы сбора.
+    Вызовы из разных потоков выполняются по очереди.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop = None
+        self._client = None
+
+    def run(self, func):
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                self._loop = asyncio.new_event_loop()
+                self._client = AsyncNexusClient()
+            return self._loop.run_until_complete(func(self._client))
+
+
+# Свой клиент у каждого инстанса: у них разные хосты и свои потоки сбора
+_SHARED = PerInstance(_ClientLoop)
+
+
+def run_with_client(func, **client_kwargs):
+    """
+    Синхронная точка входа для коллекторов: func(client) — корутина.
+    Без client_kwargs выполняется в общем клиенте текущего инстанса;
+    с ними — в отдельном event loop с новым клиентом (тесты, особые настройки).
+    """
+    if not client_kwargs:
+        return _SHARED.run(func)
+
+    async def _run():
+        async with AsyncNexusClient(**client_kwargs) as client:
+            return await func(client)
+
+    return asyncio.run(_run())
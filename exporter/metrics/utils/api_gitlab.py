@@ -1,8 +1,19 @@
 import gitlab
 import yaml
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from common.logs import logging
+from common.config import (
+    GITLAB_GROUP_ID,
+    GITLAB_POLICY_PATH,
+    GITLAB_POLICY_CACHE_FILE,
+    GITLAB_POLICY_REFRESH_INTERVAL,
+    GITLAB_SCAN_WORKERS,
+)
 import urllib3
-import base64
 from io import StringIO
 from typing import Dict
 
@@ -16,174 +27,262 @@ def get_gitlab_connection(gitlab_url: str, gitlab_token: str) -> gitlab.Gitlab:
     return gl
 
 
-def process_yaml_file(
-    project, file_info: Dict, branch: str, result: Dict, gitlab_url: str
-) -> bool:
-    """Обработка одного YAML файла"""
-    file_path = file_info["path"]
-    try:
-        file_content = (
-            project.files.get(file_path=file_path, ref=branch).decode().decode("utf-8")
-        )
-        data = yaml.safe_load(StringIO(file_content))
+class PolicyDiscovery:
+    """
+    Фоновый поиск внешних политик очистки в проектах группы GitLab.
 
-        if not isinstance(data, dict) or "repo_names" not in data:
-            return False
+    Кэш хранится по проектам: проект пересканируется только если изменился
+    его last_activity_at, а YAML-файл скачивается только при смене blob SHA.
+    Кэш переживает рестарт (JSON на диске), обновление идёт в отдельном
+    потоке по своему расписанию.
+    """
 
-        file_link = (
-            f"{gitlab_url}/{project.path_with_namespace}/-/blob/{branch}/{file_path}"
+    def __init__(
+        self,
+        gitlab_url: str,
+        gitlab_token: str,
+        branch: str,
+        group_id: int = GITLAB_GROUP_ID,
+        target_path: str = GITLAB_POLICY_PATH,
+        cache_file: str = GITLAB_POLICY_CACHE_FILE,
+        workers: int = GITLAB_SCAN_WORKERS,
+        interval: int = GITLAB_POLICY_REFRESH_INTERVAL,
+    ):
+        self.gitlab_url = gitlab_url
+        self.gitlab_token = gitlab_token
+        self.branch = branch
+        self.group_id = group_id
+        self.target_path = target_path
+        self.cache_file = cache_file
+        self.workers = workers
+        self.interval = interval
+
+        self._projects: Dict[str, dict] = {}
+        self._policies: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+        self.load_cache()
+
+    # --- Кэш на диске ---
+    def load_cache(self) -> None:
+        try:
+            with open(self.cache_file, encoding="utf-8") as f:
+                cache = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logging.warning(f"⚠️ Не удалось прочитать кэш политик {self.cache_file}: {e}")
+            return
+
+        if cache.get("branch") != self.branch or cache.get("path") != self.target_path:
+            logging.info("♻️ Кэш политик собран для другой ветки или пути — игнорируем")
+            return
+
+        self._projects = cache.get("projects", {})
+        self._policies = self._build_policies(self._projects)
+        logging.info(
+            f"📂 Загружен кэш политик: проектов {len(self._projects)}, политик {len(self._policies)}"
         )
 
-        for repo_name in data["repo_names"]:
-            if repo_name in result:
-                logging.warning(
-                    f"⚠️ Повтор: '{repo_name}' уже был добавлен. Файл: {file_link}"
+    def save_cache(self) -> None:
+        cache = {"branch": self.branch, "path": self.target_path, "projects": self._projects}
+        tmp_file = f"{self.cache_file}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.cache_file) or ".", exist_ok=True)
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(cache, f, ensure_ascii=False)
+            os.replace(tmp_file, self.cache_file)
+        except OSError as e:
+            logging.warning(f"⚠️ Не удалось сохранить кэш политик {self.cache_file}: {e}")
+
+    # --- Сканирование ---
+    def _scan_project(self, gl: gitlab.Gitlab, project_info) -> dict:
+        project_id = str(project_info.id)
+        cached = self._projects.get(project_id)
+        last_activity = getattr(project_info, "last_activity_at", None)
+
+        if cached and last_activity and cached.get("last_activity_at") == last_activity:
+            return cached
+
+        project = gl.projects.get(project_info.id, lazy=True)
+        cached_files = (cached or {}).get("files", {})
+        files = {}
+        # Любая ошибка чтения из GitLab — повод пересканировать проект в следующий раз
+        complete = True
+
+        try:
+            items = project.repository_tree(
+                path=self.target_path, recursive=True, ref=self.branch, get_all=True
+            )
+        except gitlab.exceptions.GitlabGetError as e:
+            if e.response_code != 404:
+                logging.error(
+                    f"❌ Ошибка чтения дерева {project_info.path_with_namespace}: {str(e)}"
+                )
+                return self._incomplete(project_info, cached_files)
+            logging.debug("⏭️ Пропуск %s: путь не найден", project_info.path_with_namespace)
+            items = []
+
+        for item in items:
+            if item["type"] != "blob" or not item["name"].endswith((".yml", ".yaml")):
+                continue
+
+            file_path, sha = item["path"], item["id"]
+            cached_file = cached_files.get(file_path)
+            if cached_file and cached_file.get("sha") == sha:
+                files[file_path] = cached_file
+                continue
+
+            try:
+                content = project.repository_raw_blob(sha).decode("utf-8")
+            except Exception as e:
+                logging.error(
+                    f"❌ Ошибка в файле {file_path} ({project_info.path_with_namespace}): {str(e)}"
                 )
-            else:
-                result[repo_name] = file_link
-        return True
+                complete = False
+                # До успешного чтения остаётся прошлая версия файла
+                if cached_file:
+                    files[file_path] = cached_file
+                continue
+
+            try:
+                repo_names = parse_policy_file(content)
+            except yaml.YAMLError as e:
+                logging.error(
+                    f"❌ Некорректный YAML {file_path} ({project_info.path_with_namespace}): {str(e)}"
+                )
+                repo_names = []
+            files[file_path] = {"sha": sha, "repo_names": repo_names}
+            logging.debug("✅ Обработан: %s", file_path)
+
+        if not complete:
+            return self._incomplete(project_info, files)
+        return {
+            "last_activity_at": last_activity,
+            "path_with_namespace": project_info.path_with_namespace,
+            "files": files,
+        }
+
+    @staticmethod
+    def _incomplete(project_info, files: Dict[str, dict]) -> dict:
+        """Запись без last_activity_at: проект пересканируется в следующем цикле"""
+        return {
+            "last_activity_at": None,
+            "path_with_namespace": project_info.path_with_namespace,
+            "files": files,
+        }
+
+    def _build_policies(self, projects: Dict[str, dict]) -> Dict[str, str]:
+        result = {}
+        for project in sorted(projects.values(), key=lambda p: p["path_with_namespace"]):
+            for file_path, file_info in sorted(project["files"].items()):
+                file_link = (
+                    f"{self.gitlab_url}/{project['path_with_namespace']}"
+                    f"/-/blob/{self.branch}/{file_path}"
+                )
+                for repo_name in file_info["repo_names"]:
+                    if repo_name in result:
+                        logging.warning(
+                            f"⚠️ Повтор: '{repo_name}' уже был добавлен. Файл: {file_link}"
+                        )
+                    else:
+                        result[repo_name] = file_link
+        return result
+
+    def refresh(self) -> None:
+        logging.info(f"🔗 Обновление внешних политик из GitLab: {self.gitlab_url}")
+        start = time.perf_counter()
+
+        gl = get_gitlab_connection(self.gitlab_url, self.gitlab_token)
+        group = gl.groups.get(self.group_id)
+        projects_info = group.projects.list(all=True, include_subgroups=True)
+
+        projects = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self._scan_project, gl, p): p for p in projects_info}
+            for future in as_completed(futures):
+                project_info = futures[future]
+                project_id = str(project_info.id)
+                try:
+                    projects[project_id] = future.result()
+                except Exception as e:
+                    logging.error(
+                        f"❌ Ошибка при обработке проекта {project_info.path_with_namespace}: {str(e)}"
+                    )
+                    # Оставляем прошлое состояние проекта, если оно было
+                    if project_id in self._projects:
+                        projects[project_id] = self._projects[project_id]
+
+        policies = self._build_policies(projects)
+        with self._lock:
+            self._projects = projects
+            self._policies = policies
+        self.save_cache()
 
-    except Exception as e:
-        logging.error(
-            f"❌ Ошибка в файле {file_path} ({project.path_with_namespace}): {str(e)}"
+        logging.info(
+            f"✅ Политики обновлены за {time.perf_counter() - start:.2f} сек: "
+            f"проектов {len(projects)}, политик {len(policies)}"
         )
-        return False
 
+    def _run(self) -> None:
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                logging.error(f"⛔ Критическая ошибка при получении политик: {str(e)}")
+            time.sleep(self.interval)
 
-def scan_project_for_policies(
-    project, branch: str, target_path: str, gitlab_url: str
-) -> Dict:
-    """Сканирование одного проекта на наличие политик"""
-    result = {}
-    try:
-        items = project.repository_tree(path=target_path, recursive=True, ref=branch)
-        yaml_files = [
-            item
-            for item in items
-            if item["type"] == "blob" and item["name"].endswith((".yml", ".yaml"))
-        ]
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="gitlab-policies", daemon=True
+            )
+            self._thread.start()
 
-        if not yaml_files:
-            logging.debug(f"⏭️ Пропуск {project.path_with_namespace}: нет YAML файлов")
-            return result
+    def policies(self) -> Dict[str, str]:
+        with self._lock:
+            return dict(self._policies)
 
-        logging.info(
-            f"📁 Проект {project.path_with_namespace}: найдено {len(yaml_files)} файлов"
-        )
 
-        for file in yaml_files:
-            if process_yaml_file(project, file, branch, result, gitlab_url):
-                logging.debug(f"✅ Обработан: {file['path']}")
+def parse_policy_file(content: str) -> list:
+    """Возвращает repo_names из YAML-политики или пустой список"""
+    data = yaml.safe_load(StringIO(content))
+    if not isinstance(data, dict) or "repo_names" not in data:
+        return []
+    return [str(name) for name in data["repo_names"] or []]
 
-    except gitlab.exceptions.GitlabGetError:
-        logging.info(f"⏭️ Пропуск {project.path_with_namespace}: путь не найден")
-    except Exception as e:
-        logging.error(f"❌ Ошибка проекта {project.path_with_namespace}: {str(e)}")
-
-    return result
-
-
-# def get_external_policies(
-#     gitlab_url: str,
-#     gitlab_token: str,
-#     gitlab_branch: str,
-#     group_id: int = 3514,
-#     target_path: str = "nexus/cleaner",
-# ) -> Dict[str, str]:
-#     """
-#     Получает политики из всех проектов группы GitLab.
-#     Ищет YAML-файлы в пути nexus/cleaner, извлекает repo_names.
-
-#     Возвращает:
-#         { repo_name: ссылка_на_файл }
-#     """
-#     logging.info(f"🔗 Подключение к GitLab: {gitlab_url}")
-#     result = {}
-
-#     try:
-#         gl = get_gitlab_connection(gitlab_url, gitlab_token)
-#         group = gl.groups.get(group_id)
-#         projects = group.projects.list(all=True, include_subgroups=True)
-
-#         logging.info(f"📦 Найдено проектов в группе: {len(projects)}")
-
-#         for project_info in projects:
-#             try:
-#                 project = gl.projects.get(project_info.id)
-#                 logging.debug(f"🔍 Сканирование проекта: {project.path_with_namespace}")
-
-#                 # Получаем список файлов в target_path
-#                 items = project.repository_tree(
-#                     path=target_path, recursive=True, ref=gitlab_branch
-#                 )
-#                 yaml_files = [
-#                     item
-#                     for item in items
-#                     if item["type"] == "blob"
-#                     and item["name"].endswith((".yml", ".yaml"))
-#                 ]
-
-#                 if not yaml_files:
-#                     continue
-
-#                 logging.info(
-#                     f"📁 Проект {project.path_with_namespace}: найдено {len(yaml_files)} YAML файлов"
-#                 )
-
-#                 for file_info in yaml_files:
-#                     file_path = file_info["path"]
-#                     try:
-#                         file_obj = project.files.get(
-#                             file_path=file_path, ref=gitlab_branch
-#                         )
-#                         # ✅ base64-декодирование содержимого
-#                         file_content = base64.b64decode(file_obj.content).decode(
-#                             "utf-8"
-#                         )
-
-#                         data = yaml.safe_load(StringIO(file_content))
-#                         if not isinstance(data, dict) or "repo_names" not in data:
-#                             continue
-
-#                         file_link = f"{gitlab_url}/{project.path_with_namespace}/-/blob/{gitlab_branch}/{file_path}"
-
-#                         for repo_name in data["repo_names"]:
-#                             if repo_name in result:
-#                                 logging.warning(
-#                                     f"⚠️ Повтор: '{repo_name}' уже был добавлен. Файл: {file_link}"
-#                                 )
-#                             else:
-#                                 result[repo_name] = file_link
-
-#                     except Exception as e:
-#                         logging.error(
-#                             f"❌ Ошибка чтения файла {file_path} в проекте {project.path_with_namespace}: {str(e)}"
-#                         )
-
-#             except Exception as e:
-#                 logging.error(
-#                     f"❌ Ошибка при обработке проекта {project_info.name}: {str(e)}"
-#                 )
-
-#         logging.info(f"✅ Завершено. Собрано политик: {len(result)}")
-#         return result
-
-#     except Exception as e:
-#         logging.error(f"⛔ Критическая ошибка при получении политик: {str(e)}")
-#         return {}
+
+_discovery = None
+_discovery_lock = threading.Lock()
 
 
 def get_external_policies(
     gitlab_url: str,
     gitlab_token: str,
     gitlab_branch: str,
-    target_path: str = "nexus/cleaner",
+    target_path: str = GITLAB_POLICY_PATH,
 ) -> Dict[str, str]:
-    return {
-        "dckr": "https://gitlab.example.com/team/configs/-/blob/master/nexus/cleaner/policy1.yaml",
-        "docker": "https://gitlab.example.com/team/configs/-/blob/master/nexus/cleaner/policy2.yaml",
-        "nexus-repo-3": "https://gitlab.example.com/devops/cleanup/-/blob/master/nexus/cleaner/policy3.yml",
-    }
+    """
+    Политики из всех проектов группы GitLab: { repo_name: ссылка_на_файл }.
+
+    Не блокирует вызывающего: отдаёт последнее известное состояние (в том числе
+    из кэша на диске), а обновление идёт в фоновом потоке.
+    """
+    global _discovery
+
+    if not gitlab_token:
+        logging.warning("⚠️ GITLAB_TOKEN не задан — внешние политики не загружаются")
+        return {}
+
+    with _discovery_lock:
+        if _discovery is None:
+            _discovery = PolicyDiscovery(
+                gitlab_url, gitlab_token, gitlab_branch, target_path=target_path
+            )
+            _discovery.start()
+
+    return _discovery.policies()
 
 
 def get_gitlab_file_content(
@@ -0,0 +1,103 @@
+import threading
+import time
+from types import MappingProxyType
+from typing import Dict, Optional, Tuple
+
+from common.logs import logging
+from common.config import CATALOG_TTL
+from common.instances import instance_name
+from metrics.utils.api import get_from_nexus_conditional
+
+
+def freeze(data):
+    """Неизменяемая копия JSON: dict → MappingProxyType, list → tuple."""
+    if isinstance(data, dict):
+        return MappingProxyType({k: freeze(v) for k, v in data.items()})
+    if isinstance(data, list):
+        return tuple(freeze(v) for v in data)
+    return data
+
+
+class _CatalogEntry:
+    __slots__ = ("data", "etag", "fetched_at", "cycle")
+
+    def __init__(self, data, etag: Optional[str], fetched_at: float, cycle: int):
+        self.data = data
+        self.etag = etag
+        self.fetched_at = fetched_at
+        self.cycle = cycle
+
+
+class NexusCatalog:
+    """
+    Общий для коллекторов кэш справочных эндпоинтов Nexus.
+
+    Каждый эндпоинт запрашивается не чаще раза за цикл (и не реже, чем раз
+    в ttl секунд). Циклы считаются по инстансам Nexus: новый цикл одного
+    инстанса не заставляет перепроверять справочники остальных. При смене
+    цикла ответ перепроверяется через If-None-Match, если Nexus отдал ETag.
+    Коллекторы получают неизменяемые снимки.
+    """
+
+    def __init__(self, ttl: int = CATALOG_TTL):
+        self.ttl = ttl
+        self._entries: Dict[Tuple[str, str], _CatalogEntry] = {}
+        self._cycles: Dict[str, int] = {}
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def begin_cycle(self) -> None:
+        """Новый цикл сбора: справочники будут перепроверены при первом обращении."""
+        name = instance_name()
+        self._cycles[name] = self._cycles.get(name, 0) + 1
+
+    @property
+    def _cycle(self) -> int:
+        return self._cycles.get(instance_name(), 0)
+
+    def _lock(self, key) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _is_fresh(self, entry: _CatalogEntry) -> bool:
+        return entry.cycle == self._cycle and time.time() - entry.fetched_at < self.ttl
+
+    def get(self, nexus_url: str, endpoint: str, auth: tuple) -> tuple:
+        key = (nexus_url.rstrip("/"), endpoint.strip("/"))
+
+        # Коллекторы из разных потоков ждут одного запроса, а не шлют свои
+        with self._lock(key):
+            entry = self._entries.get(key)
+            if entry is not None and self._is_fresh(entry):
+                return entry.data
+
+            data, etag, not_modified = get_from_nexus_conditional(
+                nexus_url, endpoint, auth, etag=entry.etag if entry else None
+            )
+
+            if not_modified and entry is not None:
+                logging.info(f"📚 {endpoint}: не изменился (ETag {entry.etag})")
+                entry.fetched_at = time.time()
+                entry.cycle = self._cycle
+                return entry.data
+
+            if data is None:
+                return ()
+
+            frozen = freeze(data)
+            self._entries[key] = _CatalogEntry(
+                frozen, etag, time.time(), self._cycle
+            )
+            logging.info(f"📚 {endpoint}: получено {len(frozen)} записей")
+            return frozen
+
+    def invalidate(self) -> None:
+        self._entries.clear()
+
+
+CATALOG = NexusCatalog()
+
+
+def get_catalog(nexus_url: str, endpoint: str, auth: tuple) -> tuple:
+    """Неизменяемый снимок эндпоинта Nexus за текущий цикл."""
+    return CATALOG.get(nexus_url, endpoint, auth)
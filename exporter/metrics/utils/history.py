@@ -0,0 +1,63 @@
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, Optional
+
+
+def growth_rate(history) -> Optional[float]:
+    """Наклон линейной регрессии value(t) по окну, единиц/сек."""
+    if len(history) < 2:
+        return None
+    n = len(history)
+    mean_t = sum(t for t, _ in history) / n
+    mean_v = sum(v for _, v in history) / n
+    denominator = sum((t - mean_t) ** 2 for t, _ in history)
+    if denominator == 0:
+        return None
+    return sum((t - mean_t) * (v - mean_v) for t, v in history) / denominator
+
+
+class SizeHistory:
+    """Кольцевые буферы (timestamp, value) по ключу — последние maxlen замеров."""
+
+    def __init__(self, maxlen: int):
+        self.maxlen = maxlen
+        self._series: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+    def __contains__(self, key) -> bool:
+        return key in self._series
+
+    def record(self, key: str, value: float, now: float = None) -> deque:
+        with self._lock:
+            series = self._series.setdefault(key, deque(maxlen=self.maxlen))
+            series.append((now if now is not None else time.time(), float(value)))
+            return series
+
+    def get(self, key: str) -> Optional[deque]:
+        return self._series.get(key)
+
+    def delta(self, key: str) -> Optional[float]:
+        """Изменение с предыдущего замера."""
+        series = self._series.get(key)
+        if not series or len(series) < 2:
+            return None
+        return series[-1][1] - series[-2][1]
+
+    def rate(self, key: str) -> Optional[float]:
+        series = self._series.get(key)
+        return growth_rate(series) if series else None
+
+    def retain(self, keys: Iterable[str]) -> None:
+        """Забывает ключи, которых больше нет (удалённые репозитории и т.п.)."""
+        keep = set(keys)
+        with self._lock:
+            for key in [k for k in self._series if k not in keep]:
+                del self._series[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
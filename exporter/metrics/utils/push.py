@@ -0,0 +1,249 @@
+import gzip
+import os
+import threading
+import time
+from typing import List, Optional
+
+import requests
+from prometheus_client import Counter, Gauge
+from prometheus_client.utils import floatToGoString
+
+from common.logs import logging
+from common.config import (
+    VM_PUSH_URL,
+    VM_PUSH_USERNAME,
+    VM_PUSH_PASSWORD,
+    VM_PUSH_EXTRA_LABELS,
+    VM_PUSH_FLUSH_INTERVAL,
+    VM_PUSH_BATCH_BYTES,
+    VM_PUSH_TIMEOUT,
+    VM_PUSH_QUEUE_DIR,
+    VM_PUSH_QUEUE_MAX_BYTES,
+)
+from common.instances import INSTANCE_LABEL, instance_name
+from metrics.utils.snapshot import add_publish_listener
+
+
+IMPORT_PATH = "/api/v1/import/prometheus"
+# Если очередь на диске не пуста, повторяем отправку хотя бы раз в минуту
+RETRY_INTERVAL = 60
+
+PUSH_REQUESTS = Counter(
+    "nexus_exporter_push_requests",
+    "Запросы импорта в VictoriaMetrics",
+    ["result"],
+)
+PUSH_SAMPLES = Counter(
+    "nexus_exporter_push_samples",
+    "Сэмплы, поставленные в очередь на отправку в VictoriaMetrics",
+)
+PUSH_QUEUE_BYTES = Gauge(
+    "nexus_exporter_push_queue_bytes",
+    "Размер очереди неотправленных пачек на диске",
+)
+PUSH_DROPPED = Counter(
+    "nexus_exporter_push_dropped_batches",
+    "Пачки, удалённые из переполненной очереди на диске",
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def render_collector(collector, timestamp_ms: int, instance: Optional[str] = None) -> bytes:
+    """
+    Текстовый формат Prometheus с явной меткой времени у каждого сэмпла.
+    С instance отдаются только серии этого инстанса (по лейблу nexus_instance).
+    """
+    lines = []
+    for family in collector.collect():
+        for sample in family.samples:
+            if instance is not None and sample.labels.get(INSTANCE_LABEL, instance) != instance:
+                continue
+            labels = ",".join(
+                f'{name}="{_escape(str(value))}"' for name, value in sample.labels.items()
+            )
+            series = f"{sample.name}{{{labels}}}" if labels else sample.name
+            lines.append(f"{series} {floatToGoString(sample.value)} {timestamp_ms}\n")
+    return "".join(lines).encode("utf-8")
+
+
+def split_batches(chunks: List[bytes], limit: int) -> List[bytes]:
+    """Склеивает отрисованные снимки в пачки не больше limit байт (по границам строк)."""
+    batches, current, size = [], [], 0
+    for chunk in chunks:
+        for line in chunk.splitlines(keepends=True):
+            if current and size + len(line) > limit:
+                batches.append(b"".join(current))
+                current, size = [], 0
+            current.append(line)
+            size += len(line)
+    if current:
+        batches.append(b"".join(current))
+    return batches
+
+
+class VictoriaMetricsPusher:
+    """
+    Отправляет каждый опубликованный снимок метрики в VictoriaMetrics.
+
+    Снимки копятся flush_interval секунд и уходят gzip-пачками. Пачка,
+    которую не удалось отправить, сохраняется в queue_dir и повторяется
+    позже; очередь ограничена queue_max_bytes (удаляются самые старые).
+    """
+
+    def __init__(
+        self,
+        url: str,
+        queue_dir: str = VM_PUSH_QUEUE_DIR,
+        auth: Optional[tuple] = None,
+        extra_labels: str = VM_PUSH_EXTRA_LABELS,
+        flush_interval: float = VM_PUSH_FLUSH_INTERVAL,
+        batch_bytes: int = VM_PUSH_BATCH_BYTES,
+        queue_max_bytes: int = VM_PUSH_QUEUE_MAX_BYTES,
+        timeout: int = VM_PUSH_TIMEOUT,
+    ):
+        self.url = url.rstrip("/") + IMPORT_PATH
+        self.queue_dir = queue_dir
+        self.auth = auth
+        self.params = [
+            ("extra_label", label.strip()) for label in extra_labels.split(",") if label.strip()
+        ]
+        self.flush_interval = flush_interval
+        self.batch_bytes = batch_bytes
+        self.queue_max_bytes = queue_max_bytes
+        self.timeout = timeout
+
+        self._session = requests.Session()
+        self._pending: List[bytes] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    # --- Приём снимков ---
+    def on_publish(self, collector) -> None:
+        # Публикация заменяет снимок только текущего инстанса: серии остальных
+        # ушли со своей публикацией и не должны получить новую метку времени
+        payload = render_collector(collector, int(time.time() * 1000), instance_name())
+        if not payload:
+            return
+        PUSH_SAMPLES.inc(payload.count(b"\n"))
+        with self._lock:
+            self._pending.append(payload)
+        self._wake.set()
+
+    # --- Отправка ---
+    def _send(self, body: bytes) -> bool:
+        try:
+            response = self._session.post(
+                self.url,
+                data=body,
+                params=self.params,
+                auth=self.auth,
+                headers={"Content-Encoding": "gzip"},
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+        except requests.RequestException as e:
+            PUSH_REQUESTS.labels(result="error").inc()
+            logging.warning(f"⚠️ Push в VictoriaMetrics не удался: {e}")
+            return False
+        PUSH_REQUESTS.labels(result="ok").inc()
+        return True
+
+    def flush(self) -> None:
+        """Отправляет накопленные снимки, затем — очередь с диска."""
+        with self._flush_lock:
+            with self._lock:
+                chunks, self._pending = self._pending, []
+
+            delivered = True
+            for batch in split_batches(chunks, self.batch_bytes):
+                body = gzip.compress(batch)
+                # После первой ошибки остальное сразу в очередь, не ждём таймаутов
+                if not delivered or not self._send(body):
+                    delivered = False
+                    self._enqueue(body)
+
+            if delivered:
+                self._drain_queue()
+            self._update_queue_size()
+
+    # --- Очередь на диске ---
+    def _queued_files(self) -> List[str]:
+        try:
+            names = sorted(n for n in os.listdir(self.queue_dir) if n.endswith(".prom.gz"))
+        except FileNotFoundError:
+            return []
+        return [os.path.join(self.queue_dir, n) for n in names]
+
+    def _enqueue(self, body: bytes) -> None:
+        path = os.path.join(self.queue_dir, f"{time.time_ns()}.prom.gz")
+        try:
+            os.makedirs(self.queue_dir, exist_ok=True)
+            with open(f"{path}.tmp", "wb") as f:
+                f.write(body)
+            os.replace(f"{path}.tmp", path)
+        except OSError as e:
+            PUSH_DROPPED.inc()
+            logging.error(f"❌ Не удалось сохранить пачку в очередь {self.queue_dir}: {e}")
+            return
+        self._trim_queue()
+
+    def _trim_queue(self) -> None:
+        files = self._queued_files()
+        sizes = {path: os.path.getsize(path) for path in files}
+        total = sum(sizes.values())
+        for path in files:
+            if total <= self.queue_max_bytes:
+                break
+            os.remove(path)
+            total -= sizes[path]
+            PUSH_DROPPED.inc()
+            logging.warning(f"🗑️ Очередь push переполнена, удалена пачка {os.path.basename(path)}")
+
+    def _drain_queue(self) -> None:
+        for path in self._queued_files():
+            try:
+                with open(path, "rb") as f:
+                    body = f.read()
+            except OSError:
+                continue
+            if not self._send(body):
+                return
+            os.remove(path)
+            logging.info(f"📤 Отправлена пачка из очереди: {os.path.basename(path)}")
+
+    def _update_queue_size(self) -> None:
+        PUSH_QUEUE_BYTES.set(sum(os.path.getsize(p) for p in self._queued_files()))
+
+    # --- Фоновый поток ---
+    def _run(self) -> None:
+        while True:
+            if self._wake.wait(RETRY_INTERVAL):
+                # Даём коллектору опубликовать остальные метрики — уйдут одной пачкой
+                time.sleep(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logging.error(f"❌ Ошибка фоновой отправки в VictoriaMetrics: {e}")
+
+    def start(self) -> None:
+        if self._thread is None:
+            add_publish_listener(self.on_publish)
+            self._thread = threading.Thread(target=self._run, name="vm-push", daemon=True)
+            self._thread.start()
+            logging.info(f"📤 Push в VictoriaMetrics включён: {self.url}")
+
+
+def start_push() -> Optional[VictoriaMetricsPusher]:
+    """Запускает push-режим, если задан VM_PUSH_URL."""
+    if not VM_PUSH_URL:
+        return None
+    auth = (VM_PUSH_USERNAME, VM_PUSH_PASSWORD) if VM_PUSH_USERNAME else None
+    pusher = VictoriaMetricsPusher(VM_PUSH_URL, auth=auth)
+    pusher.start()
+    return pusher
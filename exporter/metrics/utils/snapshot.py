@@ -0,0 +1,244 @@
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+from prometheus_client import REGISTRY, Gauge
+from prometheus_client.core import GaugeMetricFamily
+
+from common.logs import logging
+from common.cardinality import enforce_budget
+from common.exposition import bump_generation
+from common.instances import INSTANCE_LABEL, MULTI_INSTANCE, get_instance, instance_name
+
+
+LabelValues = Tuple[str, ...]
+
+# Все метрики, чьё состояние сохраняется между перезапусками (см. warm_start)
+SNAPSHOTS: Dict[str, object] = {}
+
+SNAPSHOT_STALE = Gauge(
+    "nexus_exporter_snapshot_stale",
+    "1 — метрика отдаётся из снимка прошлого запуска, 0 — уже обновлена в этом запуске",
+    ["metric"],
+)
+
+
+_stale_metrics = set()
+# Подписчики на публикацию снимка (например, push в VictoriaMetrics)
+_publish_listeners: List = []
+
+
+def register_snapshot(collector) -> None:
+    """Регистрирует коллектор с методами dump()/restore(rows) для тёплого старта."""
+    SNAPSHOTS[collector.name] = collector
+
+
+def add_publish_listener(listener) -> None:
+    """listener(collector) вызывается после каждой публикации снимка метрики."""
+    _publish_listeners.append(listener)
+
+
+def notify_published(collector) -> None:
+    for listener in _publish_listeners:
+        try:
+            listener(collector)
+        except Exception as e:
+            logging.warning(f"⚠️ Ошибка подписчика публикации {collector.name}: {e}")
+
+
+def mark_stale(name: str) -> None:
+    _stale_metrics.add(name)
+    SNAPSHOT_STALE.labels(metric=name).set(1)
+
+
+def is_stale(name: str) -> bool:
+    """Метрика всё ещё отдаётся из снимка прошлого запуска."""
+    return name in _stale_metrics
+
+
+def mark_fresh(name: str) -> None:
+    """Метрика обновлена в этом запуске — снимок с диска больше не отдаётся."""
+    if name in _stale_metrics:
+        _stale_metrics.discard(name)
+        SNAPSHOT_STALE.labels(metric=name).set(0)
+
+
+class _SampleSetter:
+    """Аналог дочернего Gauge: пишет значение в буфер снимка."""
+
+    __slots__ = ("_samples", "_key")
+
+    def __init__(self, samples: Dict[LabelValues, float], key: LabelValues):
+        self._samples = samples
+        self._key = key
+
+    def set(self, value) -> None:
+        self._samples[self._key] = float(value)
+
+
+class SnapshotBuffer:
+    """Новый снимок метрики, который собирается в стороне от опубликованного."""
+
+    def __init__(self, labelnames: Tuple[str, ...]):
+        self._labelnames = labelnames
+        self.samples: Dict[LabelValues, float] = {}
+
+    def labels(self, *labelvalues, **labelkwargs) -> _SampleSetter:
+        if labelvalues and labelkwargs:
+            raise ValueError("Нельзя смешивать позиционные и именованные лейблы")
+
+        if labelkwargs:
+            if sorted(labelkwargs) != sorted(self._labelnames):
+                raise ValueError(f"Неверный набор лейблов: {sorted(labelkwargs)}")
+            labelvalues = tuple(str(labelkwargs[name]) for name in self._labelnames)
+        else:
+            if len(labelvalues) != len(self._labelnames):
+                raise ValueError(f"Ожидалось лейблов: {len(self._labelnames)}")
+            labelvalues = tuple(str(v) for v in labelvalues)
+
+        return _SampleSetter(self.samples, labelvalues)
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+
+class SnapshotGauge:
+    """
+    Gauge с двойной буферизацией.
+
+    Коллектор наполняет SnapshotBuffer, а publish() подменяет опубликованный
+    снимок одной операцией. Скрейп всегда видит либо старый, либо новый набор
+    серий целиком — без пустого окна между clear() и повторным заполнением.
+
+    Снимки хранятся по инстансам Nexus: publish() заменяет только серии
+    инстанса, который собирает текущий поток. С instance_label к сериям
+    добавляется лейбл nexus_instance.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        registry=REGISTRY,
+        instance_label: bool = MULTI_INSTANCE,
+    ):
+        self._name = name
+        self._documentation = documentation
+        self._labelnames = tuple(labelnames)
+        self._instance_label = instance_label
+        # Подменяется целиком (copy-on-write): скрейп читает без блокировки
+        self._partitions: Dict[str, Dict[LabelValues, float]] = {}
+        self._publish_lock = threading.Lock()
+        self._published = False
+
+        if registry is not None:
+            registry.register(self)
+            register_snapshot(self)
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def labelnames(self) -> Tuple[str, ...]:
+        """Лейблы отдаваемых серий (с nexus_instance, если он включён)."""
+        if self._instance_label:
+            return self._labelnames + (INSTANCE_LABEL,)
+        return self._labelnames
+
+    def buffer(self) -> SnapshotBuffer:
+        return SnapshotBuffer(self._labelnames)
+
+    def publish(self, buffer: SnapshotBuffer) -> Tuple[int, int, int]:
+        """
+        Публикует новый снимок инстанса. Серии, которых нет в новом снимке,
+        уходят по диффу. Снимок ограничивается бюджетом серий метрики
+        (common.cardinality). Возвращает (добавлено, удалено, изменено).
+        """
+        instance = instance_name()
+        with self._publish_lock:
+            old_samples = self._partitions.get(instance, {})
+            others = sum(
+                len(samples) for name, samples in self._partitions.items() if name != instance
+            )
+            new_samples = enforce_budget(
+                self._name, dict(buffer.samples), old_samples, others
+            )
+            added = new_samples.keys() - old_samples.keys()
+            removed = old_samples.keys() - new_samples.keys()
+            changed = sum(
+                1
+                for key in new_samples.keys() & old_samples.keys()
+                if new_samples[key] != old_samples[key]
+            )
+            self._partitions = {**self._partitions, instance: new_samples}
+            self._published = True
+
+        mark_fresh(self._name)
+        bump_generation()
+        notify_published(self)
+        logging.debug(
+            f"{self._name}: серий {len(new_samples)} "
+            f"(+{len(added)} / -{len(removed)} / ~{changed})"
+        )
+        return len(added), len(removed), changed
+
+    def clear(self) -> None:
+        self.publish(self.buffer())
+
+    def samples(self) -> Dict[LabelValues, float]:
+        """Текущий опубликованный снимок инстанса (копия)."""
+        return dict(self._partitions.get(instance_name(), {}))
+
+    def _series(self):
+        """(значения лейблов с учётом nexus_instance, значение) по всем инстансам."""
+        for instance, samples in self._partitions.items():
+            if self._instance_label:
+                for labelvalues, value in samples.items():
+                    yield (*labelvalues, instance), value
+            else:
+                yield from samples.items()
+
+    def dump(self) -> List[list]:
+        """Снимок для сохранения на диск: [[label, ..., value], ...]."""
+        return [[*labelvalues, value] for labelvalues, value in self._series()]
+
+    def restore(self, rows: List[list]) -> int:
+        """
+        Загружает снимок прошлого запуска. Ничего не делает, если метрика уже
+        опубликована в этом запуске. Серии инстансов, которых больше нет
+        в NEXUS_INSTANCES, пропускаются: их данные никто не перезапишет.
+        Возвращает число восстановленных серий.
+        """
+        width = len(self.labelnames)
+        partitions: Dict[str, Dict[LabelValues, float]] = {}
+        for row in rows:
+            if len(row) != width + 1:
+                continue
+            labelvalues = tuple(str(v) for v in row[:width])
+            if self._instance_label:
+                instance, labelvalues = labelvalues[-1], labelvalues[:-1]
+                if get_instance(instance) is None:
+                    continue
+            else:
+                instance = instance_name()
+            partitions.setdefault(instance, {})[labelvalues] = float(row[width])
+        with self._publish_lock:
+            if self._published:
+                return 0
+            self._partitions = partitions
+        return sum(len(samples) for samples in partitions.values())
+
+    def _family(self) -> GaugeMetricFamily:
+        return GaugeMetricFamily(
+            self._name, self._documentation, labels=self.labelnames
+        )
+
+    def describe(self):
+        yield self._family()
+
+    def collect(self):
+        family = self._family()
+        for labelvalues, value in self._series():
+            family.add_metric(labelvalues, value)
+        yield family
@@ -0,0 +1,109 @@
+import json
+import os
+import threading
+import time
+
+from prometheus_client import Gauge
+
+from common.logs import logging
+from common.config import WARM_START_FILE, WARM_START_MAX_AGE
+from common.exposition import bump_generation
+from metrics.utils.snapshot import SNAPSHOTS, is_stale, mark_stale
+
+
+SNAPSHOT_FORMAT = 1
+
+# Инстансы Nexus сохраняют снимок каждый из своего потока
+_save_lock = threading.Lock()
+# Время сохранения восстановленных метрик: пока метрику не переопубликовали,
+# она пишется в снимок со своим исходным saved_at, а не как свежая
+_restored_saved_at = {}
+
+SNAPSHOT_SAVED_AT = Gauge(
+    "nexus_exporter_snapshot_saved_timestamp_seconds",
+    "Время сохранения снимка, загруженного при старте (0 — старт без снимка)",
+)
+
+
+def save_snapshot(path: str = WARM_START_FILE) -> int:
+    """Сохраняет текущие значения всех метрик снимка. Возвращает число серий."""
+    with _save_lock:
+        return _save_snapshot(path)
+
+
+def _save_snapshot(path: str) -> int:
+    now = time.time()
+    metrics = {}
+    for name, collector in list(SNAPSHOTS.items()):
+        saved_at = _restored_saved_at.get(name, now) if is_stale(name) else now
+        metrics[name] = {
+            "labelnames": list(collector.labelnames),
+            "rows": collector.dump(),
+            "saved_at": saved_at,
+        }
+
+    snapshot = {"format": SNAPSHOT_FORMAT, "saved_at": now, "metrics": metrics}
+    tmp_file = f"{path}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_file, path)
+    except (OSError, TypeError, ValueError) as e:
+        logging.warning(f"⚠️ Не удалось сохранить снимок метрик {path}: {e}")
+        return 0
+
+    series = sum(len(m["rows"]) for m in metrics.values())
+    logging.info(f"💾 Снимок метрик сохранён: {len(metrics)} метрик, {series} серий")
+    return series
+
+
+def load_snapshot(path: str = WARM_START_FILE, max_age: int = WARM_START_MAX_AGE) -> int:
+    """
+    Отдаёт метрики из снимка прошлого запуска, пока первый цикл сбора
+    не опубликует свежие данные. Такие метрики помечаются nexus_exporter_snapshot_stale=1.
+    max_age проверяется по каждой метрике: коллектор, который так и не
+    опубликовал данные, не продлевает жизнь старому снимку.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        logging.info("📂 Снимок метрик не найден — холодный старт")
+        return 0
+    except (OSError, ValueError) as e:
+        logging.warning(f"⚠️ Не удалось прочитать снимок метрик {path}: {e}")
+        return 0
+
+    now = time.time()
+    saved_at = snapshot.get("saved_at", 0)
+    age = now - saved_at
+    if snapshot.get("format") != SNAPSHOT_FORMAT or age > max_age:
+        logging.info(f"♻️ Снимок метрик устарел ({age:.0f} сек) или другого формата — игнорируем")
+        return 0
+
+    restored = 0
+    for name, data in snapshot.get("metrics", {}).items():
+        collector = SNAPSHOTS.get(name)
+        if collector is None:
+            continue
+        metric_saved_at = data.get("saved_at", saved_at)
+        if now - metric_saved_at > max_age:
+            logging.info(
+                f"♻️ {name}: данные не обновлялись {now - metric_saved_at:.0f} сек — снимок пропущен"
+            )
+            continue
+        # После смены лейблов метрики старый снимок ей не подходит
+        if tuple(data.get("labelnames", ())) != tuple(collector.labelnames):
+            logging.info(f"♻️ {name}: лейблы изменились — снимок пропущен")
+            continue
+        count = collector.restore(data.get("rows", []))
+        if count:
+            mark_stale(name)
+            _restored_saved_at[name] = metric_saved_at
+            restored += count
+
+    SNAPSHOT_SAVED_AT.set(saved_at)
+    bump_generation()
+    logging.info(f"📂 Восстановлено {restored} серий из снимка возрастом {age:.0f} сек")
+    return restored
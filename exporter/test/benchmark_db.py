@@ -0,0 +1,92 @@
+"""
+Бенчмарк запросов экспортёра на БД-заменителе Nexus.
+
+    python test/benchmark_db.py --repos 1000 --blobs 10000000 --repeat 3
+
+Без NEXUS_TEST_DATABASE_URL поднимает временный кластер через initdb/pg_ctl.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import nexus_stand_in  # noqa: E402
+
+
+def benchmarks():
+    from database.repository_size_query import get_repository_sizes
+    from database.docker_tags_query import DockerTagCounter
+    from database.utils.jobs_reader import get_jobs_data
+
+    def fetch_docker_tags_data():
+        # Свежий счётчик — каждый прогон делает полную сверку, а не пустой инкремент
+        return DockerTagCounter().refresh()
+
+    return {
+        "get_repository_sizes": get_repository_sizes,
+        "fetch_docker_tags_data": fetch_docker_tags_data,
+        "get_jobs_data": get_jobs_data,
+    }
+
+
+def run(name, func, repeat: int) -> dict:
+    timings, size = [], 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+        size = len(result or ())
+    return {
+        "name": name,
+        "first": timings[0],
+        "median": statistics.median(timings),
+        "min": min(timings),
+        "rows": size,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repos", type=int, default=1000)
+    parser.add_argument("--blobs", type=int, default=1_000_000)
+    parser.add_argument("--tasks", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", action="append", help="запустить только указанные функции")
+    args = parser.parse_args(argv)
+
+    if not nexus_stand_in.available():
+        print(f"PostgreSQL недоступен: задайте {nexus_stand_in.DSN_ENV} или установите initdb/pg_ctl")
+        return 2
+
+    start = time.perf_counter()
+    with nexus_stand_in.nexus_database(repos=args.repos, blobs=args.blobs, tasks=args.tasks) as dsn:
+        print(f"БД-заменитель заполнена за {time.perf_counter() - start:.1f} сек")
+        funcs = benchmarks()
+        from common.instances import NexusInstance, use_instance
+        from database.utils import connection
+
+        # get_db_connection берёт DSN инстанса, затем DATABASE_READ_URL, затем
+        # DATABASE_URL — подменяем все, чтобы окружение не увело замер на другую БД
+        connection.DATABASE_URL = dsn
+        connection.DATABASE_READ_URL = ""
+        print(f"DSN: {nexus_stand_in.redacted(dsn)}")
+
+        with use_instance(NexusInstance("benchmark", "", database_url=dsn)):
+            results = [
+                run(name, func, args.repeat)
+                for name, func in funcs.items()
+                if not args.only or name in args.only
+            ]
+
+    print(f"\n{'function':<26}{'first, s':>10}{'median, s':>11}{'min, s':>9}{'rows':>10}")
+    for r in results:
+        print(f"{r['name']:<26}{r['first']:>10.3f}{r['median']:>11.3f}{r['min']:>9.3f}{r['rows']:>10}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""
+Бенчмарк разбора qrtz_job_details.job_data: быстрый декодер против javaobj.
+
+    python test/benchmark_job_data.py --dsn postgresql://user@nexus-db/nexus
+    python test/benchmark_job_data.py --hex-file jobs.hex
+    python test/benchmark_job_data.py --jobs 500
+
+Дамп для --hex-file (одна задача на строку):
+    psql -Atc "SELECT encode(job_data, 'hex') FROM qrtz_job_details" > jobs.hex
+Без --dsn и --hex-file задачи генерируются как в БД-заменителе.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import nexus_stand_in  # noqa: E402
+
+
+def load_jobs(args) -> list:
+    if args.dsn:
+        import psycopg2
+
+        with psycopg2.connect(args.dsn) as conn, conn.cursor() as cur:
+            cur.execute("SELECT job_data FROM qrtz_job_details WHERE job_data IS NOT NULL")
+            return [bytes(row[0]) for row in cur.fetchall()]
+    if args.hex_file:
+        with open(args.hex_file, encoding="ascii") as f:
+            return [bytes.fromhex(line.strip().removeprefix("\\x")) for line in f if line.strip()]
+    return [
+        nexus_stand_in.encode_job_data_map(nexus_stand_in.task_job_data(i, repos=100))
+        for i in range(args.jobs)
+    ]
+
+
+def run(decode, jobs: list, repeat: int) -> dict:
+    timings, failed = [], 0
+    for _ in range(repeat):
+        failed = 0
+        start = time.perf_counter()
+        for data in jobs:
+            try:
+                decode(data)
+            except Exception:
+                failed += 1
+        timings.append(time.perf_counter() - start)
+    per_job = [t / max(len(jobs), 1) * 1e6 for t in timings]
+    return {"median": statistics.median(per_job), "min": min(per_job), "failed": failed}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dsn", help="БД Nexus, из которой читается qrtz_job_details")
+    parser.add_argument("--hex-file", help="дамп job_data в hex, одна задача на строку")
+    parser.add_argument("--jobs", type=int, default=1000, help="число синтетических задач")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    from database.utils import query_to_db  # noqa: F401 — порядок импорта database.utils
+    from database.utils.job_data import decode_job_data_map, UnsupportedJobData
+    from database.utils.jobs_reader import parse_job_data_generic
+
+    jobs = load_jobs(args)
+    print(f"Задач: {len(jobs)}, средний размер job_data: "
+          f"{sum(map(len, jobs)) / max(len(jobs), 1):.0f} байт")
+
+    unsupported, mismatched = 0, 0
+    for data in jobs:
+        try:
+            fast = decode_job_data_map(data)
+        except UnsupportedJobData:
+            unsupported += 1
+            continue
+        if fast != parse_job_data_generic(data):
+            mismatched += 1
+    print(f"Быстрый декодер: не поддержано {unsupported}, расхождений с javaobj {mismatched}")
+
+    results = {
+        "decode_job_data_map": run(decode_job_data_map, jobs, args.repeat),
+        "javaobj + convert_java": run(parse_job_data_generic, jobs, args.repeat),
+    }
+    print(f"\n{'decoder':<26}{'median, µs/job':>16}{'min, µs/job':>13}{'failed':>8}")
+    for name, r in results.items():
+        print(f"{name:<26}{r['median']:>16.1f}{r['min']:>13.1f}{r['failed']:>8}")
+    return 1 if mismatched else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
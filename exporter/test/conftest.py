@@ -0,0 +1,29 @@
+import os
+
+import pytest
+
+import nexus_stand_in
+
+
+@pytest.fixture(scope="session")
+def nexus_dsn():
+    """Заполненная БД-заменитель Nexus; масштаб — NEXUS_TEST_REPOS / NEXUS_TEST_BLOBS."""
+    if not nexus_stand_in.available():
+        pytest.skip(f"нет PostgreSQL: задайте {nexus_stand_in.DSN_ENV} или установите initdb/pg_ctl")
+    scale = {
+        "repos": int(os.getenv("NEXUS_TEST_REPOS", "20")),
+        "blobs": int(os.getenv("NEXUS_TEST_BLOBS", "2000")),
+    }
+    with nexus_stand_in.nexus_database(**scale) as dsn:
+        yield dsn
+
+
+@pytest.fixture
+def nexus_db(nexus_dsn, monkeypatch):
+    """Направляет database.* на БД-заменитель."""
+    from database.utils import connection
+
+    monkeypatch.setattr(connection, "DATABASE_URL", nexus_dsn)
+    # DATABASE_READ_URL из окружения увёл бы тесты на реплику
+    monkeypatch.setattr(connection, "DATABASE_READ_URL", "")
+    return nexus_dsn
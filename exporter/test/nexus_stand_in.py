@@ -0,0 +1,409 @@
+"""
+Локальная замена БД Nexus для тестов и бенчмарков.
+
+Поднимает PostgreSQL (NEXUS_TEST_DATABASE_URL или временный кластер через
+initdb/pg_ctl), создаёт таблицы Nexus, которые читает экспортёр, и заполняет
+их через generate_series в заданном масштабе.
+"""
+
+import contextlib
+import logging
+import os
+import shutil
+import socket
+import struct
+import subprocess
+import tempfile
+import time
+from urllib.parse import urlparse, urlunparse
+
+import psycopg2
+
+
+FORMATS = ("maven2", "npm", "raw", "docker")
+
+# Внешняя БД должна быть одноразовой: таблицы пересоздаются
+DSN_ENV = "NEXUS_TEST_DATABASE_URL"
+
+
+# --- Схема ---
+COMMON_SCHEMA = """
+    DROP TABLE IF EXISTS repository, cleanup_policy, qrtz_job_details CASCADE;
+
+    CREATE TABLE repository (
+        id UUID PRIMARY KEY,
+        name VARCHAR(200) NOT NULL UNIQUE,
+        recipe_name VARCHAR(200) NOT NULL,
+        online BOOLEAN NOT NULL DEFAULT TRUE,
+        routing_rule_id UUID,
+        attributes JSONB
+    );
+
+    CREATE TABLE cleanup_policy (
+        name VARCHAR(200) PRIMARY KEY,
+        notes TEXT,
+        format VARCHAR(100),
+        mode VARCHAR(100),
+        criteria JSONB
+    );
+
+    CREATE TABLE qrtz_job_details (
+        sched_name VARCHAR(120) NOT NULL,
+        job_name VARCHAR(200) NOT NULL,
+        job_group VARCHAR(200) NOT NULL,
+        description VARCHAR(250),
+        job_class_name VARCHAR(250) NOT NULL,
+        is_durable BOOL NOT NULL,
+        is_nonconcurrent BOOL NOT NULL,
+        is_update_data BOOL NOT NULL,
+        requests_recovery BOOL NOT NULL,
+        job_data BYTEA,
+        PRIMARY KEY (sched_name, job_name, job_group)
+    );
+"""
+
+FORMAT_SCHEMA = """
+    DROP TABLE IF EXISTS {fmt}_content_repository, {fmt}_component,
+        {fmt}_asset, {fmt}_asset_blob CASCADE;
+
+    CREATE TABLE {fmt}_content_repository (
+        repository_id SERIAL PRIMARY KEY,
+        config_repository_id UUID NOT NULL,
+        attributes JSONB
+    );
+
+    CREATE TABLE {fmt}_component (
+        component_id INTEGER NOT NULL,
+        repository_id INTEGER NOT NULL,
+        namespace VARCHAR NOT NULL,
+        name VARCHAR NOT NULL,
+        kind VARCHAR NOT NULL,
+        version VARCHAR NOT NULL,
+        attributes JSONB,
+        created TIMESTAMP WITH TIME ZONE NOT NULL,
+        last_updated TIMESTAMP WITH TIME ZONE NOT NULL
+    );
+
+    CREATE TABLE {fmt}_asset_blob (
+        asset_blob_id INTEGER NOT NULL,
+        blob_ref VARCHAR NOT NULL,
+        blob_size BIGINT NOT NULL,
+        content_type VARCHAR NOT NULL,
+        blob_created TIMESTAMP WITH TIME ZONE NOT NULL,
+        created_by VARCHAR,
+        attributes JSONB
+    );
+
+    CREATE TABLE {fmt}_asset (
+        asset_id INTEGER NOT NULL,
+        repository_id INTEGER NOT NULL,
+        path VARCHAR NOT NULL,
+        kind VARCHAR NOT NULL,
+        component_id INTEGER,
+        asset_blob_id INTEGER,
+        last_downloaded TIMESTAMP WITH TIME ZONE,
+        attributes JSONB,
+        created TIMESTAMP WITH TIME ZONE NOT NULL,
+        last_updated TIMESTAMP WITH TIME ZONE NOT NULL
+    );
+"""
+
+# Индексы как в Nexus; создаются после заливки данных
+FORMAT_INDEXES = """
+    ALTER TABLE {fmt}_component ADD PRIMARY KEY (component_id);
+    CREATE UNIQUE INDEX uk_{fmt}_component_coordinate
+        ON {fmt}_component (repository_id, namespace, name, version);
+    ALTER TABLE {fmt}_asset_blob ADD PRIMARY KEY (asset_blob_id);
+    CREATE UNIQUE INDEX uk_{fmt}_asset_blob_ref ON {fmt}_asset_blob (blob_ref);
+    ALTER TABLE {fmt}_asset ADD PRIMARY KEY (asset_id);
+    CREATE UNIQUE INDEX uk_{fmt}_asset_path ON {fmt}_asset (repository_id, path);
+    CREATE INDEX idx_{fmt}_asset_component ON {fmt}_asset (component_id);
+    CREATE INDEX idx_{fmt}_asset_blob ON {fmt}_asset (asset_blob_id);
+"""
+
+
+# --- Заливка ---
+SEED_REPOSITORIES = """
+    INSERT INTO repository (id, name, recipe_name, attributes)
+    SELECT
+        md5('repo-' || i)::uuid,
+        (%(formats)s::text[])[1 + i %% %(format_count)s] || '-repo-' || i,
+        (%(formats)s::text[])[1 + i %% %(format_count)s] || '-'
+            || (ARRAY['hosted', 'proxy', 'group'])[1 + (i / %(format_count)s) %% 3],
+        jsonb_build_object(
+            'storage', jsonb_build_object('blobStoreName', 'blob-' || i %% %(blobstores)s),
+            'cleanup', jsonb_build_object(
+                'policyName', jsonb_build_array('policy-' || i %% (%(policies)s + 5))
+            )
+        )
+    FROM generate_series(1, %(repos)s) AS i;
+"""
+
+SEED_POLICIES = """
+    INSERT INTO cleanup_policy (name, format, mode, criteria)
+    SELECT 'policy-' || i, 'ALL_FORMATS', 'delete', '{"lastDownloaded": "2592000"}'::jsonb
+    FROM generate_series(0, %(policies)s - 1) AS i;
+"""
+
+SEED_CONTENT_REPOSITORIES = """
+    INSERT INTO {fmt}_content_repository (config_repository_id)
+    SELECT id FROM repository WHERE recipe_name LIKE '{fmt}-%' ORDER BY name;
+"""
+
+# Один компонент на asset: для docker это отдельный тег образа
+SEED_COMPONENTS = """
+    INSERT INTO {fmt}_component
+        (component_id, repository_id, namespace, name, kind, version, created, last_updated)
+    SELECT
+        g,
+        1 + g %% %(repos)s,
+        '',
+        'artifact-' || (g / %(versions)s),
+        '{fmt}',
+        '1.0.' || g,
+        now() - (g %% 730) * interval '1 day',
+        now() - (g %% 365) * interval '1 day'
+    FROM generate_series(1, %(blobs)s) AS g;
+"""
+
+SEED_BLOBS = """
+    INSERT INTO {fmt}_asset_blob (asset_blob_id, blob_ref, blob_size, content_type, blob_created)
+    SELECT
+        g,
+        'blob-' || g %% %(blobstores)s || '@' || md5('{fmt}' || g),
+        (g::bigint * 7919) %% 50000000,
+        'application/octet-stream',
+        now() - (g %% 730) * interval '1 day'
+    FROM generate_series(1, %(blobs)s) AS g;
+"""
+
+SEED_ASSETS = """
+    INSERT INTO {fmt}_asset
+        (asset_id, repository_id, path, kind, component_id, asset_blob_id,
+         last_downloaded, created, last_updated)
+    SELECT
+        g,
+        1 + g %% %(repos)s,
+        '/artifact-' || (g / %(versions)s) || '/1.0.' || g,
+        'file',
+        g,
+        g,
+        CASE WHEN g %% 3 = 0 THEN NULL ELSE now() - (g %% 400) * interval '1 day' END,
+        now() - (g %% 730) * interval '1 day',
+        now() - (g %% 365) * interval '1 day'
+    FROM generate_series(1, %(blobs)s) AS g;
+"""
+
+TASK_TYPES = (
+    ("repository.cleanup", "repositoryName"),
+    ("blobstore.compact", "blobstoreName"),
+    ("repository.docker.gc", "repositoryName"),
+    ("db.backup", "location"),
+)
+
+
+# --- Java-сериализация JobDataMap (как её пишет Quartz) ---
+def _utf(value: str) -> bytes:
+    data = value.encode("utf-8")
+    return struct.pack(">H", len(data)) + data
+
+
+def _string(value: str) -> bytes:
+    return b"\x74" + _utf(value)  # TC_STRING
+
+
+def _class_desc(name: str, suid: int, flags: int, fields, parent: bytes) -> bytes:
+    out = b"\x72" + _utf(name) + struct.pack(">qBH", suid, flags, len(fields))
+    for type_code, field_name, class_name in fields:
+        out += type_code.encode() + _utf(field_name)
+        if class_name:
+            out += _string(class_name)
+    return out + b"\x78" + parent  # TC_ENDBLOCKDATA, суперкласс
+
+
+# Handle первой строки HashMap: до неё описания JobDataMap и предков (0-2),
+# сигнатура поля map (3), сам JobDataMap (4), описание HashMap (5) и HashMap (6)
+FIRST_STRING_HANDLE = 0x7E0000 + 7
+
+
+def encode_job_data_map(values: dict, share_strings: bool = False) -> bytes:
+    """
+    JobDataMap(HashMap<String, String>) в формате java.io.ObjectOutputStream.
+    share_strings — повторные строки пишутся ссылкой TC_REFERENCE, как это
+    делает Java для одного и того же объекта String.
+    """
+    hash_map = b"\x73" + _class_desc(
+        "java.util.HashMap", 362498820763181265, 0x03,
+        [("F", "loadFactor", None), ("I", "threshold", None)], b"\x70",
+    )
+    capacity = 16
+    while capacity * 0.75 < len(values):
+        capacity *= 2
+    hash_map += struct.pack(">fi", 0.75, int(capacity * 0.75))
+    hash_map += b"\x77\x08" + struct.pack(">ii", capacity, len(values))  # TC_BLOCKDATA
+    handles = {}
+    for text in (str(item) for pair in values.items() for item in pair):
+        if share_strings and text in handles:
+            hash_map += b"\x71" + struct.pack(">i", handles[text])  # TC_REFERENCE
+        else:
+            handles.setdefault(text, FIRST_STRING_HANDLE + len(handles))
+            hash_map += _string(text)
+    hash_map += b"\x78"
+
+    dirty_flag_map = _class_desc(
+        "org.quartz.utils.DirtyFlagMap", 1433884852607126222, 0x02,
+        [("Z", "dirty", None), ("L", "map", "Ljava/util/Map;")], b"\x70",
+    )
+    string_key_map = _class_desc(
+        "org.quartz.utils.StringKeyDirtyFlagMap", -9076749120524952280, 0x02,
+        [("Z", "allowsTransientData", None)], dirty_flag_map,
+    )
+    job_data_map = _class_desc(
+        "org.quartz.JobDataMap", -6939901990106713909, 0x02, [], string_key_map,
+    )
+
+    return (
+        b"\xac\xed\x00\x05"  # STREAM_MAGIC, STREAM_VERSION
+        + b"\x73" + job_data_map
+        # Данные классов — от базового к наследнику
+        + b"\x00" + hash_map  # DirtyFlagMap: dirty, map
+        + b"\x00"  # StringKeyDirtyFlagMap: allowsTransientData
+    )
+
+
+def task_job_data(index: int, repos: int) -> dict:
+    type_id, target_key = TASK_TYPES[index % len(TASK_TYPES)]
+    return {
+        ".id": f"task-{index:05d}",
+        ".name": f"{type_id} #{index}",
+        ".typeId": type_id,
+        ".enabled": "true",
+        target_key: f"repo-{index % max(repos, 1)}",
+    }
+
+
+# --- Заливка ---
+def create_schema(cur) -> None:
+    cur.execute(COMMON_SCHEMA)
+    for fmt in FORMATS:
+        cur.execute(FORMAT_SCHEMA.format(fmt=fmt))
+
+
+def seed(conn, repos: int = 20, blobs: int = 2000, tasks: int = None,
+         policies: int = 10, blobstores: int = 5, versions: int = 20) -> None:
+    """
+    Заполняет схему: repos репозиториев и blobs blob'ов всего (поровну
+    между форматами), по versions версий на компонент.
+    """
+    tasks = tasks if tasks is not None else max(repos // 10, 4)
+    per_format_blobs = max(blobs // len(FORMATS), 1)
+    params = {
+        "formats": list(FORMATS),
+        "format_count": len(FORMATS),
+        "repos": repos,
+        "policies": policies,
+        "blobstores": blobstores,
+        "versions": versions,
+    }
+
+    with conn.cursor() as cur:
+        create_schema(cur)
+        cur.execute(SEED_REPOSITORIES, params)
+        cur.execute(SEED_POLICIES, params)
+
+        for fmt in FORMATS:
+            cur.execute(SEED_CONTENT_REPOSITORIES.format(fmt=fmt))
+            cur.execute(f"SELECT COUNT(*) FROM {fmt}_content_repository")
+            fmt_params = dict(params, repos=max(cur.fetchone()[0], 1), blobs=per_format_blobs)
+            for statement in (SEED_COMPONENTS, SEED_BLOBS, SEED_ASSETS):
+                cur.execute(statement.format(fmt=fmt), fmt_params)
+            cur.execute(FORMAT_INDEXES.format(fmt=fmt))
+
+        cur.executemany(
+            """
+            INSERT INTO qrtz_job_details
+                (sched_name, job_name, job_group, job_class_name, is_durable,
+                 is_nonconcurrent, is_update_data, requests_recovery, job_data)
+            VALUES ('nexus', %s, 'nexus', 'org.sonatype.nexus.quartz.internal.task.QuartzTaskJob',
+                    TRUE, TRUE, FALSE, FALSE, %s)
+            """,
+            [
+                (f"task-{i:05d}", psycopg2.Binary(encode_job_data_map(task_job_data(i, repos))))
+                for i in range(tasks)
+            ],
+        )
+    conn.commit()
+
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute("ANALYZE")
+    conn.autocommit = False
+
+
+# --- Сервер ---
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextlib.contextmanager
+def temporary_cluster():
+    """Временный кластер PostgreSQL через initdb/pg_ctl; yield DSN."""
+    data_dir = tempfile.mkdtemp(prefix="nexus-pg-")
+    port = _free_port()
+    log_file = os.path.join(data_dir, "postgres.log")
+    try:
+        subprocess.run(
+            ["initdb", "-D", data_dir, "-U", "postgres", "-A", "trust", "--no-sync"],
+            check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        subprocess.run(
+            [
+                "pg_ctl", "-D", data_dir, "-l", log_file, "-w", "start",
+                "-o", f"-p {port} -c listen_addresses=127.0.0.1 -k {data_dir} -c fsync=off",
+            ],
+            check=True, stdout=subprocess.DEVNULL,
+        )
+        admin = psycopg2.connect(host="127.0.0.1", port=port, user="postgres", dbname="postgres")
+        admin.autocommit = True
+        with admin.cursor() as cur:
+            cur.execute("CREATE DATABASE nexus")
+        admin.close()
+        yield f"postgresql://postgres@127.0.0.1:{port}/nexus"
+    finally:
+        subprocess.run(
+            ["pg_ctl", "-D", data_dir, "-m", "immediate", "stop"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def available() -> bool:
+    return bool(os.getenv(DSN_ENV)) or bool(shutil.which("initdb") and shutil.which("pg_ctl"))
+
+
+@contextlib.contextmanager
+def nexus_database(**scale):
+    """DSN заполненной БД: внешней (NEXUS_TEST_DATABASE_URL) или временной."""
+    external = os.getenv(DSN_ENV)
+    cluster = contextlib.nullcontext(external) if external else temporary_cluster()
+    with cluster as dsn:
+        conn = psycopg2.connect(dsn)
+        try:
+            start = time.perf_counter()
+            seed(conn, **scale)
+            scale_info = ", ".join(f"{k}={v}" for k, v in scale.items())
+            logging.getLogger(__name__).info(
+                "stand-in seeded in %.1fs (%s)", time.perf_counter() - start, scale_info
+            )
+        finally:
+            conn.close()
+        yield dsn
+
+
+def redacted(dsn: str) -> str:
+    parts = urlparse(dsn)
+    if parts.password:
+        parts = parts._replace(netloc=parts.netloc.replace(parts.password, "***"))
+    return urlunparse(parts)
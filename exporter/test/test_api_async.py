@@ -0,0 +1,120 @@
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from requests.exceptions import SSLError
+
+from common.instances import NexusInstance, use_instance
+from metrics.utils import api
+from metrics.utils.api_async import AsyncNexusClient, run_with_client
+
+
+@pytest.fixture(autouse=True)
+def reset_tls_memory():
+    api._TLS_VERIFY.clear()
+    yield
+    api._TLS_VERIFY.clear()
+
+
+def make_transport(handler):
+    return httpx.MockTransport(handler)
+
+
+def test_get_from_nexus_builds_url():
+    seen = []
+
+    def handler(request):
+        seen.append(str(request.url))
+        return httpx.Response(200, json=[{"name": "maven"}])
+
+    result = run_with_client(
+        lambda c: c.get_from_nexus("http://nexus/", "/repositories", ("u", "p")),
+        transport=make_transport(handler),
+    )
+    assert result == [{"name": "maven"}]
+    assert seen == ["http://nexus/service/rest/v1/repositories"]
+
+
+def test_retry_on_transport_error():
+    calls = {"n": 0}
+
+    def handler(request):
+        calls["n"] += 1
+        if calls["n"] < 3:
+            raise httpx.ConnectError("connection refused")
+        return httpx.Response(200, json={"ok": True})
+
+    result = run_with_client(
+        lambda c: c.safe_get_json("http://nexus/x", None),
+        transport=make_transport(handler),
+        retries=2,
+        backoff=0,
+    )
+    assert result == {"ok": True}
+    assert calls["n"] == 3
+
+
+def test_retries_exhausted_returns_error():
+    def handler(request):
+        raise httpx.ConnectError("connection refused")
+
+    response, error = run_with_client(
+        lambda c: c.safe_get_raw("http://remote/v2"),
+        transport=make_transport(handler),
+        retries=1,
+        backoff=0,
+    )
+    assert response is None
+    assert isinstance(error, httpx.ConnectError)
+
+
+def test_tls_decision_remembered_per_host():
+    calls = {"n": 0}
+
+    def handler(request):
+        calls["n"] += 1
+        if calls["n"] == 1:
+            raise httpx.ConnectError("[SSL: CERTIFICATE_VERIFY_FAILED] self signed")
+        return httpx.Response(200, json=[])
+
+    async def two_requests(client: AsyncNexusClient):
+        await client.safe_get_json("https://nexus.local/a", None)
+        await client.safe_get_json("https://nexus.local/b", None)
+
+    run_with_client(two_requests, transport=make_transport(handler), backoff=0)
+    assert api._TLS_VERIFY == {"nexus.local": False}
+    # Первая попытка с verify=True, дальше сразу verify=False без повторной ошибки
+    assert calls["n"] == 3
+
+
+def test_sync_client_shares_tls_decision(monkeypatch):
+    verify_flags = []
+
+    def fake_get(url, verify, **kwargs):
+        verify_flags.append(verify)
+        if verify:
+            raise SSLError("[SSL: CERTIFICATE_VERIFY_FAILED] self signed")
+        return SimpleNamespace(status_code=200, json=lambda: [], raise_for_status=lambda: None)
+
+    monkeypatch.setattr(api.session, "get", fake_get)
+
+    assert api.safe_get_json("https://nexus.local/a", None) == []
+    assert api.safe_get_raw("https://nexus.local/b")[1] is None
+    # Один неудачный handshake, дальше хост сразу идёт с verify=False
+    assert verify_flags == [True, False, False]
+
+    # Решение, принятое асинхронным клиентом, действует и для requests
+    api._TLS_VERIFY["other.local"] = False
+    api.safe_get_json("https://other.local/a", None)
+    assert verify_flags[-1] is False
+
+
+def test_shared_client_lives_across_calls():
+    async def client_of(client):
+        return client
+
+    first = run_with_client(client_of)
+    assert run_with_client(client_of) is first
+
+    with use_instance(NexusInstance("other", "https://nexus-other.example")):
+        assert run_with_client(client_of) is not first
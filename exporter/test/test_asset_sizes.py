@@ -0,0 +1,70 @@
+import psycopg2
+
+from metrics import asset_sizes
+
+
+def samples(gauge):
+    return gauge.samples()
+
+
+def test_buckets_are_cumulative():
+    histograms = {("maven-releases", "maven2"): [(2, 100), (3, 3000), (1, 50000)]}
+    largest = [(50000, "maven-releases", "maven2", "/big.jar")]
+
+    asset_sizes.update_asset_metrics(histograms, largest, bounds=[1024, 4096])
+
+    assert samples(asset_sizes.REPO_ASSET_COUNT) == {
+        ("maven-releases", "maven2", "1024"): 2.0,
+        ("maven-releases", "maven2", "4096"): 5.0,
+        ("maven-releases", "maven2", "+Inf"): 6.0,
+    }
+    assert samples(asset_sizes.REPO_ASSET_BYTES)[("maven-releases", "maven2", "+Inf")] == 53100.0
+    assert samples(asset_sizes.LARGEST_ASSETS) == {
+        ("maven-releases", "maven2", "/big.jar", "1"): 50000.0,
+    }
+
+
+def test_parse_buckets_sorts_and_skips_garbage():
+    assert asset_sizes.parse_buckets("1048576, 1024,abc,,1024") == [1024, 1048576]
+    assert asset_sizes.parse_buckets("1024,+Inf,inf,-inf,nan,0,-5,0.5") == [1024]
+
+
+def test_db_failure_keeps_previous_snapshot(monkeypatch):
+    asset_sizes.update_asset_metrics({("r", "raw"): [(1, 10)] * 7}, [])
+    monkeypatch.setattr(asset_sizes, "get_asset_size_distribution", lambda bounds, top_k: None)
+
+    assert asset_sizes.fetch_asset_size_metrics() is False
+
+    assert samples(asset_sizes.REPO_ASSET_COUNT)[("r", "raw", "+Inf")] == 7.0
+
+
+def test_distribution_matches_direct_count(nexus_db):
+    from database.asset_size_query import get_asset_size_distribution
+
+    bounds = [1024, 65536]
+    histograms, largest = get_asset_size_distribution(bounds, top_k=5)
+
+    with psycopg2.connect(nexus_db) as conn, conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT r.name, COUNT(*) FILTER (WHERE b.blob_size <= 1024), COUNT(*), MAX(b.blob_size)
+            FROM raw_asset a
+            JOIN raw_asset_blob b ON b.asset_blob_id = a.asset_blob_id
+            JOIN raw_content_repository cr ON cr.repository_id = a.repository_id
+            JOIN repository r ON r.id = cr.config_repository_id
+            GROUP BY r.name
+            """
+        )
+        expected = cur.fetchall()
+        cur.execute("SELECT MAX(blob_size) FROM raw_asset_blob")
+        max_raw = cur.fetchone()[0]
+
+    assert expected
+    for repo, small, total, _ in expected:
+        buckets = histograms[(repo, "raw")]
+        assert buckets[0][0] == small
+        assert sum(assets for assets, _ in buckets) == total
+
+    assert len(largest) == 5
+    assert [row[0] for row in largest] == sorted((row[0] for row in largest), reverse=True)
+    assert largest[0][0] >= max_raw
@@ -0,0 +1,69 @@
+import pytest
+from metrics import blobs_size
+from metrics.blobs_size import growth_rate, seconds_until, update_metrics
+
+
+@pytest.fixture(autouse=True)
+def clean_history():
+    blobs_size.BLOB_HISTORY.clear()
+    yield
+    blobs_size.BLOB_HISTORY.clear()
+
+
+def blob(used, available, quota=None):
+    data = {
+        "name": "default",
+        "type": "File",
+        "blobCount": 10,
+        "totalSizeInBytes": used,
+        "availableSpaceInBytes": available,
+    }
+    if quota:
+        data["softQuota"] = {"type": "spaceUsedQuota", "limit": quota}
+    return data
+
+
+def test_growth_rate_linear():
+    history = [(0, 100.0), (10, 200.0), (20, 300.0)]
+    assert growth_rate(history) == pytest.approx(10.0)
+
+
+def test_growth_rate_needs_two_samples():
+    assert growth_rate([(0, 100.0)]) is None
+
+
+def test_seconds_until():
+    assert seconds_until(1000, 10) == 100
+    assert seconds_until(1000, 0) is None
+    assert seconds_until(-5, 10) == 0
+
+
+def test_update_metrics_projections():
+    # Второй замер добавит update_metrics с текущим временем
+    blobs_size.record_sample("default", 1000, now=0)
+
+    update_metrics(
+        [blob(used=3000, available=7000, quota=5000)],
+        {"default": {"detail": {}, "quota_status": {"isViolation": False}}},
+    )
+
+    assert blobs_size.BLOB_FILL_RATIO.samples() == {("default",): 0.3}
+    assert blobs_size.BLOB_COUNT.samples() == {("default",): 10.0}
+    assert set(blobs_size.BLOB_STORAGE_USAGE.samples()) == {
+        ("default", "used", "File"),
+        ("default", "available", "File"),
+    }
+    assert blobs_size.BLOB_QUOTA_VIOLATION.samples() == {("default",): 0.0}
+    rate = blobs_size.BLOB_GROWTH_RATE.samples()[("default",)]
+    assert rate > 0
+    quota_left = blobs_size.BLOB_TIME_TO_QUOTA.samples()[("default",)]
+    assert quota_left == pytest.approx(2000 / rate)
+
+
+def test_history_forgets_deleted_blobstores():
+    blobs_size.record_sample("removed", 1000, now=0)
+
+    update_metrics([blob(used=3000, available=7000)])
+
+    assert "removed" not in blobs_size.BLOB_HISTORY
+    assert "default" in blobs_size.BLOB_HISTORY
@@ -0,0 +1,45 @@
+import pytest
+from prometheus_client import CollectorRegistry
+
+from common import cardinality
+from common.cardinality import SERIES_COUNT, SERIES_DROPPED, enforce_budget, parse_budgets
+from metrics.task_events import parse_timestamp
+from metrics.utils.snapshot import SnapshotGauge
+
+
+@pytest.fixture
+def budgets(monkeypatch):
+    monkeypatch.setattr(cardinality, "BUDGETS", {"test_limited": 2})
+    return cardinality.BUDGETS
+
+
+def test_parse_budgets_skips_invalid():
+    assert parse_budgets("a=10, b = 5,broken,c=x,") == {"a": 10, "b": 5}
+
+
+def test_enforce_budget_keeps_published_series_first(budgets):
+    samples = {("new",): 1.0, ("old",): 2.0, ("other",): 3.0}
+    kept = enforce_budget("test_limited", samples, previous={("old",): 0.0})
+
+    assert kept == {("old",): 2.0, ("new",): 1.0}
+    assert SERIES_COUNT.labels(metric="test_limited")._value.get() == 2
+    assert SERIES_DROPPED.labels(metric="test_limited")._value.get() == 1
+
+
+def test_snapshot_gauge_respects_budget(budgets):
+    gauge = SnapshotGauge("test_limited", "test", ["repo"], registry=CollectorRegistry())
+    buffer = gauge.buffer()
+    for repo in ("a", "b", "c", "d"):
+        buffer.labels(repo=repo).set(1)
+
+    gauge.publish(buffer)
+    assert len(gauge.samples()) == 2
+
+
+def test_parse_timestamp():
+    assert parse_timestamp("1970-01-01T00:01:00.000+00:00") == 60
+    assert parse_timestamp("1970-01-01T00:01:00Z") == 60
+    assert parse_timestamp(1_700_000_000_000) == 1_700_000_000
+    assert parse_timestamp("1700000000000") == 1_700_000_000
+    assert parse_timestamp(None) is None
+    assert parse_timestamp("not a date") is None
@@ -0,0 +1,52 @@
+import pytest
+from unittest.mock import patch
+from metrics.utils.catalog import NexusCatalog, freeze
+
+
+@pytest.fixture
+def catalog():
+    return NexusCatalog(ttl=300)
+
+
+@patch("metrics.utils.catalog.get_from_nexus_conditional")
+def test_fetched_once_per_cycle(mock_get, catalog):
+    mock_get.return_value = ([{"name": "maven"}], '"v1"', False)
+    catalog.begin_cycle()
+
+    first = catalog.get("http://nexus", "repositories", ("u", "p"))
+    second = catalog.get("http://nexus/", "/repositories", ("u", "p"))
+
+    assert first is second
+    assert first[0]["name"] == "maven"
+    assert mock_get.call_count == 1
+
+
+@patch("metrics.utils.catalog.get_from_nexus_conditional")
+def test_new_cycle_revalidates_with_etag(mock_get, catalog):
+    mock_get.return_value = ([{"name": "maven"}], '"v1"', False)
+    catalog.begin_cycle()
+    first = catalog.get("http://nexus", "repositories", None)
+
+    mock_get.return_value = (None, '"v1"', True)
+    catalog.begin_cycle()
+    second = catalog.get("http://nexus", "repositories", None)
+
+    assert second is first
+    assert mock_get.call_args.kwargs["etag"] == '"v1"'
+
+
+@patch("metrics.utils.catalog.get_from_nexus_conditional")
+def test_error_returns_empty_and_is_not_cached(mock_get, catalog):
+    mock_get.return_value = (None, None, False)
+    catalog.begin_cycle()
+    assert catalog.get("http://nexus", "blobstores", None) == ()
+
+    mock_get.return_value = ([{"name": "default"}], None, False)
+    assert catalog.get("http://nexus", "blobstores", None)[0]["name"] == "default"
+
+
+def test_freeze_is_immutable():
+    data = freeze([{"name": "maven", "attributes": {"proxy": {"remoteUrl": "x"}}}])
+    assert data[0]["attributes"]["proxy"].get("remoteUrl") == "x"
+    with pytest.raises(TypeError):
+        data[0]["name"] = "npm"
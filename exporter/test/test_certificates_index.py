@@ -0,0 +1,55 @@
+from metrics import certificates_expired
+from metrics.certificates_expired import CERT_DAYS_LEFT, CertificateIndex
+
+
+DAY = 86400
+
+
+def cert(fingerprint, expires_days, cn="example.org"):
+    return {
+        "fingerprint": fingerprint,
+        "subjectCommonName": cn,
+        "issuerCommonName": "CA",
+        "pem": "-----BEGIN CERTIFICATE-----\nMIIBIjANBgkqhkiG9w0BAQEFAAOC\n-----END CERTIFICATE-----",
+        "expiresOn": expires_days * DAY * 1000,
+    }
+
+
+def days_left():
+    return {labels[2]: value for labels, value in CERT_DAYS_LEFT.samples().items()}
+
+
+def test_sync_parses_only_new_and_drops_removed(monkeypatch):
+    index = CertificateIndex()
+    assert index.sync((cert("aa", 10), cert("bb", 20))) == (2, 0)
+
+    parsed = []
+    monkeypatch.setattr(
+        certificates_expired, "short_pem", lambda pem: parsed.append(pem) or "short"
+    )
+    assert index.sync((cert("bb", 20), cert("cc", 30))) == (1, 1)
+    assert len(parsed) == 1
+
+    index.refresh(now=5 * DAY)
+    assert days_left() == {"bb": 15.0, "cc": 25.0}
+
+
+def test_refresh_recomputes_without_truststore():
+    index = CertificateIndex()
+    index.sync((cert("aa", 10),))
+
+    index.refresh(now=0)
+    assert days_left() == {"aa": 10.0}
+    index.refresh(now=3.5 * DAY)
+    assert days_left() == {"aa": 6.0}
+
+
+def test_unchanged_catalog_snapshot_is_skipped():
+    index = CertificateIndex()
+    certs = (cert("aa", 10), cert("aa", 10))
+    assert index.sync(certs) == (1, 0)
+    assert index.sync(certs) == (0, 0)
+
+    index.refresh(now=0)
+    labels = next(iter(CERT_DAYS_LEFT.samples()))
+    assert labels[-1] == "1"  # duplicates
@@ -0,0 +1,43 @@
+from metrics import cleanup_policy
+
+
+def samples(gauge):
+    return gauge.samples()
+
+
+def test_coverage_exported_as_counts(monkeypatch):
+    rows = [
+        ("daily", 2, ["maven-releases", "npm-proxy"]),
+        ("unused", 0, []),
+    ]
+    monkeypatch.setattr(cleanup_policy, "fetch_cleanup_policy_coverage", lambda: rows)
+
+    coverage = cleanup_policy.fetch_cleanup_policy_usage()
+
+    assert coverage == {"daily": ["maven-releases", "npm-proxy"], "unused": []}
+    assert samples(cleanup_policy.nexus_cleanup_policy_usage_gauge) == {
+        ("daily",): 1.0,
+        ("unused",): 0.0,
+    }
+    assert samples(cleanup_policy.nexus_cleanup_policy_repositories_gauge) == {
+        ("daily",): 2.0,
+        ("unused",): 0.0,
+    }
+    assert set(samples(cleanup_policy.nexus_cleanup_policy_repository_gauge)) == {
+        ("daily", "maven-releases"),
+        ("daily", "npm-proxy"),
+    }
+    assert samples(cleanup_policy.nexus_cleanup_policy_count_gauge) == {
+        ("total",): 2.0,
+        ("used",): 1.0,
+        ("unused",): 1.0,
+    }
+
+
+def test_db_failure_keeps_previous_snapshot(monkeypatch):
+    monkeypatch.setattr(cleanup_policy, "fetch_cleanup_policy_coverage", lambda: [("p", 1, ["r"])])
+    cleanup_policy.fetch_cleanup_policy_usage()
+
+    monkeypatch.setattr(cleanup_policy, "fetch_cleanup_policy_coverage", lambda: [])
+    assert cleanup_policy.fetch_cleanup_policy_usage() == {}
+    assert samples(cleanup_policy.nexus_cleanup_policy_usage_gauge) == {("p",): 1.0}
@@ -0,0 +1,77 @@
+import psycopg2
+
+from metrics import docker_tag_ages
+
+
+def samples(gauge):
+    return gauge.samples()
+
+
+# Пороги 30 и 90 дней → бакеты: 0 — моложе 30, 1 — 30..90, 2 — старше 90
+ROWS = [
+    # свежий тег, скачивали недавно
+    ("docker-hosted", "app", 0, 0, 1, 100),
+    # запушен давно, но скачивали на прошлой неделе — не простаивает
+    ("docker-hosted", "app", 2, 0, 1, 200),
+    # запушен 60 дней назад, ни разу не скачан
+    ("docker-hosted", "app", 1, None, 2, 400),
+    # всё старше 90 дней
+    ("docker-hosted", "app", 2, 2, 1, 800),
+]
+
+
+def test_summary_idle_is_min_of_push_and_pull():
+    summary = docker_tag_ages.summarize_tag_ages(ROWS, thresholds=[30, 90])
+
+    stats = summary[("docker-hosted", "app")]
+    assert stats["updated"] == [1, 2, 2]
+    assert stats["downloaded"] == [2, 0, 3]
+    assert stats["reclaim_tags"] == [3, 1]
+    assert stats["reclaim_bytes"] == [1200, 800]
+
+
+def test_metrics_are_cumulative():
+    summary = docker_tag_ages.summarize_tag_ages(ROWS, thresholds=[30, 90])
+    docker_tag_ages.update_tag_age_metrics(summary, thresholds=[30, 90])
+
+    ages = samples(docker_tag_ages.TAG_AGE)
+    assert ages[("docker-hosted", "app", "updated", "30")] == 1.0
+    assert ages[("docker-hosted", "app", "updated", "+Inf")] == 5.0
+    assert ages[("docker-hosted", "app", "downloaded", "90")] == 2.0
+    assert samples(docker_tag_ages.REPO_RECLAIMABLE_ASSET_BYTES) == {
+        ("docker-hosted", "30"): 1200.0,
+        ("docker-hosted", "90"): 800.0,
+    }
+
+
+def test_empty_result_keeps_previous_snapshot(monkeypatch):
+    summary = docker_tag_ages.summarize_tag_ages(ROWS, thresholds=[30, 90])
+    docker_tag_ages.update_tag_age_metrics(summary, thresholds=[30, 90])
+    monkeypatch.setattr(docker_tag_ages, "fetch_docker_tag_ages", lambda bounds: [])
+
+    docker_tag_ages.fetch_docker_tag_age_metrics()
+
+    assert samples(docker_tag_ages.RECLAIMABLE_TAGS)[("docker-hosted", "app", "30")] == 3.0
+
+
+def test_reclaimable_matches_direct_query(nexus_db):
+    from database.docker_tags_query import fetch_docker_tag_ages
+
+    summary = docker_tag_ages.summarize_tag_ages(fetch_docker_tag_ages([30, 90]), [30, 90])
+
+    with psycopg2.connect(nexus_db) as conn, conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT COUNT(*), COALESCE(SUM(b.blob_size), 0)
+            FROM docker_component c
+            JOIN docker_asset a ON a.component_id = c.component_id
+            JOIN docker_asset_blob b ON b.asset_blob_id = a.asset_blob_id
+            WHERE c.last_updated <= now() - interval '90 days'
+              AND (a.last_downloaded IS NULL OR a.last_downloaded <= now() - interval '90 days')
+            """
+        )
+        tags, size = cur.fetchone()
+
+    assert tags > 0
+    assert sum(stats["reclaim_tags"][1] for stats in summary.values()) == tags
+    assert sum(stats["reclaim_bytes"][1] for stats in summary.values()) == size
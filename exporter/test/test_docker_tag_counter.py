@@ -0,0 +1,128 @@
+import pytest
+from unittest.mock import patch
+from database import docker_tags_query as q
+
+
+class FakeCursor:
+    """Эмуляция docker_component в памяти для запросов DockerTagCounter."""
+
+    def __init__(self, components, repositories):
+        self.components = components  # [(component_id, repository_id, name, version)]
+        self.repositories = repositories
+        self.executed = []
+        self._result = []
+
+    def execute(self, query, params=None):
+        self.executed.append(query)
+        if query == q.FULL_COUNTS_QUERY:
+            groups = {}
+            for cid, repo_id, name, _ in self.components:
+                count, max_id = groups.get((repo_id, name), (0, 0))
+                groups[(repo_id, name)] = (count + 1, max(max_id, cid))
+            self._result = [(k[0], k[1], c, m) for k, (c, m) in groups.items()]
+        elif query == q.NEW_COUNTS_QUERY:
+            groups = {}
+            for cid, repo_id, name, _ in self.components:
+                if cid > params[0]:
+                    count, max_id = groups.get((repo_id, name), (0, 0))
+                    groups[(repo_id, name)] = (count + 1, max(max_id, cid))
+            self._result = [(k[0], k[1], c, m) for k, (c, m) in groups.items()]
+        elif query == q.TOTALS_QUERY:
+            ids = [c[0] for c in self.components]
+            self._result = [(len(ids), max(ids, default=0))]
+        elif query == q.REPOSITORIES_QUERY:
+            self._result = [(rid, *info) for rid, info in self.repositories.items()]
+        else:
+            self._result = []
+
+    def fetchall(self):
+        return list(self._result)
+
+    def fetchone(self):
+        return self._result[0]
+
+
+@pytest.fixture
+def cursor():
+    return FakeCursor(
+        components=[
+            (1, 10, "library/redis", "7.2"),
+            (2, 10, "library/redis", "7.4"),
+            (3, 10, "library/nginx", "1.25"),
+        ],
+        repositories={10: ("docker-proxy", "docker-proxy", "default")},
+    )
+
+
+@pytest.fixture
+def counter(cursor):
+    c = q.DockerTagCounter(reconcile_interval=3600)
+    with patch.object(q, "execute_custom", side_effect=lambda fn, **kwargs: fn(cursor)):
+        yield c
+
+
+def as_dict(rows):
+    return {(image, repo): count for image, repo, _, _, count in rows}
+
+
+def test_first_refresh_is_full(counter, cursor):
+    rows = counter.refresh()
+    assert as_dict(rows) == {
+        ("library/redis", "docker-proxy"): 2,
+        ("library/nginx", "docker-proxy"): 1,
+    }
+    assert q.FULL_COUNTS_QUERY in cursor.executed
+    assert counter.watermark == 3
+
+
+def test_incremental_reads_only_new(counter, cursor):
+    counter.refresh()
+    cursor.executed.clear()
+    cursor.components.append((4, 10, "library/redis", "latest"))
+
+    rows = counter.refresh()
+    assert as_dict(rows)[("library/redis", "docker-proxy")] == 3
+    assert q.FULL_COUNTS_QUERY not in cursor.executed
+    assert q.NEW_COUNTS_QUERY in cursor.executed
+    assert counter.watermark == 4
+
+
+def test_no_changes_skips_new_rows_query(counter, cursor):
+    counter.refresh()
+    cursor.executed.clear()
+    counter.refresh()
+    assert q.NEW_COUNTS_QUERY not in cursor.executed
+
+
+def test_deletion_triggers_full_reconcile(counter, cursor):
+    counter.refresh()
+    cursor.components.pop(0)
+    cursor.components.append((5, 10, "library/alpine", "3.20"))
+    cursor.executed.clear()
+
+    rows = counter.refresh()
+    assert q.FULL_COUNTS_QUERY in cursor.executed
+    assert as_dict(rows) == {
+        ("library/redis", "docker-proxy"): 1,
+        ("library/nginx", "docker-proxy"): 1,
+        ("library/alpine", "docker-proxy"): 1,
+    }
+
+
+def test_reconcile_interval_forces_full(counter, cursor):
+    counter.refresh()
+    counter.last_full_time -= 3600
+    cursor.executed.clear()
+    counter.refresh()
+    assert q.FULL_COUNTS_QUERY in cursor.executed
+
+
+def test_same_version_in_two_namespaces_stays_incremental(counter, cursor):
+    # (repository_id, namespace, name, version) уникальны — версия может повториться
+    cursor.components.append((4, 10, "library/redis", "7.2"))
+    counter.refresh()
+    cursor.executed.clear()
+
+    rows = counter.refresh()
+    assert q.FULL_COUNTS_QUERY not in cursor.executed
+    assert as_dict(rows)[("library/redis", "docker-proxy")] == 3
@@ -0,0 +1,45 @@
+import pytest
+from prometheus_client import CollectorRegistry
+from metrics.docker_tags import DockerTagsCollector
+
+
+@pytest.fixture
+def collector():
+    return DockerTagsCollector(registry=CollectorRegistry())
+
+
+@pytest.fixture
+def sample_rows():
+    return [
+        ("library/redis", "docker-proxy", "docker-proxy", "default-blob", 3),
+        ("library/redis", "docker-test-repo", "docker-hosted", "test-blob", 2),
+        ("library/nginx", "docker-proxy", "docker-proxy", "default-blob", 2),
+    ]
+
+
+def test_collect_builds_samples(collector, sample_rows):
+    collector.update(sample_rows)
+    family = next(collector.collect())
+
+    assert len(family.samples) == 3
+    redis = next(s for s in family.samples if s.labels["repository"] == "docker-test-repo")
+    assert redis.labels["image_name"] == "library/redis"
+    assert redis.labels["blob"] == "test-blob"
+    assert "v2/library/redis/tags" in redis.labels["nexus_url_path"]
+    assert redis.value == 2
+
+
+def test_family_cached_until_update(collector, sample_rows):
+    collector.update(sample_rows)
+    first = next(collector.collect())
+    assert next(collector.collect()) is first
+
+    collector.update(sample_rows[:1])
+    second = next(collector.collect())
+    assert second is not first
+    assert len(second.samples) == 1
+
+
+def test_empty_collector(collector):
+    assert len(collector) == 0
+    assert next(collector.collect()).samples == []
@@ -0,0 +1,85 @@
+import gzip
+import urllib.request
+from email.utils import formatdate
+
+import pytest
+from prometheus_client import CollectorRegistry, Counter
+
+from common.exposition import MetricsCache, _not_modified, bump_generation, start_metrics_server
+
+
+@pytest.fixture
+def server():
+    registry = CollectorRegistry()
+    counter = Counter("test_renders", "test", registry=registry)
+    httpd, _ = start_metrics_server(0, addr="127.0.0.1", registry=registry)
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/metrics", counter
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def get(url, headers=None):
+    request = urllib.request.Request(url, headers=headers or {})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, dict(response.headers), response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, dict(e.headers), e.read()
+
+
+def test_rendered_once_per_generation(server):
+    url, counter = server
+    bump_generation()
+    _, headers, body = get(url)
+    assert b"test_renders_total 0.0" in body
+
+    # Данные поменялись без новой публикации — отдаётся кэш
+    counter.inc()
+    _, cached_headers, cached = get(url)
+    assert cached == body
+    assert cached_headers["ETag"] == headers["ETag"]
+
+    bump_generation()
+    _, _, fresh = get(url)
+    assert b"test_renders_total 1.0" in fresh
+
+
+def test_conditional_and_gzip(server):
+    url, _ = server
+    bump_generation()
+    _, headers, body = get(url)
+
+    status, _, _ = get(url, {"If-None-Match": headers["ETag"]})
+    assert status == 304
+    status, _, _ = get(url, {"If-Modified-Since": headers["Last-Modified"]})
+    assert status == 304
+
+    status, gz_headers, gz_body = get(url, {"Accept-Encoding": "gzip"})
+    assert gz_headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(gz_body) == body
+
+
+def test_last_modified_follows_body():
+    registry = CollectorRegistry()
+    counter = Counter("test_renders", "test", registry=registry)
+    cache = MetricsCache(registry, max_age=0)
+    first, _ = cache.get(None)
+    since = {"If-Modified-Since": formatdate(first.modified_at, usegmt=True)}
+
+    # Перерисовка с тем же телом не сдвигает Last-Modified
+    same, _ = cache.get(None)
+    assert same is not first and same.modified_at == first.modified_at
+    assert _not_modified(since, same)
+
+    # Счётчик изменился без новой публикации — If-Modified-Since не даёт 304
+    counter.inc()
+    changed, _ = cache.get(None)
+    assert int(changed.modified_at) > int(first.modified_at)
+    assert not _not_modified(since, changed)
+
+
+def test_openmetrics_negotiation(server):
+    url, _ = server
+    _, headers, body = get(url, {"Accept": "application/openmetrics-text; version=1.0.0"})
+    assert headers["Content-Type"].startswith("application/openmetrics-text")
+    assert body.endswith(b"# EOF\n")
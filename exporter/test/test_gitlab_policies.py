@@ -0,0 +1,133 @@
+import gitlab
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+from metrics.utils.api_gitlab import PolicyDiscovery, parse_policy_file
+
+
+class FakeProject:
+    def __init__(self, tree, blobs):
+        self.tree = tree
+        self.blobs = blobs
+        self.blob_requests = []
+        # Сколько следующих запросов завершится ошибкой GitLab
+        self.failing_trees = 0
+        self.failing_blobs = 0
+
+    def repository_tree(self, **kwargs):
+        if self.failing_trees:
+            self.failing_trees -= 1
+            raise gitlab.exceptions.GitlabGetError("502 Bad Gateway", 502)
+        return self.tree
+
+    def repository_raw_blob(self, sha):
+        self.blob_requests.append(sha)
+        if self.failing_blobs:
+            self.failing_blobs -= 1
+            raise gitlab.exceptions.GitlabGetError("502 Bad Gateway", 502)
+        return self.blobs[sha].encode()
+
+
+class FakeGitlab:
+    def __init__(self, projects_info, projects):
+        self.projects_info = projects_info
+        self.groups = SimpleNamespace(
+            get=lambda group_id: SimpleNamespace(
+                projects=SimpleNamespace(list=lambda **kw: self.projects_info)
+            )
+        )
+        self.projects = SimpleNamespace(get=lambda pid, lazy=False: projects[pid])
+
+
+@pytest.fixture
+def project():
+    return FakeProject(
+        tree=[{"type": "blob", "name": "a.yaml", "path": "nexus/cleaner/a.yaml", "id": "sha1"}],
+        blobs={"sha1": "repo_names: [maven-releases, npm]"},
+    )
+
+
+@pytest.fixture
+def gl(project):
+    info = [SimpleNamespace(id=1, path_with_namespace="team/configs", last_activity_at="t1")]
+    return FakeGitlab(info, {1: project})
+
+
+@pytest.fixture
+def discovery(tmp_path, gl):
+    d = PolicyDiscovery(
+        "https://gitlab", "token", "main", cache_file=str(tmp_path / "cache.json"), workers=2
+    )
+    with patch("metrics.utils.api_gitlab.get_gitlab_connection", return_value=gl):
+        yield d
+
+
+def test_parse_policy_file():
+    assert parse_policy_file("repo_names: [a, b]") == ["a", "b"]
+    assert parse_policy_file("other: 1") == []
+
+
+def test_refresh_builds_links(discovery):
+    discovery.refresh()
+    assert discovery.policies() == {
+        "maven-releases": "https://gitlab/team/configs/-/blob/main/nexus/cleaner/a.yaml",
+        "npm": "https://gitlab/team/configs/-/blob/main/nexus/cleaner/a.yaml",
+    }
+
+
+def test_unchanged_project_is_not_rescanned(discovery, project):
+    discovery.refresh()
+    discovery.refresh()
+    assert project.blob_requests == ["sha1"]
+
+
+def test_changed_activity_refetches_only_changed_blobs(discovery, project, gl):
+    discovery.refresh()
+    gl.projects_info[0].last_activity_at = "t2"
+    project.tree.append(
+        {"type": "blob", "name": "b.yml", "path": "nexus/cleaner/b.yml", "id": "sha2"}
+    )
+    project.blobs["sha2"] = "repo_names: [docker]"
+
+    discovery.refresh()
+    assert project.blob_requests == ["sha1", "sha2"]
+    assert "docker" in discovery.policies()
+
+
+def test_cache_survives_restart(discovery, tmp_path):
+    discovery.refresh()
+    restored = PolicyDiscovery(
+        "https://gitlab", "token", "main", cache_file=str(tmp_path / "cache.json")
+    )
+    assert restored.policies() == discovery.policies()
+
+
+def test_failed_blob_is_retried(discovery, project, tmp_path):
+    project.failing_blobs = 1
+    discovery.refresh()
+    assert discovery.policies() == {}
+
+    # Неполный скан не попадает в кэш как актуальный — и после рестарта тоже
+    restored = PolicyDiscovery(
+        "https://gitlab", "token", "main", cache_file=str(tmp_path / "cache.json")
+    )
+    restored.refresh()
+    assert project.blob_requests == ["sha1", "sha1"]
+    assert "npm" in restored.policies()
+
+
+def test_tree_error_keeps_previous_files(discovery, project, gl):
+    discovery.refresh()
+    policies = discovery.policies()
+
+    gl.projects_info[0].last_activity_at = "t2"
+    project.failing_trees = 1
+    discovery.refresh()
+    assert discovery.policies() == policies
+
+    # Следующий цикл сканирует проект снова, хотя last_activity_at не менялся
+    project.blobs["sha2"] = "repo_names: [docker]"
+    project.tree[0]["id"] = "sha2"
+    discovery.refresh()
+    assert list(discovery.policies()) == ["docker"]
+
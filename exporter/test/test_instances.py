@@ -0,0 +1,148 @@
+import json
+import time
+
+import pytest
+from prometheus_client import CollectorRegistry
+
+from common import instances, resilience
+from common.instances import NexusInstance, PerInstance, parse_instances, use_instance
+from database.utils.query_to_db import fetch_data
+from database.utils import connection
+from metrics.docker_tags import DockerTagsCollector
+from metrics.utils.snapshot import SnapshotGauge
+
+EU = NexusInstance("eu", "https://nexus-eu.example", "svc", "secret", "postgresql://eu/nexus")
+US = NexusInstance("us", "https://nexus-us.example", "svc", "secret", "postgresql://us/nexus")
+
+
+def test_parse_instances_expands_env(monkeypatch, tmp_path):
+    monkeypatch.setenv("NEXUS_EU_PASSWORD", "s3cret")
+    config = [
+        {
+            "name": "eu",
+            "url": "https://nexus-eu.example",
+            "username": "svc",
+            "password": "${NEXUS_EU_PASSWORD}",
+            "database_url": "postgresql://eu/nexus",
+        },
+        {"name": "us", "url": "https://nexus-us.example", "database_url": "postgresql://us/nexus"},
+    ]
+    path = tmp_path / "instances.json"
+    path.write_text(json.dumps(config))
+
+    for raw in (json.dumps(config), str(path)):
+        eu, us = parse_instances(raw)
+        assert eu.auth == ("svc", "s3cret")
+        assert us.name == "us" and us.database_read_url is None
+
+
+@pytest.mark.parametrize(
+    "config",
+    [
+        [],
+        [{"name": "eu", "url": "https://a"}],
+        [{"name": "eu", "url": "https://a", "database_url": "x", "token": "t"}],
+        [
+            {"name": "eu", "url": "https://a", "database_url": "x"},
+            {"name": "eu", "url": "https://b", "database_url": "y"},
+        ],
+    ],
+)
+def test_parse_instances_rejects_bad_config(config):
+    with pytest.raises(ValueError):
+        parse_instances(json.dumps(config))
+
+
+def test_snapshot_gauge_partitions_by_instance(monkeypatch):
+    monkeypatch.setattr(instances, "_by_name", {"eu": EU, "us": US})
+    gauge = SnapshotGauge(
+        "test_repo_size", "Размер", ["repo_name"], registry=CollectorRegistry(), instance_label=True
+    )
+    for instance, size in ((EU, 10), (US, 20)):
+        with use_instance(instance):
+            buffer = gauge.buffer()
+            buffer.labels(repo_name="maven").set(size)
+            gauge.publish(buffer)
+
+    # Пустой снимок eu не трогает серии us
+    with use_instance(EU):
+        gauge.clear()
+    with use_instance(US):
+        assert gauge.samples() == {("maven",): 20.0}
+
+    family = next(gauge.collect())
+    assert [(s.labels, s.value) for s in family.samples] == [
+        ({"repo_name": "maven", "nexus_instance": "us"}, 20.0)
+    ]
+
+    restored = SnapshotGauge(
+        "test_repo_size", "Размер", ["repo_name"], registry=None, instance_label=True
+    )
+    assert restored.labelnames == ("repo_name", "nexus_instance")
+    assert restored.restore(gauge.dump()) == 1
+    with use_instance(US):
+        assert restored.samples() == {("maven",): 20.0}
+
+
+def test_restore_skips_removed_instances(monkeypatch):
+    monkeypatch.setattr(instances, "_by_name", {"eu": EU})
+    rows = [["maven", "eu", 10], ["maven", "us", 20]]
+
+    gauge = SnapshotGauge(
+        "test_repo_size", "Размер", ["repo_name"], registry=None, instance_label=True
+    )
+    assert gauge.restore(rows) == 1
+    assert [s.labels["nexus_instance"] for s in next(gauge.collect()).samples] == ["eu"]
+
+    collector = DockerTagsCollector(registry=None, instance_label=True)
+    tags = [["library/redis", "docker-proxy", "docker", "default", 3, name] for name in ("eu", "us")]
+    assert collector.restore(tags) == 1
+
+
+def test_docker_tags_link_to_own_instance(monkeypatch):
+    monkeypatch.setattr(instances, "_by_name", {"eu": EU, "us": US})
+    collector = DockerTagsCollector(registry=CollectorRegistry(), instance_label=True)
+    for instance in (EU, US):
+        with use_instance(instance):
+            collector.update([("library/redis", "docker-proxy", "docker", "default", 3)])
+
+    samples = next(collector.collect()).samples
+    urls = {s.labels["nexus_instance"]: s.labels["nexus_url_path"] for s in samples}
+    assert urls["eu"].startswith("https://nexus-eu.example#browse")
+    assert urls["us"].startswith("https://nexus-us.example#browse")
+
+    restored = DockerTagsCollector(registry=None, instance_label=True)
+    assert restored.restore(collector.dump()) == 2
+    assert len(restored) == 2
+
+
+def test_per_instance_state():
+    seen = PerInstance(set)
+    with use_instance(EU):
+        seen.add("maven")
+    with use_instance(US):
+        assert "maven" not in seen
+        assert len(seen) == 0
+
+
+def test_cycle_budget_is_per_instance():
+    with use_instance(EU):
+        resilience.start_cycle(5)
+        resilience._cycle_budget().deadline = time.monotonic() - 1
+        with pytest.raises(resilience.DeadlineExceeded):
+            resilience.begin_call("nexus-eu.example", 20)
+    with use_instance(US):
+        resilience.start_cycle(5)
+        assert resilience.begin_call("nexus-us.example", 20) <= 5
+
+    for instance in (EU, US):
+        with use_instance(instance):
+            resilience.start_cycle(0)
+
+
+def test_database_of_current_instance(nexus_dsn, monkeypatch):
+    monkeypatch.setattr(connection, "DATABASE_URL", "postgresql://nobody@127.0.0.1:1/default")
+    eu = NexusInstance("eu", "https://nexus-eu.example", database_url=nexus_dsn)
+
+    with use_instance(eu):
+        assert fetch_data("SELECT current_database()") == [("nexus",)]
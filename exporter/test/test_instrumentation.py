@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+
+import pytest
+from prometheus_client import REGISTRY
+
+from common.instrumentation import (
+    instrumented,
+    observe_response,
+    record_db_rows,
+    track_collector,
+)
+
+
+def value(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_instrumented_counts_calls_and_duration():
+    labels = {"kind": "http", "call": "test_ok"}
+    calls = value("nexus_exporter_calls_total", **labels)
+
+    @instrumented("http", "test_ok")
+    def call(x):
+        return x * 2
+
+    assert call(21) == 42
+    assert value("nexus_exporter_calls_total", **labels) == calls + 1
+    assert value("nexus_exporter_call_duration_seconds_count", **labels) == 1
+    assert value("nexus_exporter_call_errors_total", **labels) == 0
+
+
+def test_instrumented_counts_raised_errors():
+    labels = {"kind": "db", "call": "test_raises"}
+
+    @instrumented("db", "test_raises")
+    def call():
+        raise RuntimeError("тест")
+
+    with pytest.raises(RuntimeError):
+        call()
+    assert value("nexus_exporter_call_errors_total", **labels) == 1
+    assert value("nexus_exporter_call_duration_seconds_count", **labels) == 1
+
+
+def test_track_collector_counts_errors():
+    labels = {"collector": "test_collector"}
+
+    with track_collector("test_collector"):
+        pass
+    with pytest.raises(ValueError):
+        with track_collector("test_collector"):
+            raise ValueError("тест")
+
+    assert value("nexus_exporter_collector_duration_seconds_count", **labels) == 2
+    assert value("nexus_exporter_collector_errors_total", **labels) == 1
+
+
+def test_observe_response_counts_codes_and_bytes():
+    responses = value("nexus_exporter_http_responses_total", code="418")
+    size = value("nexus_exporter_http_response_bytes_total")
+    rows = value("nexus_exporter_db_rows_total")
+
+    response = SimpleNamespace(status_code=418, content=b"teapot")
+    assert observe_response(response) is response
+    observe_response(SimpleNamespace(status_code=418, content=None))
+    record_db_rows(7)
+
+    assert value("nexus_exporter_http_responses_total", code="418") == responses + 2
+    assert value("nexus_exporter_http_response_bytes_total") == size + 6
+    assert value("nexus_exporter_db_rows_total") == rows + 7
@@ -0,0 +1,47 @@
+import javaobj.v2 as javaobj
+import pytest
+
+from nexus_stand_in import encode_job_data_map, task_job_data
+from database.utils import jobs_reader
+from database.utils.job_data import decode_job_data_map, UnsupportedJobData
+from database.utils.jobs_reader import convert_java
+
+
+@pytest.mark.parametrize("share_strings", [False, True])
+def test_matches_javaobj(share_strings):
+    values = dict(task_job_data(7, repos=10), **{".enabled": "true", "dryRun": "true", "": "тест"})
+    data = encode_job_data_map(values, share_strings=share_strings)
+
+    assert decode_job_data_map(data) == values
+    assert convert_java(javaobj.loads(data)) == values
+
+
+def test_empty_map():
+    assert decode_job_data_map(encode_job_data_map({})) == {}
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        b"",
+        b"\xac\xed\x00\x05\x74\x00\x01x",  # строка вместо объекта
+        encode_job_data_map({"a": "b"})[:-10],  # оборванный поток
+        encode_job_data_map({"a": "b"}).replace(b"java.util.HashMap", b"java.util.TreeMap"),
+    ],
+)
+def test_unsupported_layout(data):
+    with pytest.raises(UnsupportedJobData):
+        decode_job_data_map(data)
+
+
+def test_falls_back_to_javaobj(monkeypatch):
+    values = task_job_data(2, repos=10)
+    row = encode_job_data_map(values)
+
+    def unsupported(data):
+        raise UnsupportedJobData("тест")
+
+    monkeypatch.setattr(jobs_reader, "decode_job_data_map", unsupported)
+    monkeypatch.setattr(jobs_reader, "fetch_data", lambda query: [(row,), (None,)])
+
+    assert jobs_reader.get_jobs_data() == [values]
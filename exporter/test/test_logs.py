@@ -0,0 +1,47 @@
+import json
+import logging
+
+from common.logs import ItemLog, JsonFormatter
+
+
+def messages(caplog):
+    return [record.getMessage() for record in caplog.records]
+
+
+def run(mode, caplog, items=5):
+    caplog.clear()
+    log = ItemLog("repos", mode=mode, sample_every=2)
+    with caplog.at_level(logging.INFO):
+        for i in range(items):
+            log.info("repo %d", i)
+        log.summary()
+    return messages(caplog)
+
+
+def test_summary_mode_logs_only_total(caplog):
+    assert run("summary", caplog) == ["📋 repos: обработано 5"]
+
+
+def test_sample_mode_logs_every_nth(caplog):
+    assert run("sample", caplog) == ["repo 0", "repo 2", "repo 4", "📋 repos: обработано 5"]
+
+
+def test_all_mode_logs_every_item(caplog):
+    assert len(run("all", caplog)) == 6
+
+
+def test_skipped_items_are_not_formatted():
+    class Exploding:
+        def __str__(self):
+            raise AssertionError("formatted")
+
+    ItemLog("x", mode="summary").info("%s", Exploding())
+
+
+def test_json_formatter():
+    record = logging.LogRecord("root", logging.WARNING, __file__, 1, "⚠️ %s: %d", ("repo", 3), None)
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry["level"] == "WARNING"
+    assert entry["message"] == "⚠️ repo: 3"
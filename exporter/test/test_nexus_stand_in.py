@@ -0,0 +1,33 @@
+import javaobj.v2 as javaobj
+
+from nexus_stand_in import encode_job_data_map, task_job_data
+from database.utils.jobs_reader import convert_java
+
+
+def test_job_data_map_encoding_is_readable():
+    values = task_job_data(1, repos=10)
+    assert convert_java(javaobj.loads(encode_job_data_map(values))) == values
+
+
+def test_repository_sizes(nexus_db):
+    from database.repository_size_query import get_repository_sizes
+
+    sizes = get_repository_sizes()
+    assert sizes
+    assert all(size > 0 for size in sizes.values())
+
+
+def test_docker_tags(nexus_db):
+    from database.docker_tags_query import fetch_docker_tags_full
+
+    rows = fetch_docker_tags_full()
+    assert rows
+    assert all(row[2].startswith("docker-") for row in rows)
+
+
+def test_jobs(nexus_db):
+    from database.utils.jobs_reader import get_jobs_data
+
+    jobs = get_jobs_data()
+    assert jobs
+    assert all(".typeId" in job for job in jobs)
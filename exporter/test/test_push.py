@@ -0,0 +1,91 @@
+import gzip
+
+import pytest
+import requests
+from prometheus_client import CollectorRegistry
+
+from common.instances import NexusInstance, use_instance
+from metrics.utils.push import VictoriaMetricsPusher, render_collector, split_batches
+from metrics.utils.snapshot import SnapshotGauge, _publish_listeners, add_publish_listener
+
+
+class FakeSession:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.bodies = []
+
+    def post(self, url, data, **kwargs):
+        if self.fail:
+            raise requests.ConnectionError("down")
+        self.bodies.append(gzip.decompress(data))
+        response = requests.Response()
+        response.status_code = 204
+        return response
+
+
+@pytest.fixture
+def gauge():
+    gauge = SnapshotGauge("test_push_size", "test", ["repo_name"], registry=CollectorRegistry())
+    buffer = gauge.buffer()
+    buffer.labels(repo_name='ma"ven').set(42)
+    gauge.publish(buffer)
+    return gauge
+
+
+def test_render_has_explicit_timestamp(gauge):
+    assert render_collector(gauge, 1700000000000) == (
+        b'test_push_size{repo_name="ma\\"ven"} 42.0 1700000000000\n'
+    )
+
+
+def test_split_batches_respects_line_boundaries():
+    chunks = [b"a 1 1\nb 2 1\n", b"c 3 1\n"]
+    assert split_batches(chunks, 8) == [b"a 1 1\n", b"b 2 1\n", b"c 3 1\n"]
+    assert split_batches(chunks, 100) == [b"a 1 1\nb 2 1\nc 3 1\n"]
+
+
+def test_failed_batches_are_queued_and_retried(tmp_path, gauge):
+    pusher = VictoriaMetricsPusher("http://vm:8428", queue_dir=str(tmp_path))
+    pusher._session = FakeSession(fail=True)
+
+    pusher.on_publish(gauge)
+    pusher.flush()
+    assert len(list(tmp_path.glob("*.prom.gz"))) == 1
+
+    pusher._session = FakeSession()
+    pusher.flush()
+    assert list(tmp_path.glob("*.prom.gz")) == []
+    assert pusher._session.bodies[0].startswith(b"test_push_size{")
+
+
+def test_queue_is_bounded(tmp_path, gauge):
+    pusher = VictoriaMetricsPusher("http://vm:8428", queue_dir=str(tmp_path), queue_max_bytes=1)
+    pusher._session = FakeSession(fail=True)
+
+    for _ in range(3):
+        pusher.on_publish(gauge)
+        pusher.flush()
+    assert list(tmp_path.glob("*.prom.gz")) == []
+
+
+def test_publish_pushes_only_current_instance(tmp_path):
+    eu = NexusInstance("eu", "https://nexus-eu.example")
+    us = NexusInstance("us", "https://nexus-us.example")
+    gauge = SnapshotGauge(
+        "test_push_instances", "test", ["repo_name"],
+        registry=CollectorRegistry(), instance_label=True,
+    )
+    pusher = VictoriaMetricsPusher("http://vm:8428", queue_dir=str(tmp_path))
+    add_publish_listener(pusher.on_publish)
+    try:
+        for instance in (eu, us):
+            with use_instance(instance):
+                buffer = gauge.buffer()
+                buffer.labels(repo_name="maven").set(1)
+                gauge.publish(buffer)
+    finally:
+        _publish_listeners.remove(pusher.on_publish)
+
+    first, second = pusher._pending
+    assert b'nexus_instance="eu"' in first and b'nexus_instance="us"' not in first
+    assert b'nexus_instance="us"' in second and b'nexus_instance="eu"' not in second
@@ -0,0 +1,74 @@
+import time
+
+from common import resilience
+from database.utils import query_to_db
+from database.utils import connection
+from database.utils.query_to_db import execute_custom, fetch_data
+
+
+class RecordingCursor:
+    def __init__(self):
+        self.executed = []
+
+    def execute(self, query, params=None):
+        self.executed.append(params)
+
+
+def test_statement_timeout_is_capped_by_cycle_budget(monkeypatch):
+    monkeypatch.setattr(query_to_db, "remaining", lambda: 3.5)
+    cursor = RecordingCursor()
+
+    query_to_db._configure(cursor, statement_timeout=600, work_mem="64MB")
+
+    assert cursor.executed == [("3500ms",), ("64MB",)]
+
+
+def test_heavy_query_ignores_cycle_budget(monkeypatch):
+    monkeypatch.setattr(query_to_db, "remaining", lambda: 3.5)
+    cursor = RecordingCursor()
+
+    query_to_db._configure(cursor, **query_to_db.HEAVY_QUERY)
+
+    assert cursor.executed[0] == (f"{int(query_to_db.DB_HEAVY_STATEMENT_TIMEOUT * 1000)}ms",)
+
+
+def test_heavy_query_runs_after_cycle_deadline(nexus_db):
+    resilience.start_cycle(5)
+    resilience._cycle_budget().deadline = time.monotonic() - 1
+    try:
+        assert fetch_data("SELECT 1") == []
+        assert fetch_data("SELECT 1", **query_to_db.HEAVY_QUERY) == [(1,)]
+    finally:
+        resilience.start_cycle(0)
+
+
+def test_settings_are_local_to_the_query(nexus_db):
+    def settings(cur):
+        cur.execute("SHOW work_mem")
+        work_mem = cur.fetchone()[0]
+        cur.execute("SHOW statement_timeout")
+        return work_mem, cur.fetchone()[0]
+
+    assert execute_custom(settings, statement_timeout=5, work_mem="12MB") == ("12MB", "5s")
+    assert fetch_data("SHOW work_mem") != [("12MB",)]
+
+
+def test_session_is_read_only_with_isolation(nexus_db):
+    def session(cur):
+        cur.execute("SHOW transaction_read_only")
+        read_only = cur.fetchone()[0]
+        cur.execute("SHOW transaction_isolation")
+        return read_only, cur.fetchone()[0]
+
+    assert execute_custom(session, isolation_level="REPEATABLE READ") == ("on", "repeatable read")
+
+
+def test_slow_query_is_cancelled(nexus_db):
+    assert fetch_data("SELECT pg_sleep(5)", statement_timeout=0.2) == []
+
+
+def test_read_url_is_preferred(nexus_db, monkeypatch):
+    monkeypatch.setattr(connection, "DATABASE_URL", "postgresql://nobody@127.0.0.1:1/primary")
+    monkeypatch.setattr(connection, "DATABASE_READ_URL", nexus_db)
+
+    assert fetch_data("SELECT 1") == [(1,)]
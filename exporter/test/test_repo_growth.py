@@ -0,0 +1,37 @@
+import pytest
+
+from metrics import repo_size
+from metrics.repo_size import REPO_HISTORY, update_growth_metrics
+
+
+@pytest.fixture(autouse=True)
+def clean_history():
+    REPO_HISTORY.clear()
+    yield
+    REPO_HISTORY.clear()
+
+
+def test_delta_and_rate():
+    update_growth_metrics({"maven": 1000, "npm": 500}, now=0)
+    assert repo_size.REPO_SIZE_DELTA.samples() == {}
+
+    update_growth_metrics({"maven": 1600, "npm": 500}, now=60)
+    assert repo_size.REPO_SIZE_DELTA.samples() == {("maven",): 600.0, ("npm",): 0.0}
+    assert repo_size.REPO_GROWTH_RATE.samples()[("maven",)] == pytest.approx(10.0)
+
+
+def test_top_n_only_growing_repos():
+    update_growth_metrics({"a": 0, "b": 0, "c": 100}, now=0)
+    update_growth_metrics({"a": 100, "b": 300, "c": 50}, now=10, top_n=5)
+
+    assert repo_size.REPO_TOP_GROWTH.samples() == {
+        ("b", "1"): pytest.approx(30.0),
+        ("a", "2"): pytest.approx(10.0),
+    }
+
+
+def test_removed_repos_are_forgotten():
+    update_growth_metrics({"old": 1, "new": 1}, now=0)
+    update_growth_metrics({"new": 2}, now=1)
+    assert "old" not in REPO_HISTORY
+    assert set(repo_size.REPO_GROWTH_RATE.samples()) == {("new",)}
@@ -0,0 +1,67 @@
+import socket
+
+import pytest
+
+from metrics import repo_status
+
+
+class FakeResponse:
+    def __init__(self, status_code=200):
+        self.status_code = status_code
+        self.history = []
+        self.url = "https://example"
+        self.headers = {}
+
+
+@pytest.fixture(autouse=True)
+def clean_dns_cache():
+    repo_status._DNS_CACHE.clear()
+    yield
+    repo_status._DNS_CACHE.clear()
+
+
+def test_dns_result_is_cached(monkeypatch):
+    calls = []
+    monkeypatch.setattr(socket, "gethostbyname", lambda host: calls.append(host))
+
+    assert repo_status.is_domain_resolvable("https://repo1.maven.org:443/maven2/")
+    assert repo_status.is_domain_resolvable("https://repo1.maven.org/other/")
+    assert calls == ["repo1.maven.org"]
+
+
+def test_negative_dns_result_is_cached(monkeypatch):
+    calls = []
+
+    def fail(host):
+        calls.append(host)
+        raise socket.gaierror("nope")
+
+    monkeypatch.setattr(socket, "gethostbyname", fail)
+
+    assert not repo_status.is_domain_resolvable("https://missing.local/")
+    assert not repo_status.is_domain_resolvable("https://missing.local/")
+    assert len(calls) == 1
+
+
+def test_shared_upstream_probed_once(monkeypatch):
+    monkeypatch.setattr(socket, "gethostbyname", lambda host: None)
+    probed = []
+
+    def fake_get(url, auth=None):
+        probed.append(url)
+        return FakeResponse(), None
+
+    monkeypatch.setattr(repo_status, "safe_get_raw", fake_get)
+
+    repos = [
+        {"name": "maven-a", "url": "https://nexus/a/", "type": "maven2",
+         "remote": "https://repo1.maven.org/maven2/"},
+        {"name": "maven-b", "url": "https://nexus/b/", "type": "maven2",
+         "remote": "https://REPO1.maven.org/maven2"},
+    ]
+    probes = {}
+    statuses = [repo_status.fetch_status(repo, None, probes) for repo in repos]
+
+    remote_calls = [url for url in probed if "maven.org" in url]
+    assert remote_calls == ["https://repo1.maven.org/maven2/"]
+    assert [s["remote_status"] for s in statuses] == ["✅", "✅"]
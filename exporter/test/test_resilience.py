@@ -0,0 +1,106 @@
+import time
+
+import pytest
+import requests
+
+from common import resilience
+from metrics.utils import api
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def isolated(monkeypatch):
+    monkeypatch.setattr(resilience, "_breakers", {})
+    resilience.start_cycle(0)
+    yield
+    resilience.start_cycle(0)
+
+
+def test_breaker_opens_and_recovers_after_probe():
+    clock = FakeClock()
+    breaker = resilience.CircuitBreaker("nexus", failure_threshold=2, reset_timeout=30, clock=clock)
+
+    breaker.before_call()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == breaker.OPEN
+    with pytest.raises(resilience.CircuitOpen):
+        breaker.before_call()
+
+    clock.now = 31
+    breaker.before_call()  # пробный вызов
+    with pytest.raises(resilience.CircuitOpen):
+        breaker.before_call()  # второй параллельный — нет
+    breaker.record_success()
+    assert breaker.state == breaker.CLOSED
+
+
+def test_failed_probe_reopens():
+    clock = FakeClock()
+    breaker = resilience.CircuitBreaker("db", failure_threshold=1, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+
+    clock.now = 11
+    breaker.before_call()
+    breaker.record_failure()
+
+    assert breaker.state == breaker.OPEN
+    clock.now = 15
+    with pytest.raises(resilience.CircuitOpen):
+        breaker.before_call()
+
+
+def test_timeout_is_capped_by_cycle_budget(monkeypatch):
+    resilience.start_cycle(5)
+    assert resilience.begin_call("nexus", 20) <= 5
+
+    monkeypatch.setattr(resilience._cycle_budget(), "deadline", time.monotonic() - 1)
+    with pytest.raises(resilience.DeadlineExceeded):
+        resilience.begin_call("nexus", 20)
+
+
+def test_dead_host_is_skipped_without_network(monkeypatch):
+    calls = []
+
+    def failing_get(url, **kwargs):
+        calls.append(url)
+        raise requests.ConnectTimeout("timeout")
+
+    monkeypatch.setattr(api.session, "get", failing_get)
+    resilience._breakers["upstream.example"] = resilience.CircuitBreaker(
+        "upstream.example", failure_threshold=2, reset_timeout=60
+    )
+
+    for _ in range(2):
+        assert api.safe_get_raw("https://upstream.example/a")[0] is None
+    response, error = api.safe_get_raw("https://upstream.example/b")
+
+    assert response is None
+    assert isinstance(error, resilience.CircuitOpen)
+    assert len(calls) == 2
+    # Другие хосты не затронуты
+    assert api.safe_get_json("https://other.example/x", None) == []
+    assert len(calls) == 3
+
+
+def test_server_errors_count_as_failures(monkeypatch):
+    class Response:
+        status_code = 503
+
+        def raise_for_status(self):
+            raise requests.HTTPError("503")
+
+    monkeypatch.setattr(api.session, "get", lambda url, **kwargs: Response())
+    resilience._breakers["nexus.example"] = resilience.CircuitBreaker(
+        "nexus.example", failure_threshold=1, reset_timeout=60
+    )
+
+    assert api.get_from_nexus("https://nexus.example", "tasks", None) == []
+    assert resilience._breakers["nexus.example"].state == resilience.CircuitBreaker.OPEN
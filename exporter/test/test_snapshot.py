@@ -0,0 +1,63 @@
+import pytest
+from prometheus_client import CollectorRegistry, generate_latest
+from metrics.utils.snapshot import SnapshotGauge
+
+
+@pytest.fixture
+def registry():
+    return CollectorRegistry()
+
+
+@pytest.fixture
+def gauge(registry):
+    return SnapshotGauge("test_repo_size", "Размер репозитория", ["repo_name"], registry=registry)
+
+
+def test_publish_swaps_snapshot(gauge):
+    first = gauge.buffer()
+    first.labels(repo_name="maven").set(10)
+    first.labels(repo_name="npm").set(20)
+    assert gauge.publish(first) == (2, 0, 0)
+
+    second = gauge.buffer()
+    second.labels(repo_name="maven").set(15)
+    second.labels(repo_name="docker").set(5)
+    # docker добавлен, npm удалён по диффу, maven изменился
+    assert gauge.publish(second) == (1, 1, 1)
+    assert gauge.samples() == {("maven",): 15.0, ("docker",): 5.0}
+
+
+def test_buffer_not_visible_until_publish(gauge, registry):
+    published = gauge.buffer()
+    published.labels(repo_name="maven").set(1)
+    gauge.publish(published)
+
+    pending = gauge.buffer()
+    pending.labels(repo_name="raw").set(2)
+
+    output = generate_latest(registry).decode()
+    assert 'test_repo_size{repo_name="maven"} 1.0' in output
+    assert "raw" not in output
+
+
+def test_buffer_positional_labels(gauge):
+    buffer = gauge.buffer()
+    buffer.labels("maven").set(3)
+    gauge.publish(buffer)
+    assert gauge.samples() == {("maven",): 3.0}
+
+
+def test_buffer_wrong_labels(gauge):
+    buffer = gauge.buffer()
+    with pytest.raises(ValueError):
+        buffer.labels(repo="maven")
+    with pytest.raises(ValueError):
+        buffer.labels("maven", "extra")
+
+
+def test_clear(gauge):
+    buffer = gauge.buffer()
+    buffer.labels(repo_name="maven").set(1)
+    gauge.publish(buffer)
+    gauge.clear()
+    assert gauge.samples() == {}
@@ -0,0 +1,121 @@
+import json
+
+from prometheus_client import REGISTRY
+
+from metrics import task_events
+from metrics.task_events import EventLog, TaskEventTracker, run_states_from_jobs
+
+STARTED = 1_700_000_000
+
+
+def task(state="WAITING", last_run=None, result=None, task_id="t1"):
+    return {
+        "id": task_id,
+        "name": "Compact default",
+        "type": "blobstore.compact",
+        "currentState": state,
+        "lastRun": last_run,
+        "lastRunResult": result,
+    }
+
+
+def events(tracker, tasks, **kwargs):
+    return [(e["task_id"], e["event"]) for e in tracker.observe(tasks, **kwargs)]
+
+
+def test_first_snapshot_only_remembered():
+    tracker = TaskEventTracker()
+    assert events(tracker, [task("RUNNING")]) == []
+
+
+def test_started_then_finished_with_duration():
+    tracker = TaskEventTracker()
+    tracker.observe([task()])
+
+    assert events(tracker, [task("RUNNING")]) == [("t1", "started")]
+    assert events(tracker, [task("RUNNING")]) == []
+
+    finished = tracker.observe(
+        [task(last_run="2023-11-14T22:13:20.000+00:00", result="OK")],
+        run_states=lambda: {"t1": (STARTED, 42.5)},
+    )
+    assert [(e["event"], e.get("duration_seconds")) for e in finished] == [("finished", 42.5)]
+    assert finished[0]["run_started"] == "2023-11-14T22:13:20+00:00"
+
+
+def test_short_run_between_polls():
+    tracker = TaskEventTracker()
+    tracker.observe([task(last_run="2023-01-01T00:00:00Z", result="OK")])
+
+    calls = []
+    result = events(
+        tracker,
+        [task(last_run="2023-01-02T00:00:00Z", result="FAILED")],
+        run_states=lambda: calls.append(1) or {},
+    )
+    assert result == [("t1", "started"), ("t1", "failed")]
+    assert calls == [1]
+    # Тот же lastRun — нового запуска нет, job_data не запрашивается
+    assert events(tracker, [task(last_run="2023-01-02T00:00:00Z", result="FAILED")]) == []
+    assert calls == [1]
+
+
+def test_completion_while_next_run_is_running():
+    tracker = TaskEventTracker()
+    tracker.observe([task()])
+    assert events(tracker, [task("RUNNING")]) == [("t1", "started")]
+
+    # Между опросами запуск завершился и сразу начался следующий
+    result = events(tracker, [task("RUNNING", last_run="2023-01-02T00:00:00Z", result="OK")])
+    assert result == [("t1", "started"), ("t1", "finished")]
+    assert events(tracker, [task("RUNNING", last_run="2023-01-02T00:00:00Z", result="OK")]) == []
+
+    result = events(tracker, [task(last_run="2023-01-02T01:00:00Z", result="FAILED")])
+    assert result == [("t1", "failed")]
+
+
+def test_duration_only_for_matching_run():
+    tracker = TaskEventTracker()
+    tracker.observe([task()])
+    finished = tracker.observe(
+        [task(last_run=STARTED * 1000, result="OK")],
+        run_states=lambda: {"t1": (STARTED - 3600, 10.0)},
+    )
+    assert "duration_seconds" not in finished[-1]
+
+
+def test_run_states_from_jobs():
+    jobs = [
+        {
+            ".id": "t1",
+            ".lastRunState.runStarted": str(STARTED * 1000),
+            ".lastRunState.runDuration": "1500",
+        },
+        {".id": "t2"},
+    ]
+    assert run_states_from_jobs(jobs) == {"t1": (STARTED, 1.5)}
+
+
+def test_record_updates_metrics_and_log(tmp_path, monkeypatch):
+    path = tmp_path / "events" / "tasks.jsonl"
+    monkeypatch.setattr(task_events, "TRACKER", TaskEventTracker())
+    monkeypatch.setattr(task_events, "EVENT_LOG", EventLog(str(path)))
+    labels = {"type": "blobstore.compact", "event": "started"}
+    before = REGISTRY.get_sample_value("nexus_task_events_total", labels) or 0
+
+    task_events.record_task_events([task()])
+    task_events.record_task_events([task("RUNNING")])
+
+    assert REGISTRY.get_sample_value("nexus_task_events_total", labels) == before + 1
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["event"] for line in lines] == ["started"]
+
+
+def test_event_log_rotates(tmp_path):
+    path = tmp_path / "tasks.jsonl"
+    log = EventLog(str(path), max_bytes=200)
+    for _ in range(5):
+        log.write([{"event": "started", "task_id": "x" * 50}])
+
+    assert (tmp_path / "tasks.jsonl.1").exists()
+    assert path.stat().st_size <= 200
@@ -0,0 +1,111 @@
+import json
+import time
+
+import pytest
+from prometheus_client import CollectorRegistry
+
+from metrics.docker_tags import DockerTagsCollector
+from metrics.utils import warm_start
+from metrics.utils.snapshot import SNAPSHOT_STALE, SnapshotGauge, register_snapshot
+
+
+@pytest.fixture
+def snapshots(monkeypatch):
+    monkeypatch.setattr(warm_start, "SNAPSHOTS", {})
+    return warm_start.SNAPSHOTS
+
+
+def make_gauge(snapshots, labelnames=("repo_name",)):
+    gauge = SnapshotGauge("test_warm_size", "test", labelnames, registry=CollectorRegistry())
+    register_snapshot(gauge)
+    snapshots[gauge.name] = gauge
+    return gauge
+
+
+def stale(name):
+    return SNAPSHOT_STALE.labels(metric=name)._value.get()
+
+
+def test_roundtrip_marks_stale_until_publish(tmp_path, snapshots):
+    path = str(tmp_path / "snapshot.json")
+    gauge = make_gauge(snapshots)
+    buffer = gauge.buffer()
+    buffer.labels(repo_name="maven").set(42)
+    gauge.publish(buffer)
+
+    tags = DockerTagsCollector(registry=None)
+    tags.update([("app", "docker-hosted", "docker", "default", 3)])
+    snapshots[tags.name] = tags
+
+    assert warm_start.save_snapshot(path) == 2
+
+    # «Перезапуск»: новые пустые коллекторы под теми же именами
+    snapshots.clear()
+    restarted = make_gauge(snapshots)
+    restarted_tags = DockerTagsCollector(registry=None)
+    snapshots[restarted_tags.name] = restarted_tags
+
+    assert warm_start.load_snapshot(path) == 2
+    assert restarted.samples() == {("maven",): 42.0}
+    assert restarted_tags.dump() == [["app", "docker-hosted", "docker", "default", 3]]
+    assert stale(restarted.name) == 1
+
+    restarted.publish(restarted.buffer())
+    assert stale(restarted.name) == 0
+
+
+def test_changed_labels_and_old_snapshot_are_skipped(tmp_path, snapshots):
+    path = tmp_path / "snapshot.json"
+    path.write_text(json.dumps({
+        "format": warm_start.SNAPSHOT_FORMAT,
+        "saved_at": 0,
+        "metrics": {"test_warm_size": {"labelnames": ["repo_name"], "rows": [["a", 1]]}},
+    }))
+    gauge = make_gauge(snapshots, labelnames=("repo_name", "blob"))
+
+    assert warm_start.load_snapshot(str(path), max_age=10**10) == 0
+    assert warm_start.load_snapshot(str(path), max_age=60) == 0
+    assert gauge.samples() == {}
+
+
+def test_unrefreshed_metric_keeps_original_age(tmp_path, snapshots):
+    path = tmp_path / "snapshot.json"
+    old = time.time() - 100
+    path.write_text(json.dumps({
+        "format": warm_start.SNAPSHOT_FORMAT,
+        "saved_at": old,
+        "metrics": {"test_warm_size": {"labelnames": ["repo_name"], "rows": [["a", 1]]}},
+    }))
+    gauge = make_gauge(snapshots)
+    assert warm_start.load_snapshot(str(path), max_age=1000) == 1
+
+    # Коллектор так и не опубликовал данные — пересохранение их не «освежает»
+    warm_start.save_snapshot(str(path))
+    snapshots.clear()
+    make_gauge(snapshots)
+    assert warm_start.load_snapshot(str(path), max_age=1000) == 1
+    snapshots.clear()
+    restarted = make_gauge(snapshots)
+    assert warm_start.load_snapshot(str(path), max_age=50) == 0
+    assert restarted.samples() == {}
+
+    # После свежей публикации метрика сохраняется с новым временем
+    buffer = gauge.buffer()
+    buffer.labels(repo_name="a").set(2)
+    gauge.publish(buffer)
+    snapshots.clear()
+    snapshots[gauge.name] = gauge
+    warm_start.save_snapshot(str(path))
+    snapshots.clear()
+    make_gauge(snapshots)
+    assert warm_start.load_snapshot(str(path), max_age=50) == 1
+
+
+def test_restore_does_not_override_fresh_data(snapshots):
+    gauge = make_gauge(snapshots)
+    buffer = gauge.buffer()
+    buffer.labels(repo_name="fresh").set(1)
+    gauge.publish(buffer)
+
+    assert gauge.restore([["old", 5]]) == 0
+    assert gauge.samples() == {("fresh",): 1.0}